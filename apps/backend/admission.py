@@ -0,0 +1,119 @@
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+
+import metrics
+
+logger = logging.getLogger("ScreenshotConverter")
+
+
+class QueueFull(Exception):
+    """
+    Raised when a job arrives while the admission queue is already full.
+    """
+
+    def __init__(self, retry_after):
+        super().__init__("Server is busy, try again later")
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("granted", "moved")
+
+    def __init__(self, loop):
+        # Resolved when a pipeline slot is handed to this job
+        self.granted = loop.create_future()
+        # Resolved (and replaced) whenever the queue ahead of this job shrinks
+        self.moved = loop.create_future()
+
+
+class AdmissionController:
+    """
+    Global admission queue for conversions: at most `max_in_flight` pipelines
+    run at once and at most `max_queued` jobs wait, first come first served.
+    Jobs beyond that are rejected right away with QueueFull, so a burst
+    turns into fast refusals instead of every request slowing down.
+    """
+
+    def __init__(self, max_in_flight=2, max_queued=16, retry_after=5):
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        # Seconds clients are told to wait before retrying a rejected job
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self._waiters = deque()
+
+    @property
+    def queued(self):
+        return len(self._waiters)
+
+    def stats(self):
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_in_flight": self.max_in_flight,
+            "max_queued": self.max_queued
+        }
+
+    @asynccontextmanager
+    async def admit(self, on_position=None):
+        """
+        Holds a pipeline slot for the duration of the block, waiting in the
+        queue first if all slots are busy. `on_position(position)` is awaited
+        with the 1-based queue position when the job is queued and whenever
+        it moves up. Cancelling the waiting task (e.g. the client went away)
+        drops the job from the queue.
+        """
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+        else:
+            if len(self._waiters) >= self.max_queued:
+                metrics.ADMISSION_REJECTED.inc()
+                raise QueueFull(self.retry_after)
+            await self._wait(on_position)
+        self._update_gauges()
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _wait(self, on_position):
+        waiter = _Waiter(asyncio.get_running_loop())
+        self._waiters.append(waiter)
+        self._update_gauges()
+        try:
+            while not waiter.granted.done():
+                if on_position is not None:
+                    await on_position(self._waiters.index(waiter) + 1)
+                if not waiter.granted.done():
+                    await asyncio.wait({waiter.granted, waiter.moved}, return_when=asyncio.FIRST_COMPLETED)
+                if waiter.moved.done():
+                    waiter.moved = asyncio.get_running_loop().create_future()
+        except BaseException:
+            if waiter.granted.done():
+                # The slot was handed over just as the job went away: pass it on
+                self._release()
+            else:
+                self._waiters.remove(waiter)
+                self._notify_moved()
+                self._update_gauges()
+            raise
+
+    def _release(self):
+        if self._waiters:
+            # Hand the slot straight to the next job; in_flight stays the same
+            self._waiters.popleft().granted.set_result(None)
+            self._notify_moved()
+        else:
+            self.in_flight -= 1
+        self._update_gauges()
+
+    def _notify_moved(self):
+        for waiter in self._waiters:
+            if not waiter.moved.done():
+                waiter.moved.set_result(None)
+
+    def _update_gauges(self):
+        metrics.ADMISSION_IN_FLIGHT.set(self.in_flight)
+        metrics.ADMISSION_QUEUED.set(len(self._waiters))
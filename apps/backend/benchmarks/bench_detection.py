@@ -0,0 +1,115 @@
+"""
+Benchmarks UIElementDetector on synthetic screenshots.
+
+    python benchmarks/bench_detection.py --sizes 1024x768 1440x4000
+
+For each screenshot reports:
+- time of the previous per-contour Python loop vs the vectorized contour path
+  (the detector's default, which must return the same boxes). With
+  `--method components` the loop column is still the contour loop, so it
+  compares the two methods rather than two implementations of one,
+- time with glyph and overlap merging on (--glyph-max-side, --iou), how many
+  boxes they remove, and the resulting change in layout nodes and in the size
+  of the layout JSON sent to the LLM. Both are off by default in the pipeline.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import cv2
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import create_screenshot
+from engine.screenshotProcessor import ScreenshotProcessor
+from engine.detection import UIElementDetector
+from engine.layout_engine import LayoutEngine, count_nodes
+from engine.layout_encoder import LayoutEncoder
+
+
+def legacy_detect_elements(img):
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if len(img.shape) == 3 else img
+    thresh = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 11, 2)
+    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    elements = []
+    for cnt in contours:
+        if cv2.contourArea(cnt) > 100:
+            x, y, w, h = cv2.boundingRect(cnt)
+            elements.append({"type": "block", "box": [x, y, w, h]})
+    elements.sort(key=lambda k: (k['box'][1], k['box'][0]))
+    return elements
+
+
+def best_of(repeat, fn, *args):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def layout_footprint(elements, width, height):
+    layout = LayoutEngine().build_layout(elements, [], width, height)
+    # Same serialization the generator puts in the prompt, without the token budget
+    return count_nodes(layout) - 1, len(LayoutEncoder(token_budget=0).encode(layout))
+
+
+def run(sizes, density, noise, repeat, method, glyph_max_side, iou_threshold):
+    preprocessor = ScreenshotProcessor()
+    unfiltered = UIElementDetector(method=method)
+    filtered = UIElementDetector(method=method, glyph_max_side=glyph_max_side, iou_threshold=iou_threshold)
+    report = []
+
+    for size in sizes:
+        width, height = map(int, size.split("x"))
+        img, _ = create_screenshot(width, height, density=density, noise=noise)
+        processed = preprocessor.preprocess(img)
+        h, w = processed.shape[:2]
+
+        legacy, legacy_s = best_of(repeat, legacy_detect_elements, processed)
+        raw, raw_s = best_of(repeat, unfiltered.detect_elements, processed)
+        (kept, stats), filtered_s = best_of(repeat, filtered.detect_elements_with_stats, processed)
+
+        raw_nodes, raw_prompt = layout_footprint(raw, w, h)
+        kept_nodes, kept_prompt = layout_footprint(kept, w, h)
+        row = {
+            "size": size,
+            "legacy_ms": round(legacy_s * 1000, 2),
+            "vectorized_ms": round(raw_s * 1000, 2),
+            "filtered_ms": round(filtered_s * 1000, 2),
+            "filter_stats": stats,
+            "layout_nodes": [raw_nodes, kept_nodes],
+            "prompt_chars": [raw_prompt, kept_prompt]
+        }
+        if method == "contours":
+            row["matches_legacy"] = legacy == raw
+        report.append(row)
+        print(
+            f"{size:>10}  legacy {row['legacy_ms']:7.2f} ms  vectorized {row['vectorized_ms']:7.2f} ms  "
+            f"filtered {row['filtered_ms']:7.2f} ms  boxes {stats['raw']} -> {stats['kept']}  "
+            f"nodes {raw_nodes} -> {kept_nodes}  prompt {raw_prompt} -> {kept_prompt} chars"
+        )
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark UI element detection")
+    parser.add_argument("--sizes", nargs="+", default=["800x600", "1280x1600", "1440x4000"])
+    parser.add_argument("--density", type=float, default=1.5)
+    parser.add_argument("--noise", type=float, default=0.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--method", choices=["contours", "components"], default="contours")
+    parser.add_argument("--glyph-max-side", type=int, default=32, help="Glyph merging setting for the filtered run")
+    parser.add_argument("--iou", type=float, default=0.7, help="Overlap merging setting for the filtered run")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run(
+        args.sizes, args.density, args.noise, args.repeat, args.method, args.glyph_max_side, args.iou or None
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,207 @@
+"""
+End-to-end benchmark of ScreenshotPipeline against a local fake Ollama server.
+
+    python benchmarks/bench_e2e.py --sizes 1024x768 1440x3000 --densities 0.5 1.5 \\
+        --clients 1 4 --requests 8 --tokens-per-second 200 --output results.json
+
+    # later, on another commit
+    python benchmarks/bench_e2e.py ... --output new.json --compare results.json
+
+For every (size, density) it runs `--requests` conversions at each client
+concurrency and records per-stage latency percentiles (the `duration_ms` of
+the pipeline's `stage_complete` messages), time to first code chunk, total
+latency and throughput. Peak RSS covers the whole run. --compare flags
+metrics that got worse than the baseline by more than --tolerance (and
+--min-delta-ms) and exits non-zero if there are any.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import create_screenshot, encode_png
+from fake_ollama import FakeOllamaServer
+from pipeline import ScreenshotPipeline
+
+STAGES = ["decoding", "preprocessing", "detection", "ocr", "layout", "generation"]
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    k = (len(values) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def summarize(values):
+    return {
+        "p50": round(percentile(values, 50) * 1000, 2),
+        "p90": round(percentile(values, 90) * 1000, 2),
+        "p99": round(percentile(values, 99) * 1000, 2),
+        "max": round(max(values) * 1000, 2)
+    } if values else None
+
+
+async def convert(pipeline, image_bytes, framework="react"):
+    """
+    Runs one conversion; stage durations come from the pipeline's own
+    `stage_complete` messages.
+    """
+    start = time.perf_counter()
+    durations = {}
+    first_chunk = None
+    async for update in pipeline.process(image_bytes, framework):
+        if update["type"] == "status" and update["step"] == "stage_complete":
+            durations[update["stage"]] = update["duration_ms"] / 1000
+        elif update["type"] == "code_chunk" and first_chunk is None:
+            first_chunk = time.perf_counter() - start
+        elif update["type"] == "error":
+            raise RuntimeError(update["message"])
+    end = time.perf_counter()
+    return {"stages": durations, "ttfc": first_chunk, "total": end - start}
+
+
+async def run_scenario(pipeline, images, clients, requests):
+    """
+    Runs `requests` conversions with at most `clients` in flight at once.
+    """
+    slots = asyncio.Semaphore(clients)
+    results = []
+
+    async def client(i):
+        async with slots:
+            results.append(await convert(pipeline, images[i % len(images)]))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(requests)))
+    wall = time.perf_counter() - start
+
+    return {
+        "clients": clients,
+        "requests": requests,
+        "throughput_rps": round(requests / wall, 3),
+        "total_ms": summarize([r["total"] for r in results]),
+        "ttfc_ms": summarize([r["ttfc"] for r in results if r["ttfc"] is not None]),
+        "stages_ms": {
+            stage: summarize([r["stages"][stage] for r in results if stage in r["stages"]])
+            for stage in STAGES
+        }
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return None
+
+
+async def run(args):
+    server = FakeOllamaServer(
+        tokens=["<div>token</div>\n"] * args.tokens,
+        tokens_per_second=args.tokens_per_second
+    )
+    await server.start()
+    # No cache: every request must do the full work
+    pipeline = ScreenshotPipeline(cache_size=0, ollama_url=server.url)
+
+    scenarios = []
+    try:
+        for size in args.sizes:
+            width, height = map(int, size.split("x"))
+            for density in args.densities:
+                # Distinct images per request so nothing is shared between them
+                images = [
+                    encode_png(create_screenshot(width, height, density=density, seed=seed)[0])
+                    for seed in range(args.requests)
+                ]
+                await convert(pipeline, images[0])  # warm-up
+                for clients in args.clients:
+                    result = await run_scenario(pipeline, images, clients, args.requests)
+                    result.update({"size": size, "density": density})
+                    scenarios.append(result)
+                    print(
+                        f"{size:>10} density {density:<4} clients {clients:<3} "
+                        f"{result['throughput_rps']:7.2f} req/s  total p50 {result['total_ms']['p50']:8.1f} ms  "
+                        f"ttfc p50 {result['ttfc_ms']['p50']:8.1f} ms  "
+                        f"ocr p50 {result['stages_ms']['ocr']['p50']:8.1f} ms"
+                    )
+    finally:
+        pipeline.executor.shutdown()
+        await pipeline.generator.aclose()
+        await server.stop()
+
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "tokens": args.tokens,
+        "tokens_per_second": args.tokens_per_second,
+        # ru_maxrss is in KB on Linux, bytes on macOS
+        "peak_rss_mb": round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1
+        ),
+        "scenarios": scenarios
+    }
+
+
+def compare(current, baseline, tolerance, min_delta_ms):
+    """
+    Lists metrics that regressed by more than `tolerance` (a fraction) and by
+    at least `min_delta_ms`, so jitter on millisecond-scale stages is ignored.
+    """
+    regressions = []
+    key = lambda s: (s["size"], s["density"], s["clients"])
+    previous = {key(s): s for s in baseline["scenarios"]}
+    for scenario in current["scenarios"]:
+        old = previous.get(key(scenario))
+        if old is None:
+            continue
+        label = "{} density {} clients {}".format(*key(scenario))
+        if scenario["throughput_rps"] < old["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{label}: throughput {old['throughput_rps']} -> {scenario['throughput_rps']} req/s")
+        metrics = [("total", scenario["total_ms"], old["total_ms"]), ("ttfc", scenario["ttfc_ms"], old["ttfc_ms"])]
+        metrics += [(stage, scenario["stages_ms"][stage], old["stages_ms"].get(stage)) for stage in STAGES]
+        for name, new, prev in metrics:
+            if new and prev and new["p50"] > prev["p50"] * (1 + tolerance) and new["p50"] - prev["p50"] >= min_delta_ms:
+                regressions.append(f"{label}: {name} p50 {prev['p50']} -> {new['p50']} ms")
+    if current["peak_rss_mb"] > baseline["peak_rss_mb"] * (1 + tolerance):
+        regressions.append(f"peak RSS {baseline['peak_rss_mb']} -> {current['peak_rss_mb']} MB")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end pipeline benchmark")
+    parser.add_argument("--sizes", nargs="+", default=["1024x768", "1440x3000"])
+    parser.add_argument("--densities", nargs="+", type=float, default=[0.5, 1.5])
+    parser.add_argument("--clients", nargs="+", type=int, default=[1, 4])
+    parser.add_argument("--requests", type=int, default=8)
+    parser.add_argument("--tokens", type=int, default=200, help="Tokens the fake LLM streams per request")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Baseline JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    parser.add_argument("--min-delta-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print(f"peak RSS {report['peak_rss_mb']} MB")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.tolerance, args.min_delta_ms)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,134 @@
+"""
+Scaling benchmark for LayoutEngine.build_layout.
+
+    python benchmarks/bench_layout.py --counts 40 160 1000 3000 10000 50000
+
+Builds synthetic dashboards with nested containers, text boxes and
+overlapping noise, times the plain descent and the indexed build (the engine
+switches between them at LayoutEngine.index_min_nodes) against the previous
+recursive O(N^2) insertion (skipped above --legacy-max boxes) and checks all
+produce the same tree.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.layout_engine import LayoutEngine
+
+
+def legacy_build_layout(elements, ocr_data, img_width, img_height):
+    """
+    The original implementation, kept as the reference for equivalence and speed.
+    """
+    nodes = [{"type": "container", "box": el['box'], "children": [], "text": None} for el in elements]
+    nodes += [{"type": "text", "box": o['box'], "children": [], "text": o['text']} for o in ocr_data]
+    nodes.sort(key=lambda n: n['box'][2] * n['box'][3], reverse=True)
+    root = {"type": "root", "box": [0, 0, img_width, img_height], "children": []}
+
+    def is_contained(inner, outer):
+        ix, iy, iw, ih = inner['box']
+        ox, oy, ow, oh = outer['box']
+        return (ix >= ox) and (iy >= oy) and (ix + iw <= ox + ow) and (iy + ih <= oy + oh)
+
+    def insert_node(parent, node):
+        for child in parent['children']:
+            if is_contained(node, child):
+                insert_node(child, node)
+                return
+        parent['children'].append(node)
+
+    for node in nodes:
+        if node['box'][2] > img_width * 0.95 and node['box'][3] > img_height * 0.95:
+            continue
+        insert_node(root, node)
+    return root
+
+
+def synthetic_boxes(count, seed=0):
+    """
+    Roughly `count` boxes on a 1440px wide page: nested cards subdivided into
+    rows and cells, text boxes inside cells, plus random overlapping boxes.
+    Returns (elements, ocr_data, width, height).
+    """
+    rng = random.Random(seed)
+    width = 1440
+    cards_per_row = 4
+    per_card = 24
+    card_count = max(1, count // per_card)
+    card_w, card_h = 340, 260
+    height = 80 + (card_count // cards_per_row + 1) * (card_h + 20)
+
+    elements, ocr_data = [], []
+    for i in range(card_count):
+        cx = 20 + (i % cards_per_row) * (card_w + 20)
+        cy = 80 + (i // cards_per_row) * (card_h + 20)
+        elements.append({"box": [cx, cy, card_w, card_h]})
+        for r in range(4):
+            ry = cy + 10 + r * 60
+            elements.append({"box": [cx + 10, ry, card_w - 20, 50]})
+            for c in range(2):
+                bx = cx + 15 + c * 160
+                elements.append({"box": [bx, ry + 5, 150, 40]})
+                ocr_data.append({"text": f"t{i}-{r}-{c}", "box": [bx + 5, ry + 12, rng.randint(40, 130), 20]})
+        # Noise that partially overlaps its neighbours
+        for _ in range(per_card - 1 - 4 * 5):
+            elements.append({"box": [
+                rng.randint(cx - 30, cx + card_w), rng.randint(cy - 30, cy + card_h),
+                rng.randint(5, 120), rng.randint(5, 80)
+            ]})
+    return elements, ocr_data, width, height
+
+
+def time_call(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def run(counts, legacy_max):
+    descent = LayoutEngine(index_min_nodes=float("inf"))
+    indexed = LayoutEngine(index_min_nodes=0)
+    report = []
+    # The legacy builder recurses once per tree level
+    sys.setrecursionlimit(100000)
+    for count in counts:
+        args = synthetic_boxes(count)
+        tree, indexed_s = time_call(indexed.build_layout, *args)
+        descent_tree, descent_s = time_call(descent.build_layout, *args)
+        row = {
+            "boxes": len(args[0]) + len(args[1]),
+            "descent_ms": round(descent_s * 1000, 1),
+            "indexed_ms": round(indexed_s * 1000, 1)
+        }
+        identical = json.dumps(tree) == json.dumps(descent_tree)
+        if count <= legacy_max:
+            legacy_tree, legacy_s = time_call(legacy_build_layout, *args)
+            row["legacy_ms"] = round(legacy_s * 1000, 1)
+            row["speedup"] = round(legacy_s / max(min(indexed_s, descent_s), 1e-9), 1)
+            identical = identical and json.dumps(tree) == json.dumps(legacy_tree)
+        row["identical"] = identical
+        report.append(row)
+        print(
+            f"{row['boxes']:>7} boxes  descent {row['descent_ms']:9.1f} ms  indexed {row['indexed_ms']:9.1f} ms  "
+            + (f"legacy {row['legacy_ms']:9.1f} ms  x{row['speedup']}  " if "legacy_ms" in row else "legacy skipped  ")
+            + f"identical={row['identical']}"
+        )
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LayoutEngine scaling benchmark")
+    parser.add_argument("--counts", nargs="+", type=int, default=[40, 160, 1000, 3000, 10000, 50000])
+    parser.add_argument("--legacy-max", type=int, default=10000)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run(args.counts, args.legacy_max)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,77 @@
+"""
+Compares full-image OCR against region-batched OCR on synthetic screenshots.
+
+    python benchmarks/bench_ocr.py --sizes 1024x768 1440x2400 --repeat 3
+
+Reports mean latency and word recall (share of drawn words found by OCR)
+for both modes.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import create_screenshot
+from engine.screenshotProcessor import ScreenshotProcessor, map_boxes_to_original
+from engine.detection import UIElementDetector
+from engine.ocrProcessing import OCRProcessor
+
+
+def word_recall(truth, results):
+    found = set()
+    for res in results:
+        found.update(word.strip(".,:;").lower() for word in res["text"].split())
+    expected = [t["text"].lower() for t in truth]
+    return sum(word in found for word in expected) / len(expected) if expected else 1.0
+
+
+def run(sizes, repeat, density):
+    preprocessor = ScreenshotProcessor()
+    detector = UIElementDetector()
+    ocr = OCRProcessor()
+    report = []
+
+    for size in sizes:
+        width, height = map(int, size.split("x"))
+        img, truth = create_screenshot(width, height, density=density)
+        processed = preprocessor.preprocess(img)
+        elements = map_boxes_to_original(detector.detect_elements(processed), preprocessor.get_transform(img.shape))
+
+        row = {"size": size, "words": len(truth), "elements": len(elements)}
+        for mode in ("full", "regions"):
+            ocr.extract_text(img, elements, mode=mode)  # warm-up
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                results = ocr.extract_text(img, elements, mode=mode)
+                timings.append(time.perf_counter() - start)
+            row[mode] = {
+                "mean_ms": round(1000 * sum(timings) / len(timings), 1),
+                "recall": round(word_recall(truth, results), 3),
+                "boxes": len(results)
+            }
+        row["speedup"] = round(row["full"]["mean_ms"] / max(row["regions"]["mean_ms"], 1e-6), 2)
+        report.append(row)
+        print(
+            f"{size:>10}  full {row['full']['mean_ms']:8.1f} ms (recall {row['full']['recall']:.2f})  "
+            f"regions {row['regions']['mean_ms']:8.1f} ms (recall {row['regions']['recall']:.2f})  "
+            f"x{row['speedup']}"
+        )
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark full vs region OCR")
+    parser.add_argument("--sizes", nargs="+", default=["800x600", "1280x1600", "1440x4000"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--density", type=float, default=1.0)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeat, args.density)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,124 @@
+"""
+Accuracy/latency comparison of OCR backend configurations on synthetic screenshots.
+
+    python benchmarks/bench_ocr_backends.py \\
+        --configs easyocr easyocr-cpu:quantize=0 easyocr-cpu:threads=4 easyocr-cpu:threads=4,batch_size=32
+
+A config is a backend name, optionally followed by `:key=value,...`.
+`batch_size` goes to OCRProcessor; every other key is a backend option
+(threads, quantize, canvas_size for easyocr-cpu). Each config reads the same
+screenshots (every size at every noise level) and reports:
+- load_s: time to build the backend (model load + quantization),
+- mean_ms / p95_ms: full-page extract_text latency per screenshot,
+- recall: share of drawn words found anywhere in the OCR output,
+- precision: share of recognized words that were actually drawn,
+- char_accuracy: mean similarity (difflib ratio) between each drawn word and
+  the text recognized over its box, which also credits near misses.
+"""
+import argparse
+import difflib
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_ocr import word_recall
+from benchmarks.synthetic import create_screenshot
+from engine.ocrProcessing import OCRProcessor
+
+
+def parse_config(spec):
+    name, _, options = spec.partition(":")
+    values = {}
+    for option in filter(None, options.split(",")):
+        key, _, value = option.partition("=")
+        values[key] = int(value) if value.lstrip("-").isdigit() else value
+    batch_size = values.pop("batch_size", 16)
+    return name, batch_size, values
+
+
+def words(results):
+    return [word.strip(".,:;").lower() for res in results for word in res["text"].split()]
+
+
+def precision(truth, results):
+    drawn = {t["text"].lower() for t in truth}
+    found = words(results)
+    return sum(word in drawn for word in found) / len(found) if found else 0.0
+
+
+def char_accuracy(truth, results):
+    scores = []
+    for item in truth:
+        x, y, w, h = item["box"]
+        cx, cy = x + w / 2, y + h / 2
+        # Text recognized over the word: results whose box contains its center
+        read = " ".join(
+            res["text"] for res in results
+            if res["box"][0] <= cx <= res["box"][0] + res["box"][2]
+            and res["box"][1] <= cy <= res["box"][1] + res["box"][3]
+        ).lower()
+        candidates = read.split() or [""]
+        scores.append(max(difflib.SequenceMatcher(None, item["text"].lower(), word).ratio() for word in candidates))
+    return sum(scores) / len(scores) if scores else 1.0
+
+
+def run(configs, sizes, noises, repeat):
+    screenshots = []
+    for size in sizes:
+        width, height = map(int, size.split("x"))
+        for noise in noises:
+            screenshots.append(create_screenshot(width, height, seed=len(screenshots), noise=noise))
+
+    report = []
+    for spec in configs:
+        name, batch_size, options = parse_config(spec)
+        start = time.perf_counter()
+        ocr = OCRProcessor(batch_size=batch_size, backend=name, backend_options=options)
+        load_s = time.perf_counter() - start
+        ocr.warm_up()
+
+        timings, recalls, precisions, accuracies = [], [], [], []
+        for img, truth in screenshots:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                results = ocr.extract_text(img)
+                timings.append(time.perf_counter() - start)
+            recalls.append(word_recall(truth, results))
+            precisions.append(precision(truth, results))
+            accuracies.append(char_accuracy(truth, results))
+
+        timings.sort()
+        row = {
+            "config": spec,
+            "load_s": round(load_s, 2),
+            "mean_ms": round(1000 * sum(timings) / len(timings), 1),
+            "p95_ms": round(1000 * timings[min(len(timings) - 1, int(0.95 * len(timings)))], 1),
+            "recall": round(sum(recalls) / len(recalls), 3),
+            "precision": round(sum(precisions) / len(precisions), 3),
+            "char_accuracy": round(sum(accuracies) / len(accuracies), 3)
+        }
+        report.append(row)
+        print(
+            f"{spec:>40}: load {row['load_s']:6.2f}s  mean {row['mean_ms']:8.1f} ms  p95 {row['p95_ms']:8.1f} ms  "
+            f"recall {row['recall']:.3f}  precision {row['precision']:.3f}  chars {row['char_accuracy']:.3f}"
+        )
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare OCR backends on accuracy and latency")
+    parser.add_argument("--configs", nargs="+", default=["easyocr", "easyocr-cpu:quantize=0", "easyocr-cpu"])
+    parser.add_argument("--sizes", nargs="+", default=["800x600", "1280x1600"])
+    parser.add_argument("--noises", nargs="+", type=float, default=[0.0, 8.0],
+                        help="Gaussian pixel noise levels, like lossy captures")
+    parser.add_argument("--repeat", type=int, default=2)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run(args.configs, args.sizes, args.noises, args.repeat)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
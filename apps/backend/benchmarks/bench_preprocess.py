@@ -0,0 +1,130 @@
+"""
+Per-step time and memory of the two ScreenshotProcessor profiles.
+
+    python benchmarks/bench_preprocess.py --sizes 1440x900 2880x1800 1440x8000
+
+"color" is `preprocess` (Resize → CLAHE on LAB → Sharpen → Crop) followed by
+the grayscale conversion detection does anyway; "detection" is
+`preprocess_gray` (Crop → Gray → Resize → CLAHE → Sharpen). Memory is the
+size of the arrays each step allocates, as seen by tracemalloc.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import cv2
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import create_screenshot
+from engine.screenshotProcessor import ScreenshotProcessor
+
+
+def color_steps(p):
+    return [
+        ("resize", p.resize_fixed_width),
+        ("clahe", p.apply_clahe),
+        ("sharpen", p.mild_sharpen),
+        ("crop", p.crop_outer_background),
+        ("gray", lambda img: cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)),
+    ]
+
+
+def detection_steps(p):
+    state = {}
+
+    def crop(img):
+        h, w = img.shape[:2]
+        state["scale"] = p.fixed_width / w
+        dx, dy = int(w * p.crop_margin), int(h * p.crop_margin)
+        return img[dy:h - dy, dx:w - dx]
+
+    def resize(gray):
+        size = (round(gray.shape[1] * state["scale"]), round(gray.shape[0] * state["scale"]))
+        state["buffer"] = cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+        return state["buffer"]
+
+    return [
+        ("crop", crop),
+        ("gray", lambda img: cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)),
+        ("resize", resize),
+        ("clahe", p.clahe.apply),
+        ("sharpen", lambda img: cv2.filter2D(img, -1, p.sharpen_kernel, dst=state["buffer"])),
+    ]
+
+
+def profile_steps(steps, img, repeat):
+    """
+    Runs the steps in order; returns per-step best time (ms) and bytes allocated.
+    """
+    report = {}
+    for _ in range(repeat):
+        current = img
+        for name, fn in steps:
+            tracemalloc.start()
+            start = time.perf_counter()
+            current = fn(current)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            best = report.setdefault(name, {"ms": float("inf"), "alloc_kb": 0})
+            best["ms"] = round(min(best["ms"], elapsed * 1000), 3)
+            best["alloc_kb"] = round(peak / 1024, 1)
+    return report
+
+
+def total(fn, img, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        tracemalloc.start()
+        start = time.perf_counter()
+        fn(img)
+        best = min(best, time.perf_counter() - start)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {"ms": round(best * 1000, 3), "peak_kb": round(peak / 1024, 1)}
+
+
+def run(sizes, repeat):
+    color = ScreenshotProcessor(profile="color")
+    fast = ScreenshotProcessor(profile="detection")
+    report = []
+    for size in sizes:
+        width, height = map(int, size.split("x"))
+        img, _ = create_screenshot(width, height)
+        row = {
+            "size": size,
+            "color": {
+                "steps": profile_steps(color_steps(color), img, repeat),
+                "total": total(lambda i: cv2.cvtColor(color.preprocess(i), cv2.COLOR_BGR2GRAY), img, repeat)
+            },
+            "detection": {
+                "steps": profile_steps(detection_steps(fast), img, repeat),
+                "total": total(fast.preprocess_gray, img, repeat)
+            }
+        }
+        report.append(row)
+        print(f"\n{size}")
+        for profile in ("color", "detection"):
+            steps = "  ".join(
+                f"{name} {v['ms']:.2f}ms/{v['alloc_kb']:.0f}KB" for name, v in row[profile]["steps"].items()
+            )
+            t = row[profile]["total"]
+            print(f"  {profile:>9}: total {t['ms']:7.2f} ms, peak {t['peak_kb']:8.0f} KB | {steps}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark preprocessing profiles")
+    parser.add_argument("--sizes", nargs="+", default=["1440x900", "2880x1800", "1440x8000"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeat)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,67 @@
+"""
+Size of the layout part of the prompt: indented JSON vs LayoutEncoder.
+
+    python benchmarks/bench_prompt.py --sizes 1024x768 1440x4000 --budgets 0 2000 1000
+
+Layouts are built from detected elements plus the synthetic ground-truth
+text (standing in for OCR). Tokens are estimated at 4 characters each, the
+same estimate the encoder uses for its budget; prefill time scales with them.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import create_screenshot
+from engine.screenshotProcessor import ScreenshotProcessor, map_boxes_to_original
+from engine.detection import UIElementDetector
+from engine.layout_engine import LayoutEngine
+from engine.layout_encoder import LayoutEncoder
+
+
+def detect(img):
+    processed, transform = ScreenshotProcessor().preprocess_for_detection(img)
+    return map_boxes_to_original(UIElementDetector().detect_elements(processed), transform)
+
+
+def run(sizes, density, budgets, grid):
+    report = []
+    for size in sizes:
+        width, height = map(int, size.split("x"))
+        img, truth = create_screenshot(width, height, density=density)
+        layout = LayoutEngine().build_layout(detect(img), truth, width, height)
+        json_chars = len(json.dumps(layout, indent=2))
+        row = {"size": size, "json_chars": json_chars, "json_tokens": json_chars // 4, "encoded": []}
+        print(f"{size:>10}  json {json_chars:8d} chars (~{json_chars // 4} tokens)")
+        for budget in budgets:
+            encoder = LayoutEncoder(grid=grid, token_budget=budget)
+            start = time.perf_counter()
+            _, stats = encoder.encode_with_stats(layout)
+            elapsed = time.perf_counter() - start
+            stats.update({"budget": budget, "encode_ms": round(elapsed * 1000, 2)})
+            row["encoded"].append(stats)
+            print(
+                f"{'':>10}  budget {budget or 'none':>6}: {stats['chars']:8d} chars (~{stats['tokens']} tokens, "
+                f"{json_chars / max(stats['chars'], 1):5.1f}x smaller), {stats['shown']}/{stats['nodes']} nodes shown, "
+                f"{stats['encode_ms']:.2f} ms"
+            )
+        report.append(row)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark layout prompt encoding")
+    parser.add_argument("--sizes", nargs="+", default=["1024x768", "1440x3000", "1440x8000"])
+    parser.add_argument("--density", type=float, default=1.5)
+    parser.add_argument("--budgets", nargs="+", type=int, default=[0, 4000, 2000, 1000])
+    parser.add_argument("--grid", type=int, default=8)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.density, args.budgets, args.grid)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,162 @@
+"""
+Import-time and startup-time profile of the backend.
+
+    python benchmarks/bench_startup.py --repeat 3 --top 15
+
+Everything is measured in fresh interpreters so nothing is already imported:
+- import: wall time of `import pipeline` and `import main`, plus the slowest
+  modules by cumulative time from `python -X importtime`,
+- init: building the components one after another (ScreenshotPipeline())
+  vs concurrently (defer_init=True + initialize()), with per-component times,
+- server: a uvicorn process pointed at a fake Ollama; time until it answers
+  HTTP at all and until GET /ready returns 200 (models loaded and warmed up).
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND)
+
+from fake_ollama import FakeOllamaServer
+
+INIT_SCRIPT = """
+import asyncio, json, time
+start = time.perf_counter()
+from pipeline import ScreenshotPipeline
+imported = time.perf_counter() - start
+
+def sequential():
+    start = time.perf_counter()
+    p = ScreenshotPipeline()
+    return time.perf_counter() - start, p.init_times
+
+async def concurrent():
+    start = time.perf_counter()
+    p = ScreenshotPipeline(defer_init=True)
+    await p.initialize()
+    return time.perf_counter() - start, p.init_times
+
+elapsed, components = sequential() if "{mode}" == "sequential" else asyncio.run(concurrent())
+print(json.dumps({{"import_s": imported, "init_s": elapsed, "components": components}}))
+"""
+
+
+def python(code, env=None, args=()):
+    return subprocess.run(
+        [sys.executable, *args, "-c", code], cwd=BACKEND, env=env,
+        capture_output=True, text=True, check=True
+    )
+
+
+def import_wall_time(module, repeat):
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    return min(float(python(code).stdout) for _ in range(repeat))
+
+
+def slowest_imports(module, top):
+    """
+    Parses `-X importtime` output: "import time: self [us] | cumulative | name".
+    """
+    stderr = python(f"import {module}", args=("-X", "importtime")).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), name.rstrip()))
+    rows.sort(reverse=True)
+    return [{"module": name.strip(), "depth": (len(name) - len(name.lstrip())) // 2, "ms": round(us / 1000, 1)}
+            for us, name in rows[:top]]
+
+
+def init_times(mode, repeat):
+    runs = [json.loads(python(INIT_SCRIPT.format(mode=mode)).stdout.splitlines()[-1]) for _ in range(repeat)]
+    return min(runs, key=lambda r: r["init_s"])
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def server_startup(ollama_url, timeout):
+    port = free_port()
+    env = dict(os.environ, OLLAMA_URL=ollama_url)
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    first_response = ready = None
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/ready", timeout=1) as response:
+                    status = response.status
+            except urllib.error.HTTPError as e:
+                status = e.code
+            except OSError:
+                status = None
+            now = time.perf_counter() - start
+            if status is not None and first_response is None:
+                first_response = round(now, 3)
+            if status == 200:
+                ready = round(now, 3)
+                break
+            time.sleep(0.02)
+    finally:
+        server.terminate()
+        server.wait()
+    return {"first_response_s": first_response, "ready_s": ready}
+
+
+def run(args):
+    report = {
+        "import_s": {module: round(import_wall_time(module, args.repeat), 3) for module in ("pipeline", "main")},
+        "slowest_imports": slowest_imports("main", args.top),
+        "init": {mode: init_times(mode, args.repeat) for mode in ("sequential", "concurrent")}
+    }
+
+    # Fake Ollama on its own loop thread so the server subprocess can warm up against it
+    loop = asyncio.new_event_loop()
+    fake = FakeOllamaServer(tokens=["x"], tokens_per_second=0)
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    asyncio.run_coroutine_threadsafe(fake.start(), loop).result()
+    try:
+        report["server"] = server_startup(fake.url, args.timeout)
+    finally:
+        asyncio.run_coroutine_threadsafe(fake.stop(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile import and startup time")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to list")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Seconds to wait for /ready")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    report = run(args)
+    print("import: " + "  ".join(f"{m} {s:.3f}s" for m, s in report["import_s"].items()))
+    for row in report["slowest_imports"]:
+        print(f"  {row['ms']:9.1f} ms  {'  ' * row['depth']}{row['module']}")
+    for mode, result in report["init"].items():
+        parts = "  ".join(f"{name} {s:.2f}s" for name, s in result["components"].items())
+        print(f"init {mode:>10}: {result['init_s']:.2f}s  ({parts})")
+    server = report["server"]
+    print(f"server: first response {server['first_response_s']}s, ready {server['ready_s']}s")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,89 @@
+"""
+Whole-image vs tiled analysis of tall full-page screenshots.
+
+    python benchmarks/bench_tiling.py --sizes 1024x8000 1024x20000 --tile-height 2048
+
+Runs ScreenshotPipeline.process (against a fake LLM) once untiled and once
+per tile height, and reports per-stage time, time until the first band's
+detections are streamed, how many elements/texts come out, and peak memory
+allocated while the conversion runs (tracemalloc, which sees numpy arrays).
+The decoded page itself is the same in every mode and is included.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import create_screenshot, encode_png
+from fake_ollama import FakeOllamaServer
+from pipeline import ScreenshotPipeline
+
+
+async def measure(pipeline, image_bytes):
+    start = time.perf_counter()
+    first_tile = None
+    summary = {}
+    tracemalloc.start()
+    async for update in pipeline.process(image_bytes, "react"):
+        if update["type"] == "error":
+            raise RuntimeError(update["message"])
+        if update["type"] != "status":
+            continue
+        if update["step"] == "tile_complete" and first_tile is None:
+            first_tile = round((time.perf_counter() - start) * 1000, 1)
+        elif update["step"] == "detection_complete":
+            summary["elements"] = update["count"]
+        elif update["step"] == "stage_complete" and update["stage"] == "ocr":
+            summary["texts"] = update["texts"]
+        elif update["step"] == "complete":
+            summary["stages_ms"] = update["timings"]["stages_ms"]
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    summary.update({"first_tile_ms": first_tile, "peak_mb": round(peak / 2 ** 20, 1)})
+    return summary
+
+
+async def run(sizes, tile_heights, overlap):
+    report = []
+    async with FakeOllamaServer(tokens=["<div/>"], tokens_per_second=0) as server:
+        for size in sizes:
+            width, height = map(int, size.split("x"))
+            image_bytes = encode_png(create_screenshot(width, height)[0])
+            for tile_height in [None] + tile_heights:
+                pipeline = ScreenshotPipeline(
+                    cache_size=0, ollama_url=server.url, tile_height=tile_height, tile_overlap=overlap
+                )
+                try:
+                    row = {"size": size, "tile_height": tile_height, **await measure(pipeline, image_bytes)}
+                finally:
+                    pipeline.executor.shutdown()
+                    await pipeline.generator.aclose()
+                report.append(row)
+                stages = "  ".join(
+                    f"{stage} {ms:.0f}" for stage, ms in row["stages_ms"].items() if stage != "generation"
+                )
+                print(
+                    f"{size:>11} tiles {str(tile_height or '-'):>5}: peak {row['peak_mb']:7.1f} MB  "
+                    f"first band {str(row['first_tile_ms'] or '-'):>7} ms  elements {row['elements']:5d}  "
+                    f"texts {row['texts']:5d} | {stages} ms"
+                )
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark tiled processing of tall screenshots")
+    parser.add_argument("--sizes", nargs="+", default=["1024x8000", "1024x20000"])
+    parser.add_argument("--tile-heights", nargs="+", type=int, default=[1024, 2048])
+    parser.add_argument("--overlap", type=int, default=128)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.sizes, args.tile_heights, args.overlap))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
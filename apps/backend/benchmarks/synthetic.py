@@ -0,0 +1,80 @@
+import random
+
+import cv2
+import numpy as np
+
+WORDS = [
+    "Login", "Settings", "Profile", "Dashboard", "Search", "Submit", "Cancel",
+    "Home", "Orders", "Revenue", "Users", "Reports", "Export", "Billing",
+    "Account", "Menu", "Help", "Logout", "Invoices", "Analytics", "Team",
+    "Projects", "Messages", "Calendar", "Upload", "Download", "Save", "Edit"
+]
+
+
+def create_screenshot(width=1024, height=768, density=1.0, seed=0, noise=0.0):
+    """
+    Builds a synthetic UI screenshot: a header bar, then sections of cards with a
+    heading on the page background and cards holding a title, body text and a
+    button. `density` scales how many cards fit per row; `noise` adds Gaussian
+    pixel noise with that standard deviation, like a lossy capture.
+    Returns (BGR image, ground truth) where ground truth is a list of
+    {"text", "box": [x, y, w, h]} for every word drawn.
+    """
+    rng = random.Random(seed)
+    img = np.full((height, width, 3), 245, dtype=np.uint8)
+    truth = []
+
+    def put_text(text, x, y, scale, color, thickness=1):
+        (tw, th), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness)
+        cv2.putText(img, text, (x, y + th), cv2.FONT_HERSHEY_SIMPLEX, scale, color, thickness, cv2.LINE_AA)
+        truth.append({"text": text, "box": [x, y, tw, th + baseline]})
+        return tw
+
+    # Header
+    header_h = max(48, height // 16)
+    cv2.rectangle(img, (0, 0), (width, header_h), (60, 50, 40), -1)
+    x = 16
+    for _ in range(min(6, max(1, width // 180))):
+        x += put_text(rng.choice(WORDS), x, header_h // 3, 0.6, (255, 255, 255)) + 32
+
+    # Card grid
+    columns = max(1, int(round(width / 320 * density)))
+    gap = 16
+    card_w = (width - gap * (columns + 1)) // columns
+    card_h = max(96, int(160 / max(density, 0.25)))
+    y = header_h + gap
+    while y + card_h + 40 < height - gap:
+        put_text(" ".join(rng.sample(WORDS, 2)), gap, y, 0.9, (40, 40, 40), 2)
+        y += 40
+        for col in range(columns):
+            cx = gap + col * (card_w + gap)
+            cv2.rectangle(img, (cx, y), (cx + card_w, y + card_h), (255, 255, 255), -1)
+            cv2.rectangle(img, (cx, y), (cx + card_w, y + card_h), (200, 200, 200), 1)
+            if card_w < 80:
+                continue
+            put_text(rng.choice(WORDS), cx + 12, y + 12, 0.7, (30, 30, 30), 2)
+            line_y = y + 44
+            while line_y + 20 < y + card_h - 40:
+                line_x = cx + 12
+                while True:
+                    word = rng.choice(WORDS).lower()
+                    (tw, _), _ = cv2.getTextSize(word, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
+                    if line_x + tw > cx + card_w - 12:
+                        break
+                    line_x += put_text(word, line_x, line_y, 0.5, (90, 90, 90)) + 10
+                line_y += 22
+            bx, by = cx + 12, y + card_h - 36
+            cv2.rectangle(img, (bx, by), (bx + 90, by + 26), (200, 100, 40), -1)
+            put_text(rng.choice(["Save", "Edit", "Open", "Buy"]), bx + 10, by + 6, 0.5, (255, 255, 255))
+        y += card_h + gap
+
+    if noise:
+        jitter = np.random.default_rng(seed).normal(0, noise, img.shape)
+        img = np.clip(img + jitter, 0, 255).astype(np.uint8)
+
+    return img, truth
+
+
+def encode_png(img):
+    _, buffer = cv2.imencode(".png", img)
+    return buffer.tobytes()
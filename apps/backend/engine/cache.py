@@ -0,0 +1,133 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger("ScreenshotConverter")
+
+
+def hash_image(img):
+    """
+    Content hash of a decoded image (pixels plus shape), so re-encoded copies
+    of the same screenshot share cache entries.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{img.shape}:{img.dtype}".encode("utf-8"))
+    # Hash the buffer in place; only non-contiguous views need a copy
+    digest.update(img if img.flags.c_contiguous else img.tobytes())
+    return digest.hexdigest()
+
+
+def hash_layout(layout_tree):
+    data = json.dumps(layout_tree, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(data.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class ResultCache:
+    """
+    Bounded in-memory LRU cache with an optional on-disk tier.
+    Entries evicted from memory stay on disk and are promoted back on access.
+    get()/put() cover both tiers; callers on an event loop use lookup()/remember()
+    inline and run load()/save() (which pickle) off the loop.
+    """
+
+    def __init__(self, max_entries=64, disk_dir=None):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()
+        # Stages run in worker threads, so guard the LRU bookkeeping
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        name = hashlib.blake2b(repr(key).encode("utf-8"), digest_size=16).hexdigest()
+        return os.path.join(self.disk_dir, f"{name}.pkl")
+
+    def get(self, key):
+        value = self.lookup(key)
+        return value if value is not None else self.load(key)
+
+    def lookup(self, key):
+        """
+        Memory tier only; a miss here is not counted until load() misses too.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        return None
+
+    def load(self, key):
+        """
+        Disk tier: unpickles the entry (blocking) and promotes it to memory.
+        """
+        value = self._load_from_disk(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, value)
+        return value
+
+    def put(self, key, value):
+        self.remember(key, value)
+        self.save(key, value)
+
+    def remember(self, key, value):
+        with self._lock:
+            self._remember(key, value)
+
+    def _remember(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load_from_disk(self, key):
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable cache entry: {e}")
+            return None
+
+    def save(self, key, value):
+        """
+        Writes the entry to the disk tier (blocking), if there is one.
+        """
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        # Saves run in worker threads, so the temp name is per thread too
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            # Atomic rename so concurrent readers never see a partial file
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write cache entry to disk: {e}")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0
+            }
@@ -2,14 +2,47 @@ import cv2
 import numpy as np
 
 class UIElementDetector:
-    def __init__(self):
-        pass
+    def __init__(
+        self,
+        method="contours",
+        min_area=100,
+        min_side=0,
+        max_aspect_ratio=None,
+        glyph_max_side=0,
+        glyph_gap=6,
+        iou_threshold=None,
+        overlap_mode="merge"
+    ):
+        # "contours": outer contours only (small elements inside a bigger one are dropped)
+        # "components": connected-component stats, which also keeps nested elements
+        self.method = method
+        self.min_area = min_area  # Filter out tiny noise
+        self.min_side = min_side
+        self.max_aspect_ratio = max_aspect_ratio
+        # Boxes no bigger than this on both sides are treated as glyphs and
+        # joined with horizontal neighbours into word boxes (0 disables, e.g. 32).
+        # Off by default: both filters add time, and on all but the smallest
+        # synthetic pages of bench_detection.py they leave the layout unchanged
+        self.glyph_max_side = glyph_max_side
+        self.glyph_gap = glyph_gap
+        # Overlapping boxes above this IoU are near-duplicates (None disables, e.g. 0.7);
+        # "merge" replaces them with their union, "suppress" keeps the largest
+        self.iou_threshold = iou_threshold
+        self.overlap_mode = overlap_mode
 
     def detect_elements(self, img):
         """
         Detects UI elements (buttons, inputs, containers) using contour detection.
         Returns a list of dictionaries: [{'type': 'block', 'box': [x, y, w, h]}]
         """
+        elements, _ = self.detect_elements_with_stats(img)
+        return elements
+
+    def detect_elements_with_stats(self, img):
+        """
+        Same as `detect_elements`, plus a dict counting how many raw boxes each
+        filtering step removed.
+        """
         # Convert to grayscale if not already
         if len(img.shape) == 3:
             gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
@@ -18,26 +51,148 @@ class UIElementDetector:
 
         # Adaptive thresholding to find edges/blocks
         thresh = cv2.adaptiveThreshold(
-            gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
+            gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
             cv2.THRESH_BINARY_INV, 11, 2
         )
 
-        # Find contours
-        contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if self.method == "components":
+            boxes, areas = self._component_boxes(thresh)
+        else:
+            boxes, areas = self._contour_boxes(thresh)
 
-        elements = []
-        min_area = 100 # Filter out tiny noise
-        
-        for cnt in contours:
-            area = cv2.contourArea(cnt)
-            if area > min_area:
-                x, y, w, h = cv2.boundingRect(cnt)
-                elements.append({
-                    "type": "block", # Generic type for now, will refine in LayoutEngine
-                    "box": [x, y, w, h]
-                })
+        stats = {"raw": len(boxes)}
+        boxes = self._filter_shapes(boxes, areas, stats)
+        boxes = self._merge_glyphs(boxes, gray.shape, stats)
+        boxes = self._resolve_overlaps(boxes, stats)
+        stats["kept"] = len(boxes)
+        stats["removed"] = stats["raw"] - stats["kept"]
 
         # Sort elements by Y then X to roughly order them top-left to bottom-right
-        elements.sort(key=lambda k: (k['box'][1], k['box'][0]))
-        
-        return elements
+        order = np.lexsort((boxes[:, 0], boxes[:, 1]))
+        elements = [
+            {
+                "type": "block", # Generic type for now, will refine in LayoutEngine
+                "box": box
+            }
+            for box in boxes[order].tolist()
+        ]
+        return elements, stats
+
+    def _contour_boxes(self, thresh):
+        """
+        Bounding boxes and areas of the outer contours, computed for all
+        contours at once instead of calling boundingRect/contourArea per contour.
+        """
+        contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if not contours:
+            return np.empty((0, 4), dtype=np.int64), np.empty(0)
+
+        lengths = np.fromiter((len(c) for c in contours), dtype=np.int64, count=len(contours))
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        points = np.concatenate(contours).reshape(-1, 2).astype(np.int64)
+        xs, ys = points[:, 0], points[:, 1]
+
+        x_min = np.minimum.reduceat(xs, starts)
+        y_min = np.minimum.reduceat(ys, starts)
+        x_max = np.maximum.reduceat(xs, starts)
+        y_max = np.maximum.reduceat(ys, starts)
+        boxes = np.stack([x_min, y_min, x_max - x_min + 1, y_max - y_min + 1], axis=1)
+
+        # Shoelace formula per contour (what cv2.contourArea computes),
+        # each point paired with the next one, wrapping within its contour
+        nxt = np.arange(1, len(points) + 1)
+        nxt[starts + lengths - 1] = starts
+        cross = xs * ys[nxt] - xs[nxt] * ys
+        areas = np.abs(np.add.reduceat(cross, starts)) / 2.0
+        return boxes, areas
+
+    def _component_boxes(self, thresh):
+        count, _, cc_stats, _ = cv2.connectedComponentsWithStats(thresh, connectivity=8)
+        # Row 0 is the background
+        cc_stats = cc_stats[1:count].astype(np.int64)
+        return cc_stats[:, :4], cc_stats[:, cv2.CC_STAT_AREA].astype(np.float64)
+
+    def _filter_shapes(self, boxes, areas, stats):
+        keep = areas > self.min_area
+        stats["small"] = int(np.count_nonzero(~keep))
+        if self.min_side:
+            thin = keep & (boxes[:, 2:].min(axis=1) < self.min_side)
+            stats["small"] += int(np.count_nonzero(thin))
+            keep &= ~thin
+        if self.max_aspect_ratio:
+            w, h = boxes[:, 2], boxes[:, 3]
+            elongated = keep & (np.maximum(w, h) > self.max_aspect_ratio * np.minimum(w, h))
+            stats["aspect"] = int(np.count_nonzero(elongated))
+            keep &= ~elongated
+        return boxes[keep]
+
+    def _merge_glyphs(self, boxes, shape, stats):
+        """
+        Joins glyph-sized boxes that sit next to each other on a line into one box,
+        so a word becomes one element instead of one element per letter.
+        """
+        stats["glyphs_merged"] = 0
+        if not self.glyph_max_side or not len(boxes):
+            return boxes
+        glyph = boxes[:, 2:].max(axis=1) <= self.glyph_max_side
+        if np.count_nonzero(glyph) < 2:
+            return boxes
+
+        # Paint glyph boxes stretched sideways by the gap; touching ones form one
+        # component. The mask only spans the area the glyphs occupy.
+        glyphs = boxes[glyph]
+        half_gap = (self.glyph_gap + 1) // 2
+        left, top = glyphs[:, 0].min(), glyphs[:, 1].min()
+        right = (glyphs[:, 0] + glyphs[:, 2]).max()
+        bottom = (glyphs[:, 1] + glyphs[:, 3]).max()
+        mask = np.zeros((bottom - top, right - left + 2 * half_gap), dtype=np.uint8)
+        for x, y, w, h in (glyphs - [left - half_gap, top, 0, 0]).tolist():
+            mask[y:y + h, x - half_gap:x + w + half_gap] = 255
+        count, labels = cv2.connectedComponents(mask, connectivity=4)
+
+        # Union of the original glyph boxes per component
+        label = labels[glyphs[:, 1] - top, glyphs[:, 0] - left + half_gap]
+        x1 = np.full(count, np.iinfo(np.int64).max)
+        y1 = np.full(count, np.iinfo(np.int64).max)
+        x2 = np.zeros(count, dtype=np.int64)
+        y2 = np.zeros(count, dtype=np.int64)
+        np.minimum.at(x1, label, glyphs[:, 0])
+        np.minimum.at(y1, label, glyphs[:, 1])
+        np.maximum.at(x2, label, glyphs[:, 0] + glyphs[:, 2])
+        np.maximum.at(y2, label, glyphs[:, 1] + glyphs[:, 3])
+        used = np.unique(label)
+        words = np.stack([x1[used], y1[used], x2[used] - x1[used], y2[used] - y1[used]], axis=1)
+
+        stats["glyphs_merged"] = int(np.count_nonzero(glyph)) - len(words)
+        return np.concatenate([boxes[~glyph], words])
+
+    def _resolve_overlaps(self, boxes, stats):
+        """
+        Non-maximum suppression (or merging) of near-duplicate boxes, largest first.
+        """
+        stats["duplicates"] = 0
+        if self.iou_threshold is None or len(boxes) < 2:
+            return boxes
+
+        x1, y1 = boxes[:, 0], boxes[:, 1]
+        x2, y2 = x1 + boxes[:, 2], y1 + boxes[:, 3]
+        areas = boxes[:, 2] * boxes[:, 3]
+        remaining = np.argsort(-areas, kind="stable")
+        kept = []
+        while len(remaining):
+            i, rest = remaining[0], remaining[1:]
+            iw = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+            ih = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+            inter = iw * ih
+            iou = inter / (areas[i] + areas[rest] - inter)
+            duplicate = iou >= self.iou_threshold
+            group = np.concatenate(([i], rest[duplicate]))
+            if self.overlap_mode == "merge":
+                left, top = x1[group].min(), y1[group].min()
+                kept.append([left, top, x2[group].max() - left, y2[group].max() - top])
+            else:
+                kept.append(boxes[i].tolist())
+            remaining = rest[~duplicate]
+
+        stats["duplicates"] = len(boxes) - len(kept)
+        return np.array(kept, dtype=np.int64).reshape(-1, 4)
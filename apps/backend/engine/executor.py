@@ -0,0 +1,141 @@
+import asyncio
+import functools
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+logger = logging.getLogger("ScreenshotConverter")
+
+# OCR is by far the heaviest stage; without a cap a burst of uploads would
+# occupy every worker with OCR and queue the cheap stages behind it.
+DEFAULT_STAGE_LIMITS = {"ocr": 1}
+
+# Per worker-process state for process mode: component factories passed in by the
+# pool initializer, and the components they build (on first use).
+_worker_factories = {}
+_worker_components = {}
+
+
+def _init_worker(factories):
+    _worker_factories.update(factories)
+
+
+def _call_component(name, method, args, kwargs):
+    component = _worker_components.get(name)
+    if component is None:
+        component = _worker_components[name] = _worker_factories[name]()
+    return getattr(component, method)(*args, **kwargs)
+
+
+class _RemoteMethod:
+    def __init__(self, component, name):
+        # What StageExecutor._prepare_call reads off a bound method
+        self.__self__ = component
+        self.__name__ = name
+
+    def __call__(self, *args, **kwargs):
+        raise RuntimeError(f"{self.__self__.name}.{self.__name__} only runs in the worker processes")
+
+
+class RemoteComponent:
+    """
+    Parent-side stand-in for a component that, in process mode, is only built
+    inside the workers. Its methods can be passed to StageExecutor.run() but
+    not called directly.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __getattr__(self, method):
+        if method.startswith("_"):
+            raise AttributeError(method)
+        return _RemoteMethod(self, method)
+
+
+class StageExecutor:
+    """
+    Runs blocking pipeline stages off the event loop.
+
+    mode="thread" uses a thread pool, which suits OpenCV and torch since both
+    release the GIL during heavy work. mode="process" uses a process pool; methods
+    of registered components then run against copies built inside each worker.
+    `stage_limits` caps how many calls of a given stage may run at once.
+    """
+
+    def __init__(self, mode="thread", max_workers=None, stage_limits=None):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown executor mode: {mode}")
+        self.mode = mode
+        self.max_workers = max_workers or os.cpu_count() or 4
+        self.stage_limits = {**DEFAULT_STAGE_LIMITS, **(stage_limits or {})}
+        self._semaphores = {
+            stage: asyncio.Semaphore(limit) for stage, limit in self.stage_limits.items() if limit
+        }
+        self._components = {}
+        self._factories = {}
+        self._pool = None
+
+    def register(self, name, component, factory):
+        """
+        Registers a pipeline component. In process mode, calls to its bound
+        methods are routed to an instance built by `factory` (a picklable
+        zero-argument callable, usually the class) inside the worker.
+        """
+        self._components[id(component)] = name
+        self._factories[name] = factory
+
+    def _get_pool(self):
+        # Created lazily so no threads or processes exist before they are needed
+        # (and before a forking server has forked)
+        if self._pool is None:
+            if self.mode == "process":
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    initializer=_init_worker,
+                    initargs=(dict(self._factories),)
+                )
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="pipeline-stage"
+                )
+            logger.info(f"Started {self.mode} pool with {self.max_workers} workers")
+        return self._pool
+
+    def _prepare_call(self, fn, args, kwargs):
+        if self.mode == "process":
+            # Zero-copy views over uploads can't be pickled; the pickle copies anyway
+            args = tuple(bytes(arg) if isinstance(arg, memoryview) else arg for arg in args)
+            name = self._components.get(id(getattr(fn, "__self__", None)))
+            if name is not None:
+                return functools.partial(_call_component, name, fn.__name__, args, kwargs)
+        return functools.partial(fn, *args, **kwargs)
+
+    async def run(self, stage, fn, *args, **kwargs):
+        """
+        Runs `fn(*args, **kwargs)` in the pool, respecting the limit for `stage`.
+        """
+        return await self._submit(stage, self._get_pool(), self._prepare_call(fn, args, kwargs))
+
+    async def run_local(self, stage, fn, *args, **kwargs):
+        """
+        Like run(), but always in a thread of this process, for blocking work on
+        in-process state (e.g. cache files). Uses the pool in thread mode and
+        the event loop's default executor in process mode.
+        """
+        pool = self._get_pool() if self.mode == "thread" else None
+        return await self._submit(stage, pool, functools.partial(fn, *args, **kwargs))
+
+    async def _submit(self, stage, pool, call):
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(stage)
+        if semaphore is None:
+            return await loop.run_in_executor(pool, call)
+        async with semaphore:
+            return await loop.run_in_executor(pool, call)
+
+    def shutdown(self, wait=True):
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
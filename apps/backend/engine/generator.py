@@ -1,51 +1,392 @@
+import asyncio
 import logging
 import json
-import requests
+import re
+import time
+import httpx
+
+from engine.layout_encoder import LayoutEncoder, SCHEMA_DESCRIPTION
+from engine.layout_engine import count_nodes
 
 logger = logging.getLogger("ScreenshotConverter")
 
-class CodeGenerator:
-    def __init__(self, model_id="gemma3n:e4b"):
-        self.model_id = model_id
-        self.api_url = "http://localhost:11434/api/chat"
-        logger.info(f"Initialized CodeGenerator with Ollama model: {self.model_id}")
+# Bump whenever the prompts (or how sections are stitched) change so cached
+# generations are not reused
+PROMPT_VERSION = "3"
 
-    async def generate_code_stream(self, layout_tree, framework="react"):
-        """
-        Generates code from the layout tree using the Ollama LLM.
-        Yields chunks of generated code.
-        """
-        # 1. Construct Prompt
-        # Flatten tree to string for the prompt
-        layout_str = json.dumps(layout_tree, indent=2)
-        
-        if framework == "html":
-            system_prompt = """You are an expert Frontend Developer specializing in HTML and Tailwind CSS.
-You will be provided with a JSON representation of a UI layout.
-Your task is to generate a single, valid HTML file that implements this layout.
+SYSTEM_PROMPTS = {
+    "html": """You are an expert Frontend Developer specializing in HTML and Tailwind CSS.
+You will be provided with a representation of a UI layout.
+""" + SCHEMA_DESCRIPTION + """Your task is to generate a single, valid HTML file that implements this layout.
 - Use Tailwind CSS via CDN (<script src="https://cdn.tailwindcss.com"></script>).
 - Use FontAwesome or SVG for icons if needed (e.g., <link ... font-awesome>).
 - Ensure the code is self-contained in a single <html> file.
 - Do not wrap the code in markdown blocks (```). Just output the raw HTML code.
-"""
-            user_prompt = f"""Generate HTML+Tailwind Code for the following Layout:
-{layout_str}
-"""
-        else:
-            # Default to React
-            system_prompt = """You are an expert Frontend Developer specializing in React and Tailwind CSS.
-You will be provided with a JSON representation of a UI layout.
-Your task is to generate valid, modern React code that implements this layout.
+""",
+    # Default
+    "react": """You are an expert Frontend Developer specializing in React and Tailwind CSS.
+You will be provided with a representation of a UI layout.
+""" + SCHEMA_DESCRIPTION + """Your task is to generate valid, modern React code that implements this layout.
 - Use functional components.
 - Use Tailwind CSS for styling.
 - Use the 'lucide-react' library for icons if mentioned in text (e.g., 'Settings', 'Menu').
 - Ensure the code is self-contained and runnable.
 - Do not wrap the code in markdown blocks (```). Just output the code.
 """
-            user_prompt = f"""Generate React Code for the following Layout:
-{layout_str}
+}
+
+USER_PROMPTS = {
+    "html": "Generate HTML+Tailwind Code for the following Layout:\n{layout}\n",
+    "react": "Generate React Code for the following Layout:\n{layout}\n"
+}
+
+# Sectioned mode: each top-level section of the page becomes its own component
+SECTION_SYSTEM_PROMPTS = {
+    "html": """You are an expert Frontend Developer specializing in HTML and Tailwind CSS.
+You will be provided with a representation of one section of a UI layout; the sections are stacked top to bottom to form the page.
+""" + SCHEMA_DESCRIPTION + """Your task is to write the HTML for this section only.
+- Output a single <section> element styled with Tailwind CSS classes.
+- Do not include <html>, <head>, <body> or <script> tags; the surrounding page already loads Tailwind CSS.
+- Use SVG for icons if needed.
+- Do not wrap the code in markdown blocks (```). Just output the raw HTML code.
+""",
+    "react": """You are an expert Frontend Developer specializing in React and Tailwind CSS.
+You will be provided with a representation of one section of a UI layout; the sections are stacked top to bottom to form the page.
+""" + SCHEMA_DESCRIPTION + """Your task is to write one React function component for this section only.
+- Give it exactly the requested name and do not export it.
+- Use Tailwind CSS for styling.
+- Do not write import statements. React is in scope and 'lucide-react' icons are available as <Icons.Name /> (e.g., <Icons.Menu />).
+- Do not wrap the code in markdown blocks (```). Just output the code.
 """
+}
 
+SECTION_USER_PROMPTS = {
+    "html": "Generate HTML+Tailwind Code for section {index} of {count} of the page, with the following Layout:\n{layout}\n",
+    "react": "Generate the React component `{name}` for section {index} of {count} of the page, with the following Layout:\n{layout}\n"
+}
+
+HTML_PAGE_HEAD = """<!DOCTYPE html>
+<html lang="en">
+<head>
+  <meta charset="UTF-8">
+  <meta name="viewport" content="width=device-width, initial-scale=1.0">
+  <script src="https://cdn.tailwindcss.com"></script>
+</head>
+<body>
+"""
+
+def split_sections(layout_tree, max_sections):
+    """
+    Groups the root's top-level children, top to bottom, into at most
+    `max_sections` consecutive sections of roughly equal node count.
+    Returns one layout tree (a root over the section's children) per section.
+    """
+    children = sorted(layout_tree.get("children", []), key=lambda child: (child["box"][1], child["box"][0]))
+    if max_sections < 2 or len(children) < 2:
+        return [layout_tree]
+    sizes = [count_nodes(child) for child in children]
+    target = sum(sizes) / min(max_sections, len(children))
+    groups = [[]]
+    filled = 0
+    for child, size in zip(children, sizes):
+        if groups[-1] and filled + size / 2 > target * len(groups) and len(groups) < max_sections:
+            groups.append([])
+        groups[-1].append(child)
+        filled += size
+    sections = []
+    for group in groups:
+        top = min(child["box"][1] for child in group)
+        bottom = max(child["box"][1] + child["box"][3] for child in group)
+        box = [layout_tree["box"][0], top, layout_tree["box"][2], bottom - top]
+        sections.append({**layout_tree, "box": box, "children": group})
+    return sections
+
+SECTION_DECLARATIONS = ("function ", "function*", "async function ", "const ", "let ", "var ", "class ")
+# A top-level React component declaration, by the capitalized-name convention
+COMPONENT_DECLARATION = re.compile(r"(?:async\s+)?(?:function\s*\*?\s*|class\s+|(?:const|let|var)\s+)([A-Z][\w$]*)")
+
+def _ends_statement(stripped):
+    # An import ends with its module string, optionally followed by ";"
+    return stripped.endswith(";") or re.search(r"['\"]$", stripped) is not None
+
+class _SectionFilter:
+    """
+    Turns one generated section into its part of the stitched file, a line
+    at a time. Stitching supplies the imports, the page shell and the file's
+    one default export, and models add them anyway: markdown fences and whole
+    import statements are dropped and `export` is stripped. Also finds the
+    section's component (its default export, else its first capitalized
+    top-level declaration) so the stitched file can bind it to its name.
+    """
+
+    def __init__(self):
+        self.in_import = False
+        self.exported = None
+        self.declared = None
+
+    @property
+    def component(self):
+        return self.exported or self.declared
+
+    def __call__(self, line):
+        stripped = line.strip()
+        if self.in_import:
+            self.in_import = not _ends_statement(stripped)
+            return None
+        if stripped.startswith("```"):
+            return None
+        if stripped.startswith("import ") or stripped.startswith("import{"):
+            self.in_import = not _ends_statement(stripped)
+            return None
+        indent = line[:len(line) - len(line.lstrip())]
+        if stripped.startswith("export "):
+            default = re.match(r"export\s+default\s+", stripped)
+            rest = stripped[default.end():] if default else re.sub(r"^export\s+", "", stripped)
+            if rest.startswith("{"):
+                # e.g. "export { Section1 };" declares nothing
+                return None
+            if default and re.fullmatch(r"[A-Za-z_$][\w$]*;?", rest):
+                # e.g. "export default Hero;" names the component
+                self.exported = rest.rstrip(";")
+                return None
+            if default and not rest.startswith(SECTION_DECLARATIONS):
+                # An anonymous default export, e.g. "export default () => ("
+                rest = re.sub(r"^((?:async\s+)?function\s*\*?|class)\s*(?=[({])", r"\1 Component", rest)
+                if not rest.startswith(SECTION_DECLARATIONS):
+                    rest = f"const Component = {rest}"
+            if default and self.exported is None:
+                match = COMPONENT_DECLARATION.match(rest)
+                self.exported = match.group(1) if match else None
+            line = indent + rest
+        if self.declared is None and not indent:
+            match = COMPONENT_DECLARATION.match(line)
+            if match:
+                self.declared = match.group(1)
+        return line
+
+class ErrorChunk(str):
+    """
+    A generated chunk that is really an error message. Streamed like any
+    other chunk, but lets callers tell failed generations apart (e.g. to avoid caching them).
+    """
+
+class CodeGenerator:
+    def __init__(
+        self,
+        model_id="gemma3n:e4b",
+        api_url="http://localhost:11434/api/chat",
+        connect_timeout=5.0,
+        read_timeout=120.0,
+        max_connections=8,
+        max_concurrent_generations=2,
+        layout_encoder=None,
+        keep_alive="30m",
+        max_sections=0,
+        executor=None
+    ):
+        self.model_id = model_id
+        self.api_url = api_url
+        # Generous read timeout: the model may think for a while between tokens
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections
+        )
+        # Caps how many generations hit the model server at once; the rest wait here
+        self.generation_slots = asyncio.Semaphore(max_concurrent_generations)
+        # How long Ollama keeps the model loaded after each request, so it is
+        # not evicted between bursts (Ollama duration string or seconds; -1 = forever)
+        self.keep_alive = keep_alive
+        # Serializes the layout tree into the prompt within a token budget
+        self.layout_encoder = layout_encoder or LayoutEncoder()
+        # Above 1, pages are split into up to this many top-level sections that
+        # are generated concurrently (within generation_slots) and stitched together
+        self.max_sections = max_sections
+        # A StageExecutor to encode layouts off the event loop (inline without one)
+        self.executor = executor
+        self._client = None
+        logger.info(f"Initialized CodeGenerator with Ollama model: {self.model_id}")
+
+    def _get_client(self):
+        # Created lazily so the pool is bound to the running event loop
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+        return self._client
+
+    async def aclose(self):
+        """
+        Closes the pooled HTTP connections to Ollama.
+        """
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def warm_up(self):
+        """
+        Loads the model into Ollama memory and primes it with the static system
+        prompts by generating a single token per framework.
+        Raises on connection errors or a non-200 status.
+        """
+        client = self._get_client()
+        for framework, system_prompt in SYSTEM_PROMPTS.items():
+            start = time.perf_counter()
+            response = await client.post(self.api_url, json={
+                "model": self.model_id,
+                "messages": [{"role": "system", "content": system_prompt}],
+                "stream": False,
+                "keep_alive": self.keep_alive,
+                "options": {"num_predict": 1}
+            })
+            if response.status_code != 200:
+                raise RuntimeError(f"Ollama returned status {response.status_code} during warm-up")
+            logger.info(f"Primed {self.model_id} with the {framework} prompt in {time.perf_counter() - start:.2f}s")
+
+    @staticmethod
+    def _record_stats(stats, done_message, tokens, first_token):
+        # Ollama reports exact counts in the final message; otherwise each
+        # streamed chunk is roughly one token
+        tokens = done_message.get("eval_count", tokens)
+        eval_duration = done_message.get("eval_duration")
+        if eval_duration:
+            seconds = eval_duration / 1e9
+        else:
+            seconds = time.perf_counter() - first_token if first_token is not None else 0
+        stats["tokens"] = tokens
+        stats["tokens_per_second"] = round(tokens / seconds, 2) if seconds > 0 else None
+
+    async def generate_code_stream(self, layout_tree, framework="react", stats=None):
+        """
+        Generates code from the layout tree using the Ollama LLM.
+        Yields chunks of generated code.
+        With `max_sections` set, the page's sections are generated concurrently
+        and stitched into one file, streamed in page order.
+        If `stats` is a dict it is filled with time to first token (ms),
+        generated token count and tokens per second.
+        """
+        if stats is None:
+            stats = {}
+        sections = split_sections(layout_tree, self.max_sections)
+        if len(sections) > 1:
+            async for chunk in self._generate_sections(sections, framework, stats):
+                yield chunk
+            return
+
+        # 1. Construct Prompt
+        layout_str = await self._encode_layout(layout_tree)
+        system_prompt = SYSTEM_PROMPTS.get(framework, SYSTEM_PROMPTS["react"])
+        user_prompt = USER_PROMPTS.get(framework, USER_PROMPTS["react"]).format(layout=layout_str)
+
+        async for chunk in self._complete(system_prompt, user_prompt, stats):
+            yield chunk
+
+    async def _encode_layout(self, layout_tree):
+        # Flatten tree to a compact, token-budgeted string for the prompt
+        if self.executor is not None:
+            layout_str, encoding = await self.executor.run(
+                "encoding", self.layout_encoder.encode_with_stats, layout_tree
+            )
+        else:
+            layout_str, encoding = self.layout_encoder.encode_with_stats(layout_tree)
+        logger.info(
+            f"Layout prompt: {encoding['chars']} chars (~{encoding['tokens']} tokens, "
+            f"{encoding['shown']}/{encoding['nodes']} nodes written out)"
+        )
+        if logger.isEnabledFor(logging.DEBUG):
+            # Serializes the whole tree again, so only when asked for
+            logger.debug(f"Layout as indented JSON would be {len(json.dumps(layout_tree, indent=2))} chars")
+        return layout_str
+
+    async def _generate_sections(self, sections, framework, stats):
+        """
+        Generates one component per section concurrently and yields the
+        stitched file: the page head, each section in page order (the topmost
+        unfinished one streams live, later ones are buffered until it is done),
+        then the page tail.
+        """
+        if framework not in SECTION_SYSTEM_PROMPTS:
+            framework = "react"
+        names = [f"Section{index + 1}" for index in range(len(sections))]
+        outputs = [asyncio.Queue() for _ in sections]
+        section_stats = [{} for _ in sections]
+        logger.info(f"Generating {len(sections)} {framework} sections concurrently...")
+
+        async def generate_section(index):
+            section_filter = _SectionFilter()
+            # React sections get their own scope, so names the model reuses
+            # across sections don't clash, which evaluates to the component
+            scoped = framework == "react"
+            indent = "  " if scoped else ""
+
+            def emit(line):
+                line = section_filter(line)
+                if line is not None:
+                    outputs[index].put_nowait((indent + line if line.strip() else "") + "\n")
+
+            try:
+                if scoped:
+                    outputs[index].put_nowait(f"const {names[index]} = (() => {{\n")
+                user_prompt = SECTION_USER_PROMPTS[framework].format(
+                    name=names[index], index=index + 1, count=len(sections),
+                    layout=await self._encode_layout(sections[index])
+                )
+                pending = ""
+                async for chunk in self._complete(
+                    SECTION_SYSTEM_PROMPTS[framework], user_prompt, section_stats[index]
+                ):
+                    if isinstance(chunk, ErrorChunk):
+                        outputs[index].put_nowait(chunk)
+                        continue
+                    # Filtered line by line, so a section streams a line at a time
+                    *lines, pending = (pending + chunk).split("\n")
+                    for line in lines:
+                        emit(line)
+                if pending:
+                    emit(pending)
+            finally:
+                if scoped:
+                    outputs[index].put_nowait(f"  return {section_filter.component or '() => null'};\n}})();\n")
+                outputs[index].put_nowait(None)
+
+        start = time.perf_counter()
+        first_token = None
+        tasks = [asyncio.create_task(generate_section(index)) for index in range(len(sections))]
+        try:
+            if framework == "html":
+                yield HTML_PAGE_HEAD
+            else:
+                yield "import React from 'react';\nimport * as Icons from 'lucide-react';\n\n"
+            for index in range(len(sections)):
+                while (chunk := await outputs[index].get()) is not None:
+                    if first_token is None:
+                        first_token = time.perf_counter()
+                        stats["ttft_ms"] = round((first_token - start) * 1000, 2)
+                    yield chunk
+                yield "\n"
+            # Surfaces anything that went wrong outside the completion itself
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        if framework == "html":
+            yield "</body>\n</html>\n"
+        else:
+            yield "export default function App() {\n  return (\n    <div className=\"min-h-screen\">\n"
+            yield "".join(f"      <{name} />\n" for name in names)
+            yield "    </div>\n  );\n}\n"
+
+        tokens = sum(section.get("tokens", 0) for section in section_stats)
+        seconds = time.perf_counter() - first_token if first_token is not None else 0
+        stats["tokens"] = tokens
+        # Throughput of all sections together, which is what sectioning buys
+        stats["tokens_per_second"] = round(tokens / seconds, 2) if seconds > 0 else None
+        stats["sections"] = len(sections)
+
+    async def _complete(self, system_prompt, user_prompt, stats):
+        """
+        Streams one chat completion from Ollama, filling `stats`.
+        Errors are yielded as an ErrorChunk instead of raised.
+        """
         payload = {
             "model": self.model_id,
             "messages": [
@@ -53,41 +394,57 @@ Your task is to generate valid, modern React code that implements this layout.
                 {"role": "user", "content": user_prompt}
             ],
             "stream": True,
+            "keep_alive": self.keep_alive,
             "options": {
                 "temperature": 0.2
             }
         }
 
         try:
-            logger.info("Sending request to Ollama...")
-            # Connect to Ollama
-            # Note: We use requests (synchronous) here. In a high-concurrency async app, 
-            # this should be `httpx` or run in an executor, but for this local tool it is fine.
-            with requests.post(self.api_url, json=payload, stream=True) as response:
-                if response.status_code != 200:
-                    error_msg = f"// Error: Ollama returned status {response.status_code}\n// {response.text}\n"
-                    logger.error(error_msg)
-                    yield error_msg
-                    return
-
-                for line in response.iter_lines():
-                    if line:
-                        try:
-                            json_response = json.loads(line)
-                            if "message" in json_response:
-                                content = json_response["message"].get("content", "")
-                                if content:
-                                    yield content
-                            if json_response.get("done", False):
-                                break
-                        except json.JSONDecodeError:
-                            continue
+            async with self.generation_slots:
+                logger.info("Sending request to Ollama...")
+                start = time.perf_counter()
+                first_token = None
+                tokens = 0
+                # Leaving this block early (e.g. the task is cancelled because the
+                # client went away) closes the response, which aborts the generation
+                async with self._get_client().stream("POST", self.api_url, json=payload) as response:
+                    if response.status_code != 200:
+                        body = (await response.aread()).decode("utf-8", errors="replace")
+                        error_msg = f"// Error: Ollama returned status {response.status_code}\n// {body}\n"
+                        logger.error(error_msg)
+                        yield ErrorChunk(error_msg)
+                        return
+
+                    async for line in response.aiter_lines():
+                        if line:
+                            try:
+                                json_response = json.loads(line)
+                                if "message" in json_response:
+                                    content = json_response["message"].get("content", "")
+                                    if content:
+                                        if first_token is None:
+                                            first_token = time.perf_counter()
+                                            stats["ttft_ms"] = round((first_token - start) * 1000, 2)
+                                        tokens += 1
+                                        yield content
+                                if json_response.get("done", False):
+                                    self._record_stats(stats, json_response, tokens, first_token)
+                                    # Drain the (empty) remainder instead of breaking so the
+                                    # connection goes back to the pool for reuse
+                                    continue
+                            except json.JSONDecodeError:
+                                continue
             logger.info("Ollama generation complete.")
-                            
-        except requests.exceptions.ConnectionError:
-            msg = "// Error: Could not connect to Ollama. Is it running at http://localhost:11434?\n"
+
+        except httpx.ConnectError:
+            msg = f"// Error: Could not connect to Ollama. Is it running at {self.api_url}?\n"
+            logger.error(msg)
+            yield ErrorChunk(msg)
+        except httpx.TimeoutException:
+            msg = "// Error: Timed out waiting for Ollama.\n"
             logger.error(msg)
-            yield msg
+            yield ErrorChunk(msg)
         except Exception as e:
             logger.error(f"Generation failed: {e}")
-            yield f"// Error generating code: {e}\n"
+            yield ErrorChunk(f"// Error generating code: {e}\n")
@@ -0,0 +1,108 @@
+import hashlib
+
+import cv2
+import numpy as np
+
+
+def tile_hashes(image, tile_size):
+    """
+    64-bit content hash of every `tile_size` x `tile_size` tile (edge tiles
+    are smaller). Returns a (rows, cols) uint64 array.
+    """
+    height, width = image.shape[:2]
+    rows, cols = -(-height // tile_size), -(-width // tile_size)
+    hashes = np.empty((rows, cols), dtype=np.uint64)
+    for row in range(rows):
+        strip = image[row * tile_size:(row + 1) * tile_size]
+        for col in range(cols):
+            tile = strip[:, col * tile_size:(col + 1) * tile_size]
+            digest = hashlib.blake2b(tile.tobytes(), digest_size=8).digest()
+            hashes[row, col] = int.from_bytes(digest, "little")
+    return hashes
+
+
+def changed_boxes(previous, current, tile_size, shape, margin=0):
+    """
+    Boxes [x, y, w, h] around each group of touching tiles whose hashes
+    differ, in pixels and grown by `margin`. Also returns the changed share
+    of the tiles.
+    """
+    mask = (previous != current).astype(np.uint8)
+    height, width = shape[:2]
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    boxes = []
+    # Row 0 is the unchanged background
+    for tx, ty, tw, th, _ in stats[1:count]:
+        x0, y0 = max(0, tx * tile_size - margin), max(0, ty * tile_size - margin)
+        x1 = min(width, (tx + tw) * tile_size + margin)
+        y1 = min(height, (ty + th) * tile_size + margin)
+        boxes.append([int(x0), int(y0), int(x1 - x0), int(y1 - y0)])
+    return boxes, float(mask.mean()) if mask.size else 0.0
+
+
+def _intersects(a, b):
+    return a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and a[1] < b[1] + b[3] and b[1] < a[1] + a[3]
+
+
+def touches_changes(item, boxes):
+    return any(_intersects(item["box"], box) for box in boxes)
+
+
+def plan_rescans(boxes, items):
+    """
+    Full-width row spans [(y0, y1), ...] to analyze again: one per changed
+    box, stretched to hold every previous element or text it touches (so
+    none is seen cut off), with overlapping spans merged.
+    Full width keeps detection at the same scale as on the whole page.
+    """
+    spans = []
+    for box in boxes:
+        y0, y1 = box[1], box[1] + box[3]
+        for item in items:
+            if _intersects(item["box"], box):
+                y0 = min(y0, item["box"][1])
+                y1 = max(y1, item["box"][1] + item["box"][3])
+        spans.append((y0, y1))
+    return merge_spans(spans)
+
+
+def merge_spans(spans):
+    merged = []
+    for y0, y1 in sorted(spans):
+        if merged and y0 <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], y1))
+        else:
+            merged.append((y0, y1))
+    return merged
+
+
+def splice(previous, fresh, boxes):
+    """
+    The previous frame's items clear of every changed box, plus the freshly
+    analyzed items that touch one.
+    """
+    kept = [item for item in previous if not touches_changes(item, boxes)]
+    return kept + [item for item in fresh if touches_changes(item, boxes)]
+
+
+class SessionState:
+    """
+    What a websocket session remembers of its last analyzed upload (tile
+    hashes, detections and OCR results in page coordinates), so that the next,
+    slightly changed upload only re-analyzes the regions that changed.
+    """
+
+    def __init__(self):
+        self.shape = None
+        self.hashes = None
+        self.elements = []
+        self.texts = []
+
+    def matches(self, shape, hashes):
+        return self.hashes is not None and self.shape == shape and self.hashes.shape == hashes.shape
+
+    def remember(self, shape, hashes, elements, texts):
+        self.shape = shape
+        self.hashes = hashes
+        self.elements = elements
+        self.texts = texts
@@ -0,0 +1,188 @@
+import json
+import math
+from collections import deque
+
+# Included in the system prompts so the model can read the encoded layout
+SCHEMA_DESCRIPTION = """The layout is given in a compact indented format, one element per line:
+- `page WxH` is the screenshot; every other line is nested under it by indentation (one space per level).
+- `C x,y,w,h` is a container box, `T x,y,w,h "text"` is a piece of text. Coordinates are in pixels, rounded to a grid.
+- `[+N nodes: "a" "b"]` after an element stands for N nested elements left out for brevity, with a sample of their text.
+- `... [+N nodes]` stands for N more elements after the preceding siblings.
+"""
+
+
+class _Node:
+    __slots__ = ("kind", "box", "text", "children", "depth", "size", "texts", "shown")
+
+    def __init__(self, kind, box, text, depth):
+        self.kind = kind
+        self.box = box
+        self.text = text
+        self.children = []
+        self.depth = depth
+        self.size = 0  # descendants
+        self.texts = []  # first few descendant texts, in document order
+        self.shown = None  # children written out in full; None keeps the node summarized
+
+
+class LayoutEncoder:
+    """
+    Serializes a layout tree into the terse text format described by
+    SCHEMA_DESCRIPTION. Empty fields are dropped, chains of single-child
+    containers collapse into their outermost box and coordinates are snapped
+    to `grid` pixels. To stay within `token_budget` (estimated at
+    `chars_per_token`), nodes are expanded breadth first while they fit;
+    whatever is left, the deeper subtrees, stays summarized as one line each.
+    """
+
+    def __init__(self, grid=8, token_budget=2000, chars_per_token=4.0, summary_texts=3, max_text_length=80):
+        self.grid = grid
+        self.token_budget = token_budget
+        self.chars_per_token = chars_per_token
+        self.summary_texts = summary_texts
+        self.max_text_length = max_text_length
+
+    def encode(self, layout_tree):
+        return self.encode_with_stats(layout_tree)[0]
+
+    def encode_with_stats(self, layout_tree):
+        """
+        Returns (encoded layout, stats) where stats has the node count after
+        compaction, how many of them are written out and the estimated tokens.
+        """
+        nodes = self._compact(layout_tree)
+        self._summarize(nodes)
+        shown = self._expand(nodes[0])
+        text = "\n".join(self._render(nodes[0]))
+        stats = {
+            "nodes": len(nodes) - 1,
+            "shown": shown,
+            "chars": len(text),
+            "tokens": self.estimate_tokens(text)
+        }
+        return text, stats
+
+    def estimate_tokens(self, text):
+        return math.ceil(len(text) / self.chars_per_token)
+
+    def _snap(self, value, minimum=0):
+        if not self.grid:
+            return int(value)
+        return max(minimum, int(round(value / self.grid)) * self.grid)
+
+    def _compact(self, layout_tree):
+        """
+        Converts the layout dicts into _Nodes listed in pre-order, pruning
+        empty text and collapsing single-child container chains on the way down.
+        """
+        root = _Node("page", layout_tree["box"], None, 0)
+        nodes = []
+        stack = [(root, layout_tree.get("children") or [])]
+        while stack:
+            node, raw_children = stack.pop()
+            nodes.append(node)
+            # Reading order (the layout lists children largest first), so what
+            # the budget cuts off is the end of the page
+            for child in sorted(raw_children, key=lambda c: (c["box"][1], c["box"][0])):
+                text = (child.get("text") or "").strip()
+                grandchildren = child.get("children") or []
+                if child.get("type") == "text":
+                    if not text:
+                        continue
+                    kind = "T"
+                else:
+                    kind = "C"
+                    # A wrapper whose only child is another bare container adds
+                    # nothing but nesting: keep the outer box, adopt the inner children
+                    while not text and len(grandchildren) == 1 and grandchildren[0].get("type") == "container" \
+                            and not grandchildren[0].get("text"):
+                        grandchildren = grandchildren[0].get("children") or []
+                x, y, w, h = child["box"]
+                box = (self._snap(x), self._snap(y), self._snap(w, self.grid), self._snap(h, self.grid))
+                node.children.append(_Node(kind, box, text[:self.max_text_length], node.depth + 1))
+                stack.append((node.children[-1], grandchildren))
+            # Children were pushed in order; reverse them so they pop in order
+            pushed = len(node.children)
+            if pushed > 1:
+                stack[-pushed:] = stack[-pushed:][::-1]
+        return nodes
+
+    def _summarize(self, nodes):
+        # Reverse pre-order sees every child before its parent
+        for node in reversed(nodes):
+            for child in node.children:
+                node.size += 1 + child.size
+                if len(node.texts) < self.summary_texts:
+                    if child.text:
+                        node.texts.append(child.text)
+                    node.texts.extend(child.texts[:self.summary_texts - len(node.texts)])
+
+    def _line(self, node, summarize):
+        if node.kind == "page":
+            line = f"page {node.box[2]}x{node.box[3]}"
+        else:
+            line = f"{' ' * (node.depth - 1)}{node.kind} {','.join(map(str, node.box))}"
+        if node.text:
+            line += " " + json.dumps(node.text, ensure_ascii=False)
+        if summarize and node.size:
+            sample = "".join(" " + json.dumps(text, ensure_ascii=False) for text in node.texts)
+            line += f" [+{node.size} nodes:{sample}]" if sample else f" [+{node.size} nodes]"
+        return line
+
+    def _rest_line(self, depth, count):
+        return f"{' ' * (depth - 1)}... [+{count} nodes]"
+
+    def _expand(self, root):
+        """
+        Expands nodes in breadth-first order while the output stays within
+        the budget. Children of a node are admitted in order until one no
+        longer fits; the rest collapse into a trailing `...` line.
+        Returns how many nodes (root excluded) got a line of their own.
+        """
+        budget = self.token_budget * self.chars_per_token if self.token_budget else float("inf")
+        total = len(self._line(root, True))
+        shown = 0
+        queue = deque([root])
+        while queue:
+            node = queue.popleft()
+            if not node.children:
+                continue
+            # Swapping the summary for the full line frees the `[+N nodes]` suffix
+            base = total - len(self._line(node, True)) + len(self._line(node, False))
+            remaining = node.size
+            admitted = 0
+            for child in node.children:
+                cost = len(self._line(child, True)) + 1
+                left = remaining - 1 - child.size
+                rest = len(self._rest_line(child.depth, left)) + 1 if left else 0
+                if base + cost + rest > budget:
+                    break
+                base += cost
+                remaining = left
+                admitted += 1
+            if not admitted:
+                continue
+            if admitted < len(node.children):
+                base += len(self._rest_line(node.depth + 1, remaining)) + 1
+            node.shown = admitted
+            total = base
+            shown += admitted
+            queue.extend(node.children[:admitted])
+        return shown
+
+    def _render(self, root):
+        stack = [root]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                yield item
+                continue
+            node = item
+            if node.shown is None:
+                yield self._line(node, True)
+                continue
+            yield self._line(node, False)
+            hidden = node.children[node.shown:]
+            if hidden:
+                stack.append(self._rest_line(node.depth + 1, sum(1 + child.size for child in hidden)))
+            stack.extend(reversed(node.children[:node.shown]))
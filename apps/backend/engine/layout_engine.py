@@ -1,6 +1,9 @@
 class LayoutEngine:
-    def __init__(self):
-        pass
+    def __init__(self, min_cell_size=32, index_min_nodes=2000):
+        # Finest cell size of the spatial index used to find containing boxes
+        self.min_cell_size = min_cell_size
+        # Below this many boxes a plain descent from the root is faster than the index
+        self.index_min_nodes = index_min_nodes
 
     def build_layout(self, elements, ocr_data, img_width, img_height):
         """
@@ -41,31 +44,115 @@ class LayoutEngine:
             "children": []
         }
 
-        # Iterative insertion into tree
-        remaining_nodes = nodes.copy()
-        
-        # Basic O(N^2) insertion for now
-        # We start with the root. For each node, we try to put it into the deepest possible child of root.
-        
-        def is_contained(inner, outer):
-            ix, iy, iw, ih = inner['box']
-            ox, oy, ow, oh = outer['box']
-            return (ix >= ox) and (iy >= oy) and (ix + iw <= ox + ow) and (iy + ih <= oy + oh)
+        # Containment tree, built without recursion.
+        # Each node goes under the parent it would reach by descending from the
+        # root and always entering the first (earliest inserted) child that
+        # contains it.
+        nodes = [
+            node for node in nodes
+            # Skip nodes that are basically the whole image
+            if not (node['box'][2] > img_width * 0.95 and node['box'][3] > img_height * 0.95)
+        ]
+        if len(nodes) < self.index_min_nodes:
+            _insert_by_descent(root, nodes)
+        else:
+            _insert_by_index(root, nodes, self.min_cell_size)
+        return root
+
+
+def count_nodes(node):
+    """
+    Number of nodes in a layout tree, `node` included.
+    """
+    # Iterative: deeply nested layouts would hit the recursion limit
+    count, stack = 0, [node]
+    while stack:
+        count += 1
+        stack.extend(stack.pop().get("children", []))
+    return count
 
-        def insert_node(parent, node):
-            # Try to find a child of parent that contains this node
+
+def _contains(outer, inner):
+    ox, oy, ow, oh = outer
+    ix, iy, iw, ih = inner
+    return ox <= ix and oy <= iy and ix + iw <= ox + ow and iy + ih <= oy + oh
+
+
+def _insert_by_descent(root, nodes):
+    # Walks the tree per node: cheapest for the few hundred boxes of a typical page
+    for node in nodes:
+        box = node['box']
+        parent = root
+        descended = True
+        while descended:
+            descended = False
             for child in parent['children']:
-                if is_contained(node, child):
-                    insert_node(child, node)
-                    return
-            
-            # If no child contains it, add it to this parent
-            parent['children'].append(node)
+                if _contains(child['box'], box):
+                    parent, descended = child, True
+                    break
+        parent['children'].append(node)
 
-        for node in nodes:
-            # Skip nodes that are basically the whole image
-            if node['box'][2] > img_width * 0.95 and node['box'][3] > img_height * 0.95:
-                continue
-            insert_node(root, node)
 
-        return root
+def _insert_by_index(root, nodes, min_cell_size):
+    # The spatial index finds every inserted box containing the node; the
+    # descent is then replayed over just those candidates
+    index = _ContainmentIndex(min_cell_size)
+    inserted = []  # node dicts, by insertion order
+    parent_of = []  # insertion order of each node's parent, -1 for root
+
+    for node in nodes:
+        # Children are inserted after their parent, so in insertion order the
+        # first candidate under the current parent is the child to enter next
+        parent = -1
+        for order in sorted(index.containing(node['box'])):
+            if parent_of[order] == parent:
+                parent = order
+
+        (root if parent == -1 else inserted[parent])['children'].append(node)
+        index.add(node['box'], len(inserted))
+        inserted.append(node)
+        parent_of.append(parent)
+
+
+class _ContainmentIndex:
+    """
+    Hierarchical grid over boxes for "which boxes contain this box" queries.
+    A box lives on the first level whose cell size is at least its larger side,
+    in the cell holding its top-left corner. Any box containing a query box
+    contains its top-left corner, so per level only that corner's cell and its
+    left/upper neighbours need checking, and levels finer than the query box
+    can be skipped entirely.
+    """
+
+    def __init__(self, min_cell_size=32):
+        self.min_cell_size = min_cell_size
+        self.levels = {}  # level -> {(cx, cy): [(box, value), ...]}
+
+    def _level_for(self, w, h):
+        level = 0
+        size = self.min_cell_size
+        while size < max(w, h):
+            size *= 2
+            level += 1
+        return level, size
+
+    def add(self, box, value):
+        x, y, w, h = box
+        level, size = self._level_for(w, h)
+        cells = self.levels.setdefault(level, {})
+        cells.setdefault((x // size, y // size), []).append((box, value))
+
+    def containing(self, box):
+        ix, iy, iw, ih = box
+        min_level, _ = self._level_for(iw, ih)
+        found = []
+        for level, cells in self.levels.items():
+            if level < min_level:
+                continue
+            size = self.min_cell_size << level
+            cx, cy = ix // size, iy // size
+            for key in ((cx, cy), (cx - 1, cy), (cx, cy - 1), (cx - 1, cy - 1)):
+                for (ox, oy, ow, oh), value in cells.get(key, ()):
+                    if ox <= ix and oy <= iy and ix + iw <= ox + ow and iy + ih <= oy + oh:
+                        found.append(value)
+        return found
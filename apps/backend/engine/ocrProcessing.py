@@ -1,38 +1,79 @@
-import easyocr
 import numpy as np
 import logging
 
+from engine.ocr_backends import create_backend
+
 logger = logging.getLogger("ScreenshotConverter")
 
 class OCRProcessor:
-    def __init__(self, lang_list=['en']):
-        logger.info("Initializing EasyOCR Reader...")
-        # gpu=True requires CUDA. If no CUDA, set gpu=False or catch exception.
-        try:
-            self.reader = easyocr.Reader(lang_list, gpu=True)
-        except Exception as e:
-            logger.warning(f"EasyOCR GPU initialization failed: {e}. Falling back to CPU.")
-            self.reader = easyocr.Reader(lang_list, gpu=False)
-        logger.info("EasyOCR initialized.")
-
-    def extract_text(self, img, elements=None):
+    def __init__(
+        self,
+        lang_list=['en'],
+        mode="full",
+        region_padding=4,
+        min_region_width=8,
+        min_region_height=8,
+        min_region_std=6.0,
+        line_height_max=48,
+        batch_size=16,
+        backend="easyocr",
+        backend_options=None
+    ):
+        logger.info(f"Initializing OCR backend {backend}...")
+        # "easyocr" or "easyocr-cpu" (int8 recognizer, explicit threads); see engine/ocr_backends.py
+        self.backend = backend
+        self.reader = create_backend(backend, lang_list, **(backend_options or {}))
+        logger.info("OCR initialized.")
+
+        # "full" runs detection + recognition over the whole image;
+        # "regions" only looks inside the boxes found by UIElementDetector
+        self.mode = mode
+        self.region_padding = region_padding
+        self.min_region_width = min_region_width
+        self.min_region_height = min_region_height
+        self.min_region_std = min_region_std
+        self.line_height_max = line_height_max
+        # Text lines recognized per forward pass
+        self.batch_size = batch_size
+
+    def extract_text(self, img, elements=None, mode=None):
         """
         Extracts text from the image.
-        If elements are provided, we could map text to elements.
-        For now, we'll return a dictionary mapping box tuples to text.
+        `elements` must be in the same (original image) coordinates as `img`.
+        In "regions" mode only those element regions are read; if that yields no
+        usable regions we fall back to full-image OCR.
+        Returns a list of {"text", "confidence", "box": [x, y, w, h]}.
         """
         # EasyOCR expects RGB or Grayscale
         # If OpenCV image (BGR), convert to RGB
         import cv2
+        mode = mode or self.mode
+        if mode == "regions" and elements:
+            results = self._extract_regions(img, elements)
+            if results is not None:
+                return results
+
         if len(img.shape) == 3:
             img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
         else:
             img_rgb = img
 
-        # Run OCR on the full image for now to catch everything contextually
-        # detail=1 returns [box, text, confidence]
-        results = self.reader.readtext(img_rgb, detail=1)
+        # Run OCR on the full image to catch everything contextually
+        results = self.reader.readtext(img_rgb, batch_size=self.batch_size)
+        return self._to_boxes(results)
 
+    def warm_up(self):
+        """
+        Reads a tiny rendered word so the first real request does not pay for
+        lazy model setup (weights to device, first forward passes).
+        Returns the number of texts found.
+        """
+        import cv2
+        img = np.full((48, 160, 3), 255, dtype=np.uint8)
+        cv2.putText(img, "Warm up", (8, 32), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 0, 0), 2)
+        return len(self.extract_text(img, mode="full"))
+
+    def _to_boxes(self, results):
         extracted_data = []
         for res in results:
             box, text, conf = res
@@ -44,7 +85,7 @@ class OCRProcessor:
             y_max = max(p[1] for p in box)
             w = x_max - x_min
             h = y_max - y_min
-            
+
             extracted_data.append({
                 "text": text,
                 "confidence": float(conf),
@@ -52,3 +93,59 @@ class OCRProcessor:
             })
 
         return extracted_data
+
+    def merge_regions(self, shape, elements):
+        """
+        Pads element boxes and merges the ones that touch, so glyph fragments
+        join into words/lines and nested boxes collapse into their container.
+        Returns merged [x, y, w, h] boxes.
+        """
+        import cv2
+        h, w = shape[:2]
+        pad = self.region_padding
+        mask = np.zeros((h, w), dtype=np.uint8)
+        for el in elements:
+            x, y, bw, bh = el["box"]
+            cv2.rectangle(mask, (x - pad, y - pad), (x + bw + pad, y + bh + pad), 255, -1)
+        count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=4)
+        # Row 0 is the background
+        return [list(map(int, stats[i, :4])) for i in range(1, count)]
+
+    def _extract_regions(self, img, elements):
+        """
+        Region-batched OCR: short regions go straight to batched recognition as
+        text lines, taller ones get text detection on their crop only.
+        Returns None when no region is worth reading.
+        """
+        import cv2
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if len(img.shape) == 3 else img
+
+        horizontal_list = []
+        free_list = []
+        skipped = 0
+        for x, y, w, h in self.merge_regions(gray.shape, elements):
+            crop = gray[y:y + h, x:x + w]
+            # Too small to hold text, or flat background
+            if w < self.min_region_width or h < self.min_region_height or crop.std() < self.min_region_std:
+                skipped += 1
+                continue
+
+            if h <= self.line_height_max:
+                horizontal_list.append([x, x + w, y, y + h])
+                continue
+
+            crop_horizontal, crop_free = self.reader.detect(crop)
+            for x_min, x_max, y_min, y_max in crop_horizontal[0]:
+                horizontal_list.append([x_min + x, x_max + x, y_min + y, y_max + y])
+            for poly in crop_free[0]:
+                free_list.append([[px + x, py + y] for px, py in poly])
+
+        logger.info(
+            f"Region OCR: {len(horizontal_list) + len(free_list)} text boxes, "
+            f"{skipped} regions skipped"
+        )
+        if not horizontal_list and not free_list:
+            return None
+
+        results = self.reader.recognize(gray, horizontal_list, free_list, batch_size=self.batch_size)
+        return self._to_boxes(results)
@@ -0,0 +1,95 @@
+import logging
+
+logger = logging.getLogger("ScreenshotConverter")
+
+
+class EasyOCRBackend:
+    """
+    Stock EasyOCR: tries the GPU and falls back to the CPU with EasyOCR's defaults.
+    Backends expose EasyOCR's readtext/detect/recognize calls and result format,
+    so OCRProcessor works the same on top of any of them.
+    """
+
+    def __init__(self, lang_list):
+        # Imported here: easyocr pulls in torch, which takes seconds to import
+        import easyocr
+        # gpu=True requires CUDA. If no CUDA, set gpu=False or catch exception.
+        try:
+            self.reader = easyocr.Reader(lang_list, gpu=True)
+        except Exception as e:
+            logger.warning(f"EasyOCR GPU initialization failed: {e}. Falling back to CPU.")
+            self.reader = easyocr.Reader(lang_list, gpu=False)
+
+    def readtext(self, img, batch_size=1):
+        # detail=1 returns [box, text, confidence]
+        return self.reader.readtext(img, detail=1, batch_size=batch_size)
+
+    def detect(self, img):
+        return self.reader.detect(img)
+
+    def recognize(self, img, horizontal_list, free_list, batch_size=1):
+        return self.reader.recognize(
+            img, horizontal_list=horizontal_list, free_list=free_list, detail=1, batch_size=batch_size
+        )
+
+
+class CPUEasyOCRBackend(EasyOCRBackend):
+    """
+    EasyOCR tuned for CPU-only nodes: the recognizer's LSTM and linear layers
+    are dynamically quantized to int8 (`quantize=False` keeps them fp32), torch
+    runs with an explicit thread count, and `canvas_size` caps the image size
+    text detection works at.
+    """
+
+    def __init__(self, lang_list, threads=None, quantize=True, canvas_size=2560):
+        import easyocr
+        import torch
+        self.torch = torch
+        self.threads = threads
+        self.canvas_size = canvas_size
+        if threads:
+            torch.set_num_threads(threads)
+        # EasyOCR's own quantize flag is applied implicitly on CPU; do it here instead
+        # so the setting is explicit and the same across EasyOCR versions
+        self.reader = easyocr.Reader(lang_list, gpu=False, quantize=False)
+        if quantize:
+            self.reader.recognizer = torch.quantization.quantize_dynamic(
+                self.reader.recognizer, {torch.nn.LSTM, torch.nn.Linear}, dtype=torch.qint8
+            )
+        logger.info(
+            f"CPU OCR backend: recognizer {'int8' if quantize else 'fp32'}, "
+            f"{threads or torch.get_num_threads()} threads, canvas {canvas_size}px"
+        )
+
+    def _pin_threads(self):
+        # torch's thread count is process-wide and may have been changed since
+        # (e.g. by a forking server pinning threads per worker)
+        if self.threads and self.torch.get_num_threads() != self.threads:
+            self.torch.set_num_threads(self.threads)
+
+    def readtext(self, img, batch_size=1):
+        self._pin_threads()
+        return self.reader.readtext(img, detail=1, batch_size=batch_size, canvas_size=self.canvas_size)
+
+    def detect(self, img):
+        self._pin_threads()
+        return self.reader.detect(img, canvas_size=self.canvas_size)
+
+    def recognize(self, img, horizontal_list, free_list, batch_size=1):
+        self._pin_threads()
+        return super().recognize(img, horizontal_list, free_list, batch_size)
+
+
+OCR_BACKENDS = {
+    "easyocr": EasyOCRBackend,
+    "easyocr-cpu": CPUEasyOCRBackend
+}
+
+
+def create_backend(name, lang_list, **options):
+    """
+    Builds the OCR backend registered as `name` with backend-specific `options`.
+    """
+    if name not in OCR_BACKENDS:
+        raise ValueError(f"Unknown OCR backend: {name}")
+    return OCR_BACKENDS[name](lang_list, **options)
@@ -1,3 +1,5 @@
+import threading
+
 import cv2
 import numpy as np
 
@@ -9,18 +11,36 @@ class ScreenshotProcessor:
         clahe_clip=2.0,
         clahe_grid=(8, 8),
         sharpen_strength=1.0,
-        crop_margin=0.02
+        crop_margin=0.02,
+        profile="color"
     ):
         self.fixed_width = fixed_width
         self.clahe_clip = clahe_clip
         self.clahe_grid = clahe_grid
         self.sharpen_strength = sharpen_strength
         self.crop_margin = crop_margin
+        # "color": full-color enhancement (`preprocess`)
+        # "detection": grayscale fast path (`preprocess_gray`), which is all detection needs
+        self.profile = profile
 
-        self.clahe = cv2.createCLAHE(
-            clipLimit=self.clahe_clip,
-            tileGridSize=self.clahe_grid
-        )
+        # cv2.CLAHE keeps scratch buffers between calls, so each worker thread
+        # gets its own (see `clahe`)
+        self._local = threading.local()
+        self.sharpen_kernel = np.array([
+            [0, -1, 0],
+            [-1, 5 + self.sharpen_strength, -1],
+            [0, -1, 0]
+        ], dtype=np.float32)
+
+    @property
+    def clahe(self):
+        clahe = getattr(self._local, "clahe", None)
+        if clahe is None:
+            clahe = self._local.clahe = cv2.createCLAHE(
+                clipLimit=self.clahe_clip,
+                tileGridSize=self.clahe_grid
+            )
+        return clahe
 
     def resize_fixed_width(self, img):
         h, w = img.shape[:2]
@@ -43,26 +63,91 @@ class ScreenshotProcessor:
             return self.clahe.apply(img)
 
     def mild_sharpen(self, img):
-        kernel = np.array([
-            [0, -1, 0],
-            [-1, 5 + self.sharpen_strength, -1],
-            [0, -1, 0]
-        ])
-        return cv2.filter2D(img, -1, kernel)
+        return cv2.filter2D(img, -1, self.sharpen_kernel)
 
-    def crop_outer_background(self, img):
+    def crop_outer_background(self, img, crop_vertical=True):
         h, w = img.shape[:2]
         dx = int(w * self.crop_margin)
-        dy = int(h * self.crop_margin)
+        dy = int(h * self.crop_margin) if crop_vertical else 0
         return img[dy:h - dy, dx:w - dx]
 
-    def preprocess(self, img):
+    def get_transform(self, shape, crop_vertical=True):
+        """
+        Describes how `preprocess` maps the original image onto the processed one,
+        as {"scale", "offset_x", "offset_y"} with offsets in original pixels:
+        original = processed / scale + offset.
+        """
+        h, w = shape[:2]
+        scale = self.fixed_width / w
+        new_h = int(h * scale)
+        return {
+            "scale": scale,
+            "offset_x": int(self.fixed_width * self.crop_margin) / scale,
+            "offset_y": int(new_h * self.crop_margin) / scale if crop_vertical else 0
+        }
+
+    def preprocess(self, img, crop_vertical=True):
         """
         Full preprocessing pipeline:
         Resize → CLAHE → Sharpen → Crop
+        `crop_vertical=False` keeps the top and bottom rows (for bands of a
+        tiled page, whose cut edges are not outer background).
         """
         img = self.resize_fixed_width(img)
         contrast = self.apply_clahe(img)
         sharpened = self.mild_sharpen(contrast)
-        final = self.crop_outer_background(sharpened)
+        final = self.crop_outer_background(sharpened, crop_vertical)
         return final
+
+    def preprocess_gray(self, img, crop_vertical=True):
+        """
+        Detection fast path: Crop → Gray → Resize → CLAHE → Sharpen.
+        Cropping first is a free view, every later step touches a single
+        channel, and the last two steps reuse one scratch buffer.
+        Returns (processed grayscale image, transform) where the transform maps
+        processed coordinates back: original = processed / scale + offset.
+        """
+        h, w = img.shape[:2]
+        dx = int(w * self.crop_margin)
+        dy = int(h * self.crop_margin) if crop_vertical else 0
+        cropped = img[dy:h - dy, dx:w - dx]
+
+        gray = cv2.cvtColor(cropped, cv2.COLOR_BGR2GRAY) if len(img.shape) == 3 else cropped
+        scale = self.fixed_width / w
+        size = (max(1, round(gray.shape[1] * scale)), max(1, round(gray.shape[0] * scale)))
+        resized = cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+
+        contrast = self.clahe.apply(resized)
+        # The resized buffer is no longer needed; sharpen into it
+        sharpened = cv2.filter2D(contrast, -1, self.sharpen_kernel, dst=resized)
+        return sharpened, {"scale": scale, "offset_x": dx, "offset_y": dy}
+
+    def preprocess_for_detection(self, img, crop_vertical=True):
+        """
+        Runs the configured profile and returns (processed image, transform).
+        """
+        if self.profile == "detection":
+            return self.preprocess_gray(img, crop_vertical)
+        return self.preprocess(img, crop_vertical), self.get_transform(img.shape, crop_vertical)
+
+
+def map_boxes_to_original(elements, transform):
+    """
+    Maps element boxes from processed-image coordinates back into the
+    original image using a transform from `get_transform`.
+    """
+    scale = transform["scale"]
+    ox, oy = transform["offset_x"], transform["offset_y"]
+    mapped = []
+    for el in elements:
+        x, y, w, h = el["box"]
+        mapped.append({
+            **el,
+            "box": [
+                int(round(x / scale + ox)),
+                int(round(y / scale + oy)),
+                int(round(w / scale)),
+                int(round(h / scale))
+            ]
+        })
+    return mapped
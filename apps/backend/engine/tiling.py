@@ -0,0 +1,175 @@
+def plan_bands(height, tile_height, overlap):
+    """
+    Splits the rows [0, height) into horizontal bands of `tile_height` rows,
+    each overlapping the previous one by `overlap` rows.
+    Returns [(y0, y1), ...].
+    """
+    if tile_height <= overlap:
+        raise ValueError("tile_height must be larger than the overlap")
+    bands = []
+    y0 = 0
+    while True:
+        y1 = min(height, y0 + tile_height)
+        bands.append((y0, y1))
+        if y1 >= height:
+            return bands
+        y0 = y1 - overlap
+
+
+def offset_boxes(items, dy):
+    """
+    Shifts the boxes of elements or texts down by `dy` (band to page coordinates).
+    """
+    return [{**item, "box": [item["box"][0], item["box"][1] + dy, item["box"][2], item["box"][3]]} for item in items]
+
+
+def _iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    iw = min(ax + aw, bx + bw) - max(ax, bx)
+    ih = min(ay + ah, by + bh) - max(ay, by)
+    if iw <= 0 or ih <= 0:
+        return 0.0
+    inter = iw * ih
+    return inter / (aw * ah + bw * bh - inter)
+
+
+def _x_overlap(a, b):
+    # IoU of the horizontal extents only
+    inter = min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0])
+    if inter <= 0:
+        return 0.0
+    return inter / (max(a[0] + a[2], b[0] + b[2]) - min(a[0], b[0]))
+
+
+def _contains(outer, inner, tolerance):
+    ox, oy, ow, oh = outer
+    ix, iy, iw, ih = inner
+    return (ox - tolerance <= ix and oy - tolerance <= iy
+            and ix + iw <= ox + ow + tolerance and iy + ih <= oy + oh + tolerance)
+
+
+def _union(a, b):
+    x0, y0 = min(a[0], b[0]), min(a[1], b[1])
+    x1, y1 = max(a[0] + a[2], b[0] + b[2]), max(a[1] + a[3], b[1] + b[3])
+    return [x0, y0, x1 - x0, y1 - y0]
+
+
+class TileMerger:
+    """
+    Merges per-band detection and OCR results of a tiled page, band by band,
+    into one set in page coordinates.
+
+    Results near a band boundary wait until the next band has been added:
+    - elements seen by both bands (same box, or a fragment cut by one band's
+      edge inside the other's full box) are unioned into one,
+    - elements taller than the overlap, cut in both bands, are joined across
+      the boundary when their horizontal extents line up,
+    - text touching a band edge is dropped, since the neighbouring band reads
+      the whole line (the overlap must be taller than a text line), and text
+      read twice in the overlap keeps the more confident reading.
+    """
+
+    def __init__(self, bands, iou_threshold=0.5, edge_tolerance=2):
+        self.bands = bands
+        self.iou_threshold = iou_threshold
+        self.edge_tolerance = edge_tolerance
+        self.elements = []
+        self.texts = []
+        self._pending = []  # [element, touches the band's bottom edge]
+        self._pending_texts = []
+
+    def add(self, index, elements, texts):
+        """
+        Adds the results of band `index`, already in page coordinates.
+        Returns (elements, texts) that became final: nothing in later bands
+        can still merge with them.
+        """
+        y0, y1 = self.bands[index]
+        last = index == len(self.bands) - 1
+        tolerance = self.edge_tolerance
+
+        def cut_top(box):
+            return index > 0 and box[1] <= y0 + tolerance
+
+        def cut_bottom(box):
+            return not last and box[1] + box[3] >= y1 - tolerance
+
+        previous_y1 = self.bands[index - 1][1] if index else y0
+        pieces = self._merge_elements(
+            [(el, cut_top(el["box"])) for el in elements], previous_y1, cut_bottom
+        )
+        merged_texts = self._merge_texts(
+            [t for t in texts if not cut_top(t["box"]) and not cut_bottom(t["box"])]
+        )
+
+        # Whatever reaches into the next band's rows may still meet a duplicate there
+        next_y0 = float("inf") if last else self.bands[index + 1][0]
+        settled = [el for el, _ in pieces if el["box"][1] + el["box"][3] <= next_y0]
+        self._pending = [[el, bottom] for el, bottom in pieces if el["box"][1] + el["box"][3] > next_y0]
+        settled_texts = [t for t in merged_texts if t["box"][1] + t["box"][3] <= next_y0]
+        self._pending_texts = [t for t in merged_texts if t["box"][1] + t["box"][3] > next_y0]
+
+        self.elements.extend(settled)
+        self.texts.extend(settled_texts)
+        return settled, settled_texts
+
+    def _same_element(self, old, old_bottom, new, new_top):
+        a, b = old["box"], new["box"]
+        if _iou(a, b) >= self.iou_threshold:
+            return True
+        if old_bottom and new_top and (
+            _x_overlap(a, b) >= self.iou_threshold
+            or _contains((a[0], 0, a[2], 1), (b[0], 0, b[2], 1), self.edge_tolerance)
+            or _contains((b[0], 0, b[2], 1), (a[0], 0, a[2], 1), self.edge_tolerance)
+        ):
+            # Pieces of an element taller than the overlap; an outline cut on
+            # both sides shows up as separate side pieces within its width
+            return True
+        # A fragment cut by one band's edge, seen whole by the other band
+        return (old_bottom and _contains(b, a, self.edge_tolerance)) or \
+            (new_top and _contains(a, b, self.edge_tolerance))
+
+    def _merge_elements(self, new, previous_y1, cut_bottom):
+        previous = self._pending
+        items = [el for el, _ in previous] + [el for el, _ in new]
+        group = list(range(len(items)))
+
+        def find(i):
+            while group[i] != i:
+                group[i] = group[group[i]]
+                i = group[i]
+            return i
+
+        for j, (element, top) in enumerate(new, start=len(previous)):
+            # Only pieces starting inside the overlap can match the previous band
+            if element["box"][1] >= previous_y1:
+                continue
+            for i, (old, old_bottom) in enumerate(previous):
+                if self._same_element(old, old_bottom, element, top):
+                    group[find(j)] = find(i)
+
+        merged = {}
+        current = set()  # groups holding a piece of this band
+        for i, item in enumerate(items):
+            root = find(i)
+            merged[root] = {**merged[root], "box": _union(merged[root]["box"], item["box"])} if root in merged else item
+            if i >= len(previous):
+                current.add(root)
+        # Groups only from the previous band (nothing joined them) are final as they are
+        return [(el, root in current and cut_bottom(el["box"])) for root, el in merged.items()]
+
+    def _merge_texts(self, new):
+        previous = self._pending_texts
+        kept = []
+        for text in new:
+            for i, old in enumerate(previous):
+                if old is None or _iou(old["box"], text["box"]) < self.iou_threshold:
+                    continue
+                # The same line read by both bands: keep the more confident reading
+                if old.get("confidence", 0) >= text.get("confidence", 0):
+                    text = old
+                previous[i] = None
+            kept.append(text)
+        kept.extend(filter(None, previous))
+        return kept
@@ -0,0 +1,189 @@
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+logger = logging.getLogger("ScreenshotConverter")
+
+DEFAULT_TOKENS = [
+    "import React from 'react';\n",
+    "\n",
+    "export default function App() {\n",
+    "  return (\n",
+    "    <div className=\"p-4\">Hello</div>\n",
+    "  );\n",
+    "}\n",
+]
+
+
+class FakeOllamaServer:
+    """
+    Minimal stand-in for Ollama's streaming /api/chat endpoint.
+    Streams `tokens` as NDJSON at `tokens_per_second` and keeps counters
+    (connections, requests, cancellations, peak concurrency) for tests and benchmarks.
+    """
+
+    def __init__(self, tokens=None, tokens_per_second=200.0, status=200, host="127.0.0.1", port=0):
+        self.tokens = list(tokens) if tokens is not None else list(DEFAULT_TOKENS)
+        self.tokens_per_second = tokens_per_second
+        self.status = status
+        self.host = host
+        self.port = port
+        self.connections = 0
+        self.requests = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.active = 0
+        self.max_active = 0
+        self.payloads = []
+        self._server = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/api/chat"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"Fake Ollama listening on {self.url}")
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def _read_request(self, reader):
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        body = await reader.readexactly(int(headers.get("content-length", 0)))
+        return request_line.decode("latin-1").split()[:2], body
+
+    async def _handle_connection(self, reader, writer):
+        self.connections += 1
+        try:
+            # Keep-alive: serve requests until the client closes the connection
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                (method, path), body = request
+                self.requests += 1
+                if method != "POST" or path != "/api/chat":
+                    await self._send_simple(writer, 404, b"not found")
+                    continue
+                payload = json.loads(body or b"{}")
+                self.payloads.append(payload)
+                if self.status != 200:
+                    await self._send_simple(writer, self.status, b"fake error")
+                    continue
+                if payload.get("stream", True) is False:
+                    await self._send_chat(writer, payload)
+                    continue
+                if not await self._stream_chat(reader, writer, payload):
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _send_simple(self, writer, status, body):
+        writer.write(
+            f"HTTP/1.1 {status} Error\r\nContent-Type: text/plain\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+
+    async def _send_chat(self, writer, payload):
+        # Non-streaming reply: the whole response as one JSON object
+        limit = payload.get("options", {}).get("num_predict", -1)
+        tokens = self.tokens if limit < 0 else self.tokens[:limit]
+        body = json.dumps({
+            "model": payload.get("model"),
+            "message": {"role": "assistant", "content": "".join(tokens)},
+            "done": True,
+            "eval_count": len(tokens)
+        }).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+        self.completed += 1
+
+    async def _stream_chat(self, reader, writer, payload):
+        """
+        Streams one chat response. Returns False if the client hung up mid-stream.
+        """
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        # A client that aborts the stream closes its socket; reading EOF tells us
+        hangup = asyncio.ensure_future(reader.read(1))
+        delay = 1.0 / self.tokens_per_second if self.tokens_per_second else 0
+        try:
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                b"Transfer-Encoding: chunked\r\n\r\n"
+            )
+            start = time.perf_counter()
+            for token in self.tokens:
+                await asyncio.wait({hangup}, timeout=delay)
+                if hangup.done():
+                    self.cancelled += 1
+                    return False
+                self._write_chunk(writer, {"model": payload.get("model"), "message": {"role": "assistant", "content": token}, "done": False})
+                await writer.drain()
+            self._write_chunk(writer, {
+                "model": payload.get("model"), "message": {"role": "assistant", "content": ""}, "done": True,
+                # Same accounting fields Ollama reports (durations in nanoseconds)
+                "eval_count": len(self.tokens), "eval_duration": int((time.perf_counter() - start) * 1e9)
+            })
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+            self.completed += 1
+            return True
+        except ConnectionError:
+            self.cancelled += 1
+            return False
+        finally:
+            self.active -= 1
+            hangup.cancel()
+            try:
+                await hangup
+            except (asyncio.CancelledError, ConnectionError):
+                pass
+
+    def _write_chunk(self, writer, obj):
+        data = json.dumps(obj).encode("utf-8") + b"\n"
+        writer.write(f"{len(data):x}\r\n".encode("latin-1") + data + b"\r\n")
+
+
+async def _serve(args):
+    server = FakeOllamaServer(tokens_per_second=args.tokens_per_second, host=args.host, port=args.port)
+    await server.start()
+    print(f"Fake Ollama serving at {server.url}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a fake Ollama /api/chat server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    asyncio.run(_serve(parser.parse_args()))
@@ -1,12 +1,21 @@
+import asyncio
+import contextlib
+import json
 import logging
+import os
 import uvicorn
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, UploadFile, File, Form, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, UploadFile, File, Form, HTTPException, Request
 import traceback
 
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 # Import our pipeline
-from pipeline import ScreenshotPipeline
+from pipeline import ScreenshotPipeline, parse_frameworks
+from admission import AdmissionController, QueueFull
+from streaming import coalesce_chunks
+from engine.incremental import SessionState
+import metrics
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -24,42 +33,249 @@ app.add_middleware(
 
 # Initialize pipeline (Global singleton to avoid reloading models)
 pipeline = None
+# Limits how many conversions run and wait at once
+admission = None
+# Batching of code_chunk messages on the websocket
+chunk_coalescing = {}
+# Result of the startup warm-up; None while it is still running
+warmup_status = None
+# Background model loading and warm-up
+startup_task = None
+
+def parse_keep_alive(value):
+    # Ollama takes a duration string ("30m") or a number of seconds; a bare
+    # number in a string ("-1") is rejected, so send those as numbers
+    return int(value) if value.lstrip("-").isdigit() else value
+
+def ocr_backend_options(backend):
+    # Only the CPU backend takes options
+    if backend != "easyocr-cpu":
+        return {}
+    return {
+        "threads": int(os.getenv("PIPELINE_OCR_THREADS", "0")) or None,
+        "quantize": os.getenv("PIPELINE_OCR_QUANTIZE", "1") == "1",
+        "canvas_size": int(os.getenv("PIPELINE_OCR_CANVAS_SIZE", "2560"))
+    }
+
+def create_pipeline(defer_init=True):
+    """
+    Builds the pipeline from the PIPELINE_* / OLLAMA_* environment variables.
+    """
+    logger.info("Initializing Screenshot Pipeline...")
+    ocr_backend = os.getenv("PIPELINE_OCR_BACKEND", "easyocr")
+    return ScreenshotPipeline(
+        executor_mode=os.getenv("PIPELINE_EXECUTOR", "thread"),
+        max_workers=int(os.getenv("PIPELINE_WORKERS", "0")) or None,
+        stage_limits={"ocr": int(os.getenv("PIPELINE_OCR_CONCURRENCY", "1"))},
+        cache_size=int(os.getenv("PIPELINE_CACHE_SIZE", "64")),
+        cache_dir=os.getenv("PIPELINE_CACHE_DIR") or None,
+        ocr_mode=os.getenv("PIPELINE_OCR_MODE", "full"),
+        ocr_backend=ocr_backend,
+        ocr_backend_options=ocr_backend_options(ocr_backend),
+        ocr_batch_size=int(os.getenv("PIPELINE_OCR_BATCH_SIZE", "16")),
+        detection_method=os.getenv("PIPELINE_DETECTION_METHOD", "contours"),
+        detection_glyph_max_side=int(os.getenv("PIPELINE_DETECTION_GLYPH_MAX_SIDE", "0")),
+        detection_iou_threshold=float(os.getenv("PIPELINE_DETECTION_IOU", "0")) or None,
+        reduced_decode=os.getenv("PIPELINE_REDUCED_DECODE", "0") == "1",
+        incremental_tile=int(os.getenv("PIPELINE_INCREMENTAL_TILE", "64")),
+        incremental_max_changed=float(os.getenv("PIPELINE_INCREMENTAL_MAX_CHANGED", "0.5")),
+        preprocess_profile=os.getenv("PIPELINE_PREPROCESS_PROFILE", "detection"),
+        ollama_url=os.getenv("OLLAMA_URL"),
+        prompt_token_budget=int(os.getenv("PIPELINE_PROMPT_TOKENS", "2000")),
+        layout_grid=int(os.getenv("PIPELINE_LAYOUT_GRID", "8")),
+        keep_alive=parse_keep_alive(os.getenv("OLLAMA_KEEP_ALIVE", "30m")),
+        generation_sections=int(os.getenv("PIPELINE_GENERATION_SECTIONS", "0")),
+        llm_concurrency=int(os.getenv("PIPELINE_LLM_CONCURRENCY", "2")),
+        tile_height=int(os.getenv("PIPELINE_TILE_HEIGHT", "0")) or None,
+        tile_overlap=int(os.getenv("PIPELINE_TILE_OVERLAP", "128")),
+        defer_init=defer_init
+    )
 
 @app.on_event("startup")
 async def startup_event():
-    global pipeline
-    logger.info("Initializing Screenshot Pipeline...")
-    pipeline = ScreenshotPipeline()
+    global pipeline, admission, chunk_coalescing, startup_task
+    admission = AdmissionController(
+        max_in_flight=int(os.getenv("PIPELINE_MAX_IN_FLIGHT", "2")),
+        max_queued=int(os.getenv("PIPELINE_MAX_QUEUED", "16")),
+        retry_after=int(os.getenv("PIPELINE_RETRY_AFTER", "5"))
+    )
+    chunk_coalescing = {
+        "max_size": int(os.getenv("PIPELINE_CHUNK_SIZE", "512")),
+        "max_delay": int(os.getenv("PIPELINE_CHUNK_DELAY_MS", "16")) / 1000
+    }
+    # A forking server (serve.py) loads the pipeline before the workers start
+    if pipeline is None:
+        pipeline = create_pipeline()
+    # Load models and warm up in the background: the server accepts connections
+    # right away (conversions wait for the models), /ready says when it is done
+    startup_task = asyncio.create_task(prepare_pipeline())
+
+async def prepare_pipeline():
+    global warmup_status
+    try:
+        await pipeline.initialize()
+    except Exception as e:
+        logger.error(f"Pipeline initialization failed: {e}")
+        return
     logger.info("Pipeline initialized.")
 
+    if os.getenv("PIPELINE_WARMUP", "1") == "1":
+        logger.info("Warming up OCR and LLM...")
+        warmup_status = await pipeline.warm_up()
+        logger.info(f"Warm-up finished: {warmup_status}")
+        # Until it succeeds (e.g. Ollama is still starting) /ready stays 503
+        retry_delay = float(os.getenv("PIPELINE_WARMUP_RETRY", "10"))
+        while retry_delay > 0 and not warmed_up(warmup_status):
+            await asyncio.sleep(retry_delay)
+            warmup_status = await pipeline.warm_up()
+            logger.info(f"Warm-up retried: {warmup_status}")
+    else:
+        warmup_status = {"ocr": "skipped", "llm": "skipped"}
+
+def warmed_up(status):
+    # Each part is "ok", "skipped" or "error: ..."
+    return status is not None and not any(result.startswith("error") for result in status.values())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if startup_task and not startup_task.done():
+        startup_task.cancel()
+    if pipeline:
+        await pipeline.generator.aclose()
+        pipeline.executor.shutdown(wait=False)
+
+class ClientDisconnected(Exception):
+    """
+    Raised by wait_or_disconnect when the client went away before the task finished.
+    """
+
+async def wait_or_disconnect(task, receiver):
+    """
+    Awaits `task`, cancelling it if the client disconnects first.
+    Cancelling a conversion closes the upstream Ollama stream, so abandoned
+    generations stop using model time.
+    `receiver` either raises (WebSocketDisconnect, re-raised here) or returns
+    once the client is gone, which raises ClientDisconnected.
+    """
+    try:
+        await asyncio.wait({task, receiver}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        if not task.done():
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+    if task.cancelled():
+        # Re-raises the WebSocketDisconnect that ended the receiver
+        receiver.result()
+        raise ClientDisconnected()
+    return task.result()
+
+def parse_binary_frame(frame):
+    """
+    Splits a binary websocket frame into its JSON header and image bytes.
+    Layout: 2-byte big-endian header length, UTF-8 JSON header
+    (e.g. {"framework": "html"}), then the encoded image.
+    The image is returned as a memoryview over the frame, so it is never copied.
+    Raises ValueError for a malformed frame.
+    """
+    if len(frame) < 2:
+        raise ValueError("Binary frame too short")
+    header_length = int.from_bytes(frame[:2], "big")
+    if 2 + header_length > len(frame):
+        raise ValueError("Binary frame header is longer than the frame")
+    try:
+        header = json.loads(frame[2:2 + header_length] or b"{}")
+    except ValueError:
+        raise ValueError("Binary frame header is not valid JSON")
+    if not isinstance(header, dict):
+        raise ValueError("Binary frame header must be a JSON object")
+    return header, memoryview(frame)[2 + header_length:]
+
+async def stream_conversion(websocket, image_data, framework, session=None):
+    async def report_position(position):
+        await websocket.send_json({
+            "type": "status",
+            "step": "queued",
+            "position": position,
+            "message": f"Waiting for a free slot (position {position} in queue)..."
+        })
+
+    try:
+        async with admission.admit(report_position):
+            # Tokens are batched into fewer, larger code_chunk messages
+            updates = coalesce_chunks(pipeline.process(image_data, framework, session), **chunk_coalescing)
+            async for status_update in updates:
+                await websocket.send_json(status_update)
+    except QueueFull as e:
+        await websocket.send_json({"type": "error", "message": str(e), "retry_after": e.retry_after})
+
+async def http_disconnect(request):
+    # Resolves once the HTTP client has gone away
+    while not await request.is_disconnected():
+        await asyncio.sleep(0.5)
+
 @app.websocket("/ws/generate")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
     logger.info("Client connected")
-    
+
+    # Receive in the background so a disconnect is noticed while a conversion
+    # is still streaming, not only when we next wait for a message
+    messages = asyncio.Queue()
+
+    async def receive_messages():
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if message.get("bytes") is not None:
+                messages.put_nowait(message["bytes"])
+            else:
+                messages.put_nowait(message.get("text", ""))
+
+    receiver = asyncio.create_task(receive_messages())
+    # The previous upload's analysis, so a slightly changed one is diffed against it
+    session = SessionState()
+
     try:
         while True:
-            # Receive data (JSON expected with image and framework)
-            message = await websocket.receive_text()
-            
-            # Default values
-            image_data = message
-            framework = "react"
+            # Receive data: a binary frame (header + raw image bytes) or
+            # JSON text with a base64 image and framework. Either way "framework"
+            # may be a list, e.g. ["react", "html"], to get several outputs at once
+            message = await wait_or_disconnect(asyncio.create_task(messages.get()), receiver)
             
-            # Try parsing as JSON
+            if isinstance(message, bytes):
+                try:
+                    header, image_data = parse_binary_frame(message)
+                except ValueError as e:
+                    # A bad frame fails that upload, not the connection
+                    await websocket.send_json({"type": "error", "message": str(e)})
+                    continue
+                framework = header.get("framework", "react")
+            else:
+                # Default values
+                image_data = message
+                framework = "react"
+
+                # Try parsing as JSON
+                try:
+                    payload = json.loads(message)
+                    if isinstance(payload, dict):
+                        image_data = payload.get("image", message)
+                        framework = payload.get("framework", "react")
+                except:
+                    pass
+
             try:
-                import json
-                payload = json.loads(message)
-                if isinstance(payload, dict):
-                    image_data = payload.get("image", message)
-                    framework = payload.get("framework", "react")
-            except:
-                pass
+                parse_frameworks(framework)
+            except ValueError as e:
+                await websocket.send_json({"type": "error", "message": str(e)})
+                continue
             
             # Run the 7-step pipeline
             if pipeline:
-                async for status_update in pipeline.process(image_data, framework):
-                    await websocket.send_json(status_update)
+                conversion = asyncio.create_task(stream_conversion(websocket, image_data, framework, session))
+                await wait_or_disconnect(conversion, receiver)
             else:
                 await websocket.send_json({"status": "error", "message": "Pipeline not initialized"})
             
@@ -69,35 +285,100 @@ async def websocket_endpoint(websocket: WebSocket):
         logger.error(f"Error: {e}")
         logger.error(traceback.format_exc())
         await websocket.send_json({"status": "error", "message": str(e)})
+    finally:
+        receiver.cancel()
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    if not pipeline:
+        raise HTTPException(status_code=503, detail="Pipeline not initialized")
+    return pipeline.cache_stats()
+
+@app.get("/ready")
+async def ready():
+    """
+    Readiness probe: 503 until the models are loaded and the startup warm-up
+    has succeeded (a failed warm-up is retried in the background).
+    Reports per-component loading progress and warm-up results either way.
+    """
+    if not pipeline:
+        return JSONResponse({"ready": False}, status_code=503)
+    status = {
+        "ready": pipeline.initialized and warmed_up(warmup_status),
+        "components": pipeline.init_progress,
+        "warmup": warmup_status,
+        "admission": admission.stats()
+    }
+    return status if status["ready"] else JSONResponse(status, status_code=503)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """
+    Stage latency histograms, in-flight gauges, LLM speed and cache counters
+    in the Prometheus text format.
+    """
+    if pipeline:
+        for cache, stats in pipeline.cache_stats().items():
+            for result in ("hits", "disk_hits", "misses"):
+                metrics.CACHE_LOOKUPS.set(stats[result], cache=cache, result=result)
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
 @app.post("/api/convert")
 async def convert_image(
+    request: Request,
     file: UploadFile = File(...),
     framework: str = Form("react")
 ):
     if not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="File must be an image")
     
+    # A comma-separated list ("react,html") generates every framework from one analysis
+    frameworks = [name.strip() for name in framework.split(",") if name.strip()]
+    if not frameworks:
+        raise HTTPException(status_code=400, detail="No framework requested")
+
     try:
         content = await file.read()
         
-        import base64
-        b64_content = base64.b64encode(content).decode('utf-8')
-        
-        generated_code = ""
+        generated_code = {name: [] for name in frameworks}
         layout = {}
         
         if pipeline:
-            async for update in pipeline.process(b64_content, framework):
-                if update["type"] == "code_chunk":
-                    generated_code += update["chunk"]
-                elif update["type"] == "complete":
-                    pass
+            async def convert():
+                async with admission.admit():
+                    # Raw bytes go straight to the decoder, no base64 round trip
+                    async for update in pipeline.process(content, frameworks):
+                        if update["type"] == "code_chunk":
+                            generated_code[update["framework"]].append(update["chunk"])
+                        elif update["type"] == "complete":
+                            pass
+
+            # A client that gives up (while queued or generating) cancels its job
+            conversion = asyncio.create_task(convert())
+            watcher = asyncio.create_task(http_disconnect(request))
+            try:
+                await wait_or_disconnect(conversion, watcher)
+            finally:
+                watcher.cancel()
         
+        code = {name: "".join(chunks) for name, chunks in generated_code.items()}
+        if len(frameworks) == 1:
+            return {
+                "code": code[frameworks[0]],
+                "framework": frameworks[0]
+            }
         return {
-            "code": generated_code,
-            "framework": framework
+            "code": code,
+            "framework": frameworks
         }
+    except ClientDisconnected:
+        logger.info("HTTP client disconnected, conversion dropped")
+        # Nobody is listening; 499 (client closed request) is for the access log
+        return JSONResponse({"detail": "Client disconnected"}, status_code=499)
+    except QueueFull as e:
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         logger.error(f"Error in HTTP convert: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,174 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; covers millisecond-scale stages up to multi-minute generations
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key, value):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0}
+            state["counts"][bisect.bisect_left(self.buckets, value)] += 1
+            state["sum"] += value
+
+    def _render_sample(self, key, state):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), state["counts"]):
+            cumulative += count
+            labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(state['sum'])}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """
+        Renders every metric in the Prometheus text exposition format.
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_DURATION = REGISTRY.register(Histogram(
+    "screenshot_stage_duration_seconds", "Time spent in each pipeline stage.", ["stage"]
+))
+STAGE_IN_FLIGHT = REGISTRY.register(Gauge(
+    "screenshot_stage_in_flight", "Pipeline stages currently running.", ["stage"]
+))
+CONVERSIONS = REGISTRY.register(Counter(
+    "screenshot_conversions_total", "Finished conversions by outcome.", ["outcome"]
+))
+CONVERSIONS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "screenshot_conversions_in_flight", "Conversions currently running."
+))
+LLM_TIME_TO_FIRST_TOKEN = REGISTRY.register(Histogram(
+    "screenshot_llm_time_to_first_token_seconds", "Time from sending the prompt to the first generated token."
+))
+LLM_TOKENS_PER_SECOND = REGISTRY.register(Histogram(
+    "screenshot_llm_tokens_per_second", "Generation speed after the first token.",
+    buckets=(1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200, 500)
+))
+ADMISSION_IN_FLIGHT = REGISTRY.register(Gauge(
+    "screenshot_admission_in_flight", "Conversions holding a pipeline slot."
+))
+ADMISSION_QUEUED = REGISTRY.register(Gauge(
+    "screenshot_admission_queued", "Conversions waiting for a pipeline slot."
+))
+ADMISSION_REJECTED = REGISTRY.register(Counter(
+    "screenshot_admission_rejected_total", "Conversions turned away because the queue was full."
+))
+CACHE_LOOKUPS = REGISTRY.register(Gauge(
+    "screenshot_cache_lookups", "Cache lookups since startup by cache and result.", ["cache", "result"]
+))
+
+
+@contextmanager
+def track_stage(stage, timings):
+    """
+    Times a pipeline stage: updates the in-flight gauge and duration histogram,
+    and adds the duration in milliseconds to `timings[stage]` (stages that
+    run once per tile accumulate).
+    """
+    STAGE_IN_FLIGHT.inc(stage=stage)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_IN_FLIGHT.dec(stage=stage)
+        STAGE_DURATION.observe(elapsed, stage=stage)
+        timings[stage] = round(timings.get(stage, 0) + elapsed * 1000, 2)
@@ -1,74 +1,606 @@
+import asyncio
+import functools
 import logging
+import time
 import base64
+import os
 import cv2
 import numpy as np
 import json
-from io import BytesIO
+import io
 from PIL import Image
 
 # Import steps
-# Import steps
-from engine.screenshotProcessor import ScreenshotProcessor
+from engine.screenshotProcessor import ScreenshotProcessor, map_boxes_to_original
 from engine.detection import UIElementDetector
 from engine.ocrProcessing import OCRProcessor
-from engine.layout_engine import LayoutEngine
-from engine.generator import CodeGenerator
+from engine.layout_engine import LayoutEngine, count_nodes
+from engine.generator import CodeGenerator, ErrorChunk, PROMPT_VERSION
+from engine.layout_encoder import LayoutEncoder
+from engine.executor import RemoteComponent, StageExecutor
+from engine.cache import ResultCache, hash_image, hash_layout
+from engine.tiling import TileMerger, offset_boxes, plan_bands
+from engine.incremental import changed_boxes, merge_spans, plan_rescans, splice, tile_hashes, touches_changes
+import metrics
 
 logger = logging.getLogger("ScreenshotConverter")
 
+# cv2 can decode straight to a fraction of the full size. JPEG does this in the
+# DCT, so full-size pixels are never produced; other formats (PNG included) are
+# decoded at full size and then shrunk, which only saves memory downstream
+REDUCED_DECODE_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2)
+)
+
+class BufferReader(io.RawIOBase):
+    """
+    Read-only file object over a bytes-like buffer. Unlike BytesIO over a
+    memoryview it does not copy the buffer; reads copy only what they return.
+    """
+
+    def __init__(self, buffer):
+        self._view = memoryview(buffer).cast("B")
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, target):
+        chunk = self._view[self._position:self._position + len(target)]
+        target[:len(chunk)] = chunk
+        self._position += len(chunk)
+        return len(chunk)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: len(self._view)}[whence]
+        self._position = max(0, base + offset)
+        return self._position
+
+    def tell(self):
+        return self._position
+
+def image_width(image_bytes):
+    """
+    Reads the pixel width from the encoded image header without decoding it.
+    """
+    if bytes(image_bytes[:8]) == b"\x89PNG\r\n\x1a\n":
+        # IHDR is always the first chunk
+        return int.from_bytes(image_bytes[16:20], "big")
+    # PIL only reads up to the size field (e.g. the JPEG SOF marker)
+    try:
+        return Image.open(BufferReader(image_bytes)).size[0]
+    except OSError:
+        # UnidentifiedImageError included: the same error as a failed decode
+        raise ValueError("Could not decode image")
+
+def decode_image(image_data, target_width=None):
+    """
+    Decodes an uploaded image given as raw bytes (bytes, bytearray, memoryview)
+    or as a base64 string / data URL. With `target_width`, decodes at the
+    largest 1/2, 1/4 or 1/8 reduction that is still at least that wide.
+    """
+    # Module level so it can be shipped to a process pool
+    if isinstance(image_data, str):
+        if "," in image_data:
+            image_data = image_data.split(",")[1]
+        image_data = base64.b64decode(image_data)
+    # Convert to numpy array for OpenCV (a view over the bytes, no copy)
+    nparr = np.frombuffer(image_data, np.uint8)
+
+    flags = cv2.IMREAD_COLOR
+    if target_width:
+        width = image_width(image_data)
+        for factor, reduced_flags in REDUCED_DECODE_FLAGS:
+            if width // factor >= target_width:
+                flags = reduced_flags
+                break
+
+    img_cv2 = cv2.imdecode(nparr, flags)
+    if img_cv2 is None:
+        raise ValueError("Could not decode image")
+    return img_cv2
+
+def parse_frameworks(framework):
+    """
+    The requested frameworks as a list without duplicates: `framework` is one
+    name or a list of names. Raises ValueError for anything else.
+    """
+    if isinstance(framework, str):
+        return [framework]
+    if not isinstance(framework, list) or not all(isinstance(name, str) for name in framework):
+        raise ValueError("framework must be a name or a list of names")
+    if not framework:
+        raise ValueError("No framework requested")
+    return list(dict.fromkeys(framework))
+
+# Components the pipeline only calls through the executor, so in process mode
+# they are built in the workers alone (the preprocessor's settings are read here)
+WORKER_COMPONENTS = ("detector", "ocr", "layout_engine")
+
+def rescanned_share(spans, height):
+    return sum(y1 - y0 for y0, y1 in spans) / height
+
 class ScreenshotPipeline:
-    def __init__(self):
+    def __init__(self, executor_mode="thread", max_workers=None, stage_limits=None, cache_size=64, cache_dir=None,
+                 ocr_mode="full", detection_method="contours", reduced_decode=False,
+                 preprocess_profile="detection", ollama_url=None, prompt_token_budget=2000, layout_grid=8,
+                 keep_alive="30m", defer_init=False, tile_height=None, tile_overlap=128,
+                 generation_sections=0, llm_concurrency=2, ocr_backend="easyocr", ocr_backend_options=None,
+                 ocr_batch_size=16, incremental_tile=64, incremental_max_changed=0.5,
+                 detection_glyph_max_side=0, detection_iou_threshold=None):
         logger.info("Loading Pipeline Components...")
-        self.preprocessor = ScreenshotProcessor()
-        self.detector = UIElementDetector()
-        self.ocr = OCRProcessor()
-        self.layout_engine = LayoutEngine()
-        self.generator = CodeGenerator()
-        logger.info("All components loaded.")
-
-    def decode_image(self, base64_string: str):
-        if "," in base64_string:
-            base64_string = base64_string.split(",")[1]
-        image_data = base64.b64decode(base64_string)
-        # Convert to numpy array for OpenCV
-        nparr = np.frombuffer(image_data, np.uint8)
-        img_cv2 = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        return img_cv2
-
-    async def process(self, base64_image: str, framework: str = "react"):
+        # Zero-argument builders per component; process-mode workers use them too
+        self.factories = {
+            "preprocessor": functools.partial(ScreenshotProcessor, profile=preprocess_profile),
+            "detector": functools.partial(
+                UIElementDetector, method=detection_method,
+                glyph_max_side=detection_glyph_max_side, iou_threshold=detection_iou_threshold
+            ),
+            "ocr": functools.partial(
+                OCRProcessor, mode=ocr_mode, batch_size=ocr_batch_size,
+                backend=ocr_backend, backend_options=ocr_backend_options
+            ),
+            "layout_engine": LayoutEngine
+        }
+        # CPU-heavy stages run here instead of on the event loop
+        self.executor = StageExecutor(executor_mode, max_workers, stage_limits)
+
+        # Cheap to build: the HTTP client is only created on first use
+        self.generator = CodeGenerator(
+            layout_encoder=LayoutEncoder(grid=layout_grid, token_budget=prompt_token_budget),
+            keep_alive=keep_alive,
+            max_sections=generation_sections,
+            max_concurrent_generations=llm_concurrency,
+            executor=self.executor,
+            **({"api_url": ollama_url} if ollama_url else {})
+        )
+        # Decode large uploads at a reduced size close to the preprocessing width.
+        # Everything downstream (OCR included) then works at that size.
+        self.reduced_decode = reduced_decode
+        # Pages taller than tile_height are preprocessed, detected and read in
+        # overlapping bands, so those stages only ever hold one band
+        self.tile_height = tile_height
+        self.tile_overlap = tile_overlap
+        # Within a session, uploads are diffed against the previous one in tiles
+        # of this size (0 disables), and only changed rows are analyzed again
+        # unless more than incremental_max_changed of the page would be
+        self.incremental_tile = incremental_tile
+        self.incremental_max_changed = incremental_max_changed
+
+        # Intermediate artifacts keyed by (image hash, analysis settings); generated
+        # code keyed by (layout hash, framework, model, prompt version, encoder settings)
+        self.analysis_settings = (
+            ocr_mode, ocr_backend, tuple(sorted((ocr_backend_options or {}).items())), ocr_batch_size,
+            detection_method, detection_glyph_max_side, detection_iou_threshold,
+            preprocess_profile, reduced_decode, tile_height, tile_overlap
+        )
+        self.analysis_cache = ResultCache(cache_size, os.path.join(cache_dir, "analysis") if cache_dir else None)
+        self.code_cache = ResultCache(cache_size, os.path.join(cache_dir, "code") if cache_dir else None)
+
+        # Component name -> "pending", "loading", "ready" or "failed: ..."
+        self.init_progress = {name: "pending" for name in self.factories}
+        self.init_times = {}
+        self._init_task = None
+        # With defer_init the components are built by initialize() instead,
+        # so a server can start accepting connections first
+        if not defer_init:
+            for name in self.factories:
+                self._build_component(name)
+            logger.info("All components loaded.")
+
+    def _build_component(self, name):
+        self.init_progress[name] = "loading"
+        start = time.perf_counter()
+        try:
+            if self.executor.mode == "process" and name in WORKER_COMPONENTS:
+                # Only the workers' copies are ever called; don't load models here too
+                component = RemoteComponent(name)
+            else:
+                component = self.factories[name]()
+        except Exception as e:
+            self.init_progress[name] = f"failed: {e}"
+            raise
+        setattr(self, name, component)
+        self.executor.register(name, component, self.factories[name])
+        self.init_times[name] = round(time.perf_counter() - start, 3)
+        self.init_progress[name] = "ready"
+        logger.info(f"Loaded {name} in {self.init_times[name]:.2f}s")
+
+    @property
+    def initialized(self):
+        return all(state == "ready" for state in self.init_progress.values())
+
+    async def initialize(self):
+        """
+        Builds the components that are not built yet, concurrently in threads
+        (the OCR model load dominates; the others overlap with it).
+        Concurrent callers share one initialization; progress is in `init_progress`.
+        """
+        if self._init_task is None:
+            async def build_pending():
+                pending = [name for name, state in self.init_progress.items() if state == "pending"]
+                await asyncio.gather(*(asyncio.to_thread(self._build_component, name) for name in pending))
+                logger.info("All components loaded.")
+            self._init_task = asyncio.create_task(build_pending())
+        # Shielded: a client that goes away must not cancel the shared build
+        await asyncio.shield(self._init_task)
+
+    async def warm_up(self):
+        """
+        Runs OCR on a tiny image and primes the LLM, concurrently.
+        Returns {"ocr": ..., "llm": ...} with "ok" or the error for each.
+        """
+        async def timed(name, coro):
+            start = time.perf_counter()
+            try:
+                await coro
+            except Exception as e:
+                logger.warning(f"{name} warm-up failed: {e}")
+                return f"error: {e}"
+            logger.info(f"{name} warm-up finished in {time.perf_counter() - start:.2f}s")
+            return "ok"
+
+        ocr, llm = await asyncio.gather(
+            # In process mode this warms the worker that picks it up
+            timed("OCR", self.executor.run("ocr", self.ocr.warm_up)),
+            timed("LLM", self.generator.warm_up())
+        )
+        return {"ocr": ocr, "llm": llm}
+
+    def decode_image(self, image_data):
+        return decode_image(image_data, self.preprocessor.fixed_width if self.reduced_decode else None)
+
+    async def process(self, image_data, framework="react", session=None):
         """
         Runs the 7-step pipeline and yields status updates.
+        `image_data` is the encoded image as raw bytes or a base64 string.
+        `framework` is one framework or a list of them: the image is analyzed
+        once and code for every framework is generated concurrently, each
+        `code_chunk` tagged with its framework.
+        With a `SessionState`, an upload the same size as the session's last
+        one only has its changed regions detected and read again.
+        Analysis (steps 1-6) and generated code are cached, so re-uploading the
+        same screenshot skips straight to replaying the stored result.
+        Each finished stage yields a `stage_complete` status with its duration
+        and counts; `complete` carries the whole timing breakdown.
         """
+        start = time.perf_counter()
+        timings = {}
+        metrics.CONVERSIONS_IN_FLIGHT.inc()
+        outcome = "cancelled"
         try:
+            frameworks = parse_frameworks(framework)
+            llm_stats = {name: {} for name in frameworks}
+            if not self.initialized:
+                yield {"type": "status", "step": "initializing", "message": "Loading models..."}
+                await self.initialize()
+
             # Step 0: Decode
             yield {"type": "status", "step": "decoding", "message": "Decoding image..."}
-            original_image = self.decode_image(base64_image)
-            height, width = original_image.shape[:2]
-            
-            # Step 1: Preprocessing
-            yield {"type": "status", "step": "preprocessing", "message": "Preprocessing image..."}
-            processed_image = self.preprocessor.preprocess(original_image)
-            
-            # Step 2: Detection
-            yield {"type": "status", "step": "detection", "message": "Detecting UI elements..."}
-            elements = self.detector.detect_elements(processed_image)
-            yield {"type": "status", "step": "detection_complete", "count": len(elements)}
-
-            # Step 3: OCR
-            yield {"type": "status", "step": "ocr", "message": "Extracting text..."}
-            element_texts = self.ocr.extract_text(original_image, elements)
-            
-            # Step 4-6: Layout & Style
-            yield {"type": "status", "step": "layout", "message": "Analyzing layout & style..."}
-            layout_tree = self.layout_engine.build_layout(elements, element_texts, width, height)
-            
-            # Step 7: Code Generation
-            yield {"type": "status", "step": "generation", "message": f"Generating {framework} code..."}
-            async for chunk in self.generator.generate_code_stream(layout_tree, framework):
-                yield {"type": "code_chunk", "chunk": chunk}
-            
-            yield {"type": "status", "step": "complete", "message": "Conversion complete"}
+            with metrics.track_stage("decoding", timings):
+                original_image = await self.executor.run(
+                    "decoding", decode_image, image_data,
+                    self.preprocessor.fixed_width if self.reduced_decode else None
+                )
+                height, width = original_image.shape[:2]
+                image_hash = await self.executor.run("decoding", hash_image, original_image)
+                hashes = None
+                if session is not None and self.incremental_tile:
+                    hashes = await self.executor.run("decoding", tile_hashes, original_image, self.incremental_tile)
+            yield self._stage_complete("decoding", timings, width=width, height=height, bytes=len(image_data))
+
+            analysis_key = (image_hash, self.analysis_settings)
+            analysis = await self._cache_get(self.analysis_cache, analysis_key)
+            tiled = self.tile_height and height > self.tile_height
+            changes = None
+            incremental = analysis is None and not tiled and hashes is not None
+            if incremental and session.matches(original_image.shape, hashes):
+                boxes, changed = changed_boxes(
+                    session.hashes, hashes, self.incremental_tile, original_image.shape, self.incremental_tile // 4
+                )
+                spans = plan_rescans(boxes, session.elements + session.texts)
+                if rescanned_share(spans, height) <= self.incremental_max_changed:
+                    changes = boxes, spans, changed
+
+            if analysis is not None:
+                yield {"type": "status", "step": "cache_hit", "message": "Reusing analysis of an identical screenshot..."}
+                elements, element_texts, layout_tree = analysis
+            elif tiled:
+                # Steps 1-3 band by band
+                bands = plan_bands(height, self.tile_height, self.tile_overlap)
+                merger = TileMerger(bands)
+                async for update in self._analyze_tiles(original_image, merger, timings):
+                    yield update
+                elements, element_texts = merger.elements, merger.texts
+            elif changes is not None:
+                # Steps 1-3 on the changed rows only
+                result = {}
+                async for update in self._analyze_changes(original_image, session, *changes, timings, result):
+                    yield update
+                if result:
+                    elements, element_texts = result["elements"], result["texts"]
+                else:
+                    # The rows to analyze again grew past incremental_max_changed
+                    changes = None
+            if analysis is None and not tiled and changes is None:
+                # Step 1: Preprocessing
+                yield {"type": "status", "step": "preprocessing", "message": "Preprocessing image..."}
+                with metrics.track_stage("preprocessing", timings):
+                    processed_image, transform = await self.executor.run(
+                        "preprocessing", self.preprocessor.preprocess_for_detection, original_image
+                    )
+                yield self._stage_complete(
+                    "preprocessing", timings, width=processed_image.shape[1], height=processed_image.shape[0]
+                )
+
+                # Step 2: Detection
+                yield {"type": "status", "step": "detection", "message": "Detecting UI elements..."}
+                with metrics.track_stage("detection", timings):
+                    elements, detection_stats = await self.executor.run(
+                        "detection", self.detector.detect_elements_with_stats, processed_image
+                    )
+                    # Detection ran on the resized/cropped image; OCR and layout use original coordinates
+                    elements = map_boxes_to_original(elements, transform)
+                yield {
+                    "type": "status",
+                    "step": "detection_complete",
+                    "count": len(elements),
+                    "removed": detection_stats["removed"]
+                }
+                yield self._stage_complete("detection", timings, elements=len(elements))
+
+                # Step 3: OCR
+                yield {"type": "status", "step": "ocr", "message": "Extracting text..."}
+                with metrics.track_stage("ocr", timings):
+                    element_texts = await self.executor.run("ocr", self.ocr.extract_text, original_image, elements)
+                yield self._stage_complete("ocr", timings, texts=len(element_texts))
+
+            if analysis is None:
+                # Step 4-6: Layout & Style
+                yield {"type": "status", "step": "layout", "message": "Analyzing layout & style..."}
+                with metrics.track_stage("layout", timings):
+                    layout_tree = await self.executor.run(
+                        "layout", self.layout_engine.build_layout, elements, element_texts, width, height
+                    )
+                yield self._stage_complete("layout", timings, nodes=count_nodes(layout_tree) - 1)
+                # Spliced results depend on the session's previous upload, not just this image
+                if changes is None:
+                    await self._cache_put(self.analysis_cache, analysis_key, (elements, element_texts, layout_tree))
+            if hashes is not None:
+                session.remember(original_image.shape, hashes, elements, element_texts)
+
+            # Step 7: Code Generation, all frameworks at once
+            yield {"type": "status", "step": "generation", "message": f"Generating {', '.join(frameworks)} code..."}
+            generation_start = time.perf_counter()
+            failed = {}
+            async for update in self._generate_all(layout_tree, frameworks, llm_stats, failed):
+                yield update
+            timings["generation"] = round((time.perf_counter() - generation_start) * 1000, 2)
+
+            outcome = "generation_error" if any(failed.values()) else "success"
+            yield {
+                "type": "status",
+                "step": "complete",
+                "message": "Conversion complete",
+                "timings": {
+                    "stages_ms": timings,
+                    # Shaped like the request: one framework's stats, or keyed by framework
+                    "llm": llm_stats[framework] if isinstance(framework, str) else llm_stats,
+                    "total_ms": round((time.perf_counter() - start) * 1000, 2)
+                }
+            }
 
         except Exception as e:
             logger.error(f"Pipeline processing failed: {e}")
+            outcome = "error"
             yield {"type": "error", "message": str(e)}
+        finally:
+            metrics.CONVERSIONS_IN_FLIGHT.dec()
+            # Stays "cancelled" when the generator is closed early because the client went away
+            metrics.CONVERSIONS.inc(outcome=outcome)
+
+    async def _analyze_tiles(self, image, merger, timings):
+        """
+        Steps 1-3 for tall pages: preprocessing, detection and OCR run on one
+        overlapping band at a time, and `merger` stitches the results together.
+        After each band, yields a `tile_complete` status with the elements
+        and text that are final from that band on.
+        """
+        bands = merger.bands
+        yield {"type": "status", "step": "tiling", "tiles": len(bands), "message": f"Processing {len(bands)} bands..."}
+        removed = 0
+        for index, (y0, y1) in enumerate(bands):
+            band_elements, band_texts, band_removed = await self._analyze_band(image, y0, y1, timings)
+            removed += band_removed
+            elements, texts = merger.add(index, band_elements, band_texts)
+            yield {
+                "type": "status",
+                "step": "tile_complete",
+                "tile": index,
+                "tiles": len(bands),
+                "y": y0,
+                "height": y1 - y0,
+                "elements": [el["box"] for el in elements],
+                "texts": [{"text": t["text"], "box": t["box"]} for t in texts]
+            }
+
+        yield {"type": "status", "step": "detection_complete", "count": len(merger.elements), "removed": removed}
+        yield self._stage_complete("preprocessing", timings, tiles=len(bands))
+        yield self._stage_complete("detection", timings, elements=len(merger.elements))
+        yield self._stage_complete("ocr", timings, texts=len(merger.texts))
+
+    async def _analyze_band(self, image, y0, y1, timings):
+        """
+        Preprocessing, detection and OCR of the full-width rows [y0, y1).
+        Returns (elements, texts, removed) in page coordinates.
+        """
+        band = image[y0:y1]
+        # Band edges are cuts, not outer background: keep them
+        with metrics.track_stage("preprocessing", timings):
+            processed_band, transform = await self.executor.run(
+                "preprocessing", self.preprocessor.preprocess_for_detection, band, False
+            )
+        with metrics.track_stage("detection", timings):
+            band_elements, detection_stats = await self.executor.run(
+                "detection", self.detector.detect_elements_with_stats, processed_band
+            )
+            band_elements = map_boxes_to_original(band_elements, transform)
+        del processed_band
+        with metrics.track_stage("ocr", timings):
+            band_texts = await self.executor.run("ocr", self.ocr.extract_text, band, band_elements)
+        return offset_boxes(band_elements, y0), offset_boxes(band_texts, y0), detection_stats["removed"]
+
+    async def _analyze_changes(self, image, session, boxes, spans, changed, timings, result, max_rounds=3):
+        """
+        Steps 1-3 for an upload that differs from the session's previous one
+        only inside `boxes` (`changed` is the changed share of the tiles): the
+        row `spans` around them are analyzed again and spliced into the
+        previous detections and text. A fresh item cut by a span's edge (e.g.
+        an element that grew) widens that span and the spans are analyzed
+        again. Fills result["elements"] and result["texts"], or leaves `result`
+        empty if the widened spans exceed incremental_max_changed.
+        """
+        height = image.shape[0]
+        tolerance = 2
+        for round_index in range(max_rounds):
+            elements, texts, removed, grown = [], [], 0, []
+            for y0, y1 in spans:
+                band_elements, band_texts, band_removed = await self._analyze_band(image, y0, y1, timings)
+                elements += band_elements
+                texts += band_texts
+                removed += band_removed
+                top, bottom = y0, y1
+                for item in band_elements + band_texts:
+                    x, y, w, h = item["box"]
+                    if not touches_changes(item, boxes):
+                        continue
+                    if y0 > 0 and y <= y0 + tolerance:
+                        top = max(0, y0 - (y1 - y0))
+                    if y1 < height and y + h >= y1 - tolerance:
+                        bottom = min(height, y1 + (y1 - y0))
+                grown.append((top, bottom))
+            if grown == spans or round_index == max_rounds - 1:
+                break
+            spans = merge_spans(grown)
+            if rescanned_share(spans, height) > self.incremental_max_changed:
+                logger.info("Changed rows grew past the incremental limit, analyzing the whole page")
+                return
+
+        result["elements"] = splice(session.elements, elements, boxes)
+        result["texts"] = splice(session.texts, texts, boxes)
+        # Announced once the spans are final, so the shares are the ones actually used
+        reused = 1 - rescanned_share(spans, height)
+        yield {
+            "type": "status",
+            "step": "incremental",
+            "changed": round(changed, 4),
+            "reused": round(reused, 4),
+            "regions": len(boxes),
+            "message": f"Reused {reused:.0%} of the previous upload"
+        }
+        yield {"type": "status", "step": "detection_complete", "count": len(result["elements"]), "removed": removed}
+        yield self._stage_complete("preprocessing", timings, bands=len(spans), reused=round(reused, 4))
+        yield self._stage_complete("detection", timings, elements=len(result["elements"]))
+        yield self._stage_complete("ocr", timings, texts=len(result["texts"]))
+
+    async def _generate_all(self, layout_tree, frameworks, llm_stats, failed):
+        """
+        Runs `_generate` for every framework concurrently and yields their
+        updates in arrival order. Closing this generator cancels the streams.
+        """
+        updates = asyncio.Queue()
+        tasks = []
+        for framework in frameworks:
+            task = asyncio.create_task(
+                self._generate(layout_tree, framework, llm_stats[framework], updates.put_nowait)
+            )
+            # None marks a finished stream, however it finished
+            task.add_done_callback(lambda _: updates.put_nowait(None))
+            tasks.append(task)
+        try:
+            running = len(tasks)
+            while running:
+                update = await updates.get()
+                if update is None:
+                    running -= 1
+                else:
+                    yield update
+            for framework, task in zip(frameworks, tasks):
+                failed[framework] = task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _generate(self, layout_tree, framework, llm_stats, emit):
+        """
+        Generates (or replays from the cache) the code for one framework,
+        passing each update to `emit`. Returns True if generation failed.
+        """
+        encoder = self.generator.layout_encoder
+        code_key = (
+            hash_layout(layout_tree), framework, self.generator.model_id, PROMPT_VERSION,
+            encoder.grid, encoder.token_budget, self.generator.max_sections
+        )
+        cached_chunks = await self._cache_get(self.code_cache, code_key)
+        failed = False
+        # Not a context manager: the stage spans yields to the client
+        generation_start = time.perf_counter()
+        metrics.STAGE_IN_FLIGHT.inc(stage="generation")
+        try:
+            if cached_chunks is not None:
+                # Replay through the normal chunk protocol so clients can't tell the difference
+                for chunk in cached_chunks:
+                    emit({"type": "code_chunk", "chunk": chunk, "framework": framework})
+            else:
+                chunks = []
+                async for chunk in self.generator.generate_code_stream(layout_tree, framework, llm_stats):
+                    chunks.append(chunk)
+                    emit({"type": "code_chunk", "chunk": chunk, "framework": framework})
+                # Failed generations are streamed to the client but never cached
+                failed = any(isinstance(chunk, ErrorChunk) for chunk in chunks)
+                if not failed:
+                    await self._cache_put(self.code_cache, code_key, chunks)
+        finally:
+            elapsed = time.perf_counter() - generation_start
+            metrics.STAGE_IN_FLIGHT.dec(stage="generation")
+            metrics.STAGE_DURATION.observe(elapsed, stage="generation")
+        if "ttft_ms" in llm_stats:
+            metrics.LLM_TIME_TO_FIRST_TOKEN.observe(llm_stats["ttft_ms"] / 1000)
+        if llm_stats.get("tokens_per_second"):
+            metrics.LLM_TOKENS_PER_SECOND.observe(llm_stats["tokens_per_second"])
+        emit({
+            "type": "status",
+            "step": "stage_complete",
+            "stage": "generation",
+            "framework": framework,
+            "duration_ms": round(elapsed * 1000, 2),
+            "cached": cached_chunks is not None
+        })
+        return failed
+
+    async def _cache_get(self, cache, key):
+        value = cache.lookup(key)
+        if value is None and cache.disk_dir:
+            # Unpickling a disk entry blocks, so it runs off the event loop
+            return await self.executor.run_local("caching", cache.load, key)
+        return value if value is not None else cache.load(key)
+
+    async def _cache_put(self, cache, key, value):
+        cache.remember(key, value)
+        if cache.disk_dir:
+            await self.executor.run_local("caching", cache.save, key, value)
+
+    @staticmethod
+    def _stage_complete(stage, timings, **counts):
+        return {"type": "status", "step": "stage_complete", "stage": stage, "duration_ms": timings[stage], **counts}
+
+    def cache_stats(self):
+        return {
+            "analysis": self.analysis_cache.stats(),
+            "code": self.code_cache.stats()
+        }
@@ -0,0 +1,216 @@
+"""
+Production launcher: loads the models once, then forks worker processes.
+
+    python serve.py --workers 4 --port 8000
+
+The parent builds the pipeline (EasyOCR/torch weights included) before
+forking, so every worker shares those pages copy-on-write instead of loading
+its own copy. Each worker runs its own uvicorn server on the shared listening
+socket and its own event loop, admission queue, caches and /metrics.
+Native thread pools (torch, OpenCV, BLAS) are pinned per worker so N workers
+do not each spin up one thread per core. Once every worker has warmed up,
+the parent logs each process's RSS and PSS to help size instances.
+"""
+import argparse
+import asyncio
+import gc
+import logging
+import os
+import select
+import signal
+import socket
+import sys
+import time
+
+
+def parse_args():
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Run the backend with preloaded models and forked workers")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "0")) or cpus,
+                        help="Worker processes (default: CPU count)")
+    parser.add_argument("--threads", type=int, default=int(os.getenv("PIPELINE_THREADS_PER_WORKER", "0")) or None,
+                        help="torch/OpenCV/BLAS threads per worker (default: CPU count / workers)")
+    parser.add_argument("--ready-timeout", type=float, default=600.0,
+                        help="Seconds to wait for all workers before logging the memory summary anyway")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+    args.threads = args.threads or max(1, cpus // args.workers)
+    return args
+
+
+args = parse_args()
+
+# Must be set before torch/OpenCV/numpy are imported to take effect
+for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+    os.environ.setdefault(variable, str(args.threads))
+# Stage pool per worker sized like the native thread pools
+os.environ.setdefault("PIPELINE_WORKERS", str(args.threads))
+
+# No collections while loading: they would only scatter writes over the
+# pages the workers are about to share (gc.freeze() below covers the rest)
+gc.disable()
+
+import cv2
+import uvicorn
+
+import main
+
+logger = logging.getLogger("ScreenshotConverter")
+
+# Holds the task that reports a worker's readiness to the parent
+_ready_reporter = None
+
+
+def pin_threads(threads):
+    cv2.setNumThreads(threads)
+    # Only present once EasyOCR has been loaded
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(threads)
+
+
+def memory_usage(pid):
+    """
+    Memory of a process in MB from /proc (Linux): rss, pss (shared pages
+    split between the processes sharing them), shared and private.
+    Returns None where /proc is not available.
+    """
+    fields = {"Rss": "rss", "Pss": "pss", "Shared_Clean": "shared", "Shared_Dirty": "shared",
+              "Private_Clean": "private", "Private_Dirty": "private"}
+    usage = dict.fromkeys(fields.values(), 0.0)
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                if name in fields:
+                    usage[fields[name]] += int(value.split()[0]) / 1024
+    except OSError:
+        return None
+    return {key: round(value, 1) for key, value in usage.items()}
+
+
+def log_memory(pid, label):
+    usage = memory_usage(pid)
+    if usage is None:
+        logger.info(f"{label} {pid}: memory usage not available on this platform")
+        return None
+    logger.info(
+        f"{label} {pid}: RSS {usage['rss']:.1f} MB, PSS {usage['pss']:.1f} MB "
+        f"(shared {usage['shared']:.1f} MB, private {usage['private']:.1f} MB)"
+    )
+    return usage
+
+
+def run_worker(sock, ready_fd):
+    """
+    Runs one uvicorn server in a forked child; never returns.
+    """
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    gc.enable()
+    pin_threads(args.threads)
+
+    async def wait_until_ready():
+        try:
+            await main.startup_task
+        finally:
+            os.write(ready_fd, f"{os.getpid()}\n".encode())
+
+    async def report_ready():
+        # Tell the parent once this worker has finished warming up
+        global _ready_reporter
+        _ready_reporter = asyncio.create_task(wait_until_ready())
+
+    main.app.router.on_startup.append(report_ready)
+    config = uvicorn.Config(main.app, log_level=args.log_level)
+    code = 0
+    try:
+        uvicorn.Server(config).run(sockets=[sock])
+    except BaseException:
+        logger.exception("Worker crashed")
+        code = 1
+    finally:
+        os._exit(code)
+
+
+def spawn(sock, ready_fd):
+    pid = os.fork()
+    if pid == 0:
+        run_worker(sock, ready_fd)
+    return pid
+
+
+def supervise(sock, workers, ready_r, ready_w):
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    pending = set(workers)
+    deadline = time.monotonic() + args.ready_timeout
+    summary_logged = False
+    buffer = b""
+    while workers:
+        readable, _, _ = select.select([ready_r], [], [], 1.0)
+        if readable:
+            buffer += os.read(ready_r, 4096)
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                pid = int(line)
+                pending.discard(pid)
+                if summary_logged:
+                    log_memory(pid, "Restarted worker")
+
+        if not summary_logged and (not pending or time.monotonic() > deadline):
+            summary_logged = True
+            if pending:
+                logger.warning(f"Workers {sorted(pending)} not ready after {args.ready_timeout:.0f}s")
+            usages = [log_memory(os.getpid(), "Parent")]
+            usages += [log_memory(pid, "Worker") for pid in sorted(workers)]
+            if all(usages):
+                logger.info(
+                    f"Total across {len(usages)} processes: PSS {sum(u['pss'] for u in usages):.1f} MB "
+                    f"(summed RSS {sum(u['rss'] for u in usages):.1f} MB counts shared pages once per process)"
+                )
+
+        while workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                break
+            workers.discard(pid)
+            pending.discard(pid)
+            if not stopping:
+                # Forked from the preloaded parent, so a replacement starts without reloading models
+                logger.warning(f"Worker {pid} exited with status {status}; starting a replacement")
+                workers.add(spawn(sock, ready_w))
+
+
+if __name__ == "__main__":
+    sock = socket.create_server((args.host, args.port), backlog=2048)
+    logger.info(f"Loading models once for {args.workers} workers ({args.threads} threads each)...")
+    start = time.perf_counter()
+    main.pipeline = main.create_pipeline(defer_init=False)
+    pin_threads(args.threads)
+    logger.info(f"Models loaded in {time.perf_counter() - start:.2f}s; forking workers")
+
+    # Keep everything allocated so far out of the collector's reach, so
+    # collections in the workers never write to (and un-share) those pages
+    gc.freeze()
+    ready_r, ready_w = os.pipe()
+    workers = {spawn(sock, ready_w) for _ in range(args.workers)}
+    logger.info(f"Serving on http://{args.host}:{args.port} with workers {sorted(workers)}")
+    supervise(sock, workers, ready_r, ready_w)
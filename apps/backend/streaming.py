@@ -0,0 +1,70 @@
+import asyncio
+import contextlib
+import time
+
+
+async def coalesce_chunks(updates, max_size=512, max_delay=0.016):
+    """
+    Batches the `code_chunk` updates of a pipeline stream so clients get a
+    few larger messages instead of one per LLM token.
+
+    Chunks are joined per framework and sent once a batch reaches `max_size`
+    characters or its first chunk is `max_delay` seconds old, whichever comes
+    first. Any other update (a stage boundary, an error, completion) flushes
+    every batch first, so ordering relative to statuses is preserved.
+    `max_size=0` passes the stream through unchanged.
+    """
+    if not max_size:
+        async for update in updates:
+            yield update
+        return
+
+    batches = {}  # framework -> [texts, size, deadline]
+
+    def flush(framework):
+        texts, _, _ = batches.pop(framework)
+        return {"type": "code_chunk", "chunk": "".join(texts), "framework": framework}
+
+    pending = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(updates.__anext__())
+            timeout = None
+            if batches:
+                timeout = max(0.0, min(deadline for _, _, deadline in batches.values()) - time.monotonic())
+            # Not wait_for: a timeout must not cancel (and so end) the stream
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if not done:
+                now = time.monotonic()
+                for framework in [f for f, (_, _, deadline) in batches.items() if deadline <= now]:
+                    yield flush(framework)
+                continue
+
+            task, pending = pending, None
+            try:
+                update = task.result()
+            except StopAsyncIteration:
+                break
+            if update["type"] != "code_chunk":
+                for framework in list(batches):
+                    yield flush(framework)
+                yield update
+                continue
+
+            framework = update.get("framework")
+            batch = batches.setdefault(framework, [[], 0, time.monotonic() + max_delay])
+            batch[0].append(update["chunk"])
+            batch[1] += len(update["chunk"])
+            if batch[1] >= max_size:
+                yield flush(framework)
+
+        for framework in list(batches):
+            yield flush(framework)
+    finally:
+        if pending is not None:
+            # The client went away mid-stream: stop the pipeline too
+            pending.cancel()
+            with contextlib.suppress(asyncio.CancelledError, StopAsyncIteration):
+                await pending
+        await updates.aclose()
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+try:
+    from apps.backend.admission import AdmissionController, QueueFull
+except ImportError:
+    from admission import AdmissionController, QueueFull
+
+async def _test_queue_order_and_positions():
+    admission = AdmissionController(max_in_flight=1, max_queued=2, retry_after=7)
+    release = {name: asyncio.Event() for name in "abc"}
+    order = []
+    positions = {"b": [], "c": []}
+
+    async def job(name):
+        async def report(position):
+            positions[name].append(position)
+        async with admission.admit(report if name in positions else None):
+            order.append(name)
+            await release[name].wait()
+
+    first = asyncio.create_task(job("a"))
+    await asyncio.sleep(0)
+    waiting = [asyncio.create_task(job("b")), asyncio.create_task(job("c"))]
+    await asyncio.sleep(0)
+    assert admission.stats()["in_flight"] == 1 and admission.queued == 2
+
+    # The queue is full: the next job is turned away immediately
+    with pytest.raises(QueueFull) as rejected:
+        async with admission.admit():
+            pass
+    assert rejected.value.retry_after == 7
+
+    release["a"].set()
+    await first
+    await asyncio.sleep(0)
+    # "c" moved up once "b" got the slot
+    assert order == ["a", "b"] and positions == {"b": [1], "c": [2, 1]}
+
+    release["b"].set()
+    release["c"].set()
+    await asyncio.gather(*waiting)
+    assert order == ["a", "b", "c"]
+    assert admission.stats()["in_flight"] == 0 and admission.queued == 0
+
+async def _test_cancelled_waiter_leaves_queue():
+    admission = AdmissionController(max_in_flight=1, max_queued=4)
+    release = asyncio.Event()
+    ran = []
+
+    async def job(name):
+        async with admission.admit():
+            ran.append(name)
+            await release.wait()
+
+    first = asyncio.create_task(job("a"))
+    await asyncio.sleep(0)
+    gone = asyncio.create_task(job("b"))
+    last = asyncio.create_task(job("c"))
+    await asyncio.sleep(0)
+    assert admission.queued == 2
+
+    # The client behind "b" disconnected
+    gone.cancel()
+    await asyncio.sleep(0)
+    assert admission.queued == 1
+
+    release.set()
+    await asyncio.gather(first, last)
+    assert ran == ["a", "c"]
+    assert admission.stats()["in_flight"] == 0
+
+def test_queue_order_and_positions():
+    asyncio.run(_test_queue_order_and_positions())
+
+def test_cancelled_waiter_leaves_queue():
+    asyncio.run(_test_cancelled_waiter_leaves_queue())
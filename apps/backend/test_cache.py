@@ -0,0 +1,31 @@
+try:
+    from apps.backend.engine.cache import ResultCache
+except ImportError:
+    from engine.cache import ResultCache
+
+def test_lru_eviction():
+    cache = ResultCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    # "b" is now the least recently used
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats() == {"entries": 2, "hits": 3, "disk_hits": 0, "misses": 1, "hit_rate": 0.75}
+
+def test_disk_promotion(tmp_path):
+    cache = ResultCache(max_entries=1, disk_dir=str(tmp_path))
+    cache.put(("a", 1), [1, 2])
+    cache.put(("b", 1), [3])
+    # Evicted from memory, still on disk
+    assert cache.lookup(("a", 1)) is None
+    assert cache.get(("a", 1)) == [1, 2]
+    assert cache.lookup(("a", 1)) == [1, 2]
+    assert cache.stats()["disk_hits"] == 1 and cache.stats()["hits"] == 1
+
+    # A fresh cache over the same directory (e.g. after a restart)
+    restarted = ResultCache(max_entries=1, disk_dir=str(tmp_path))
+    assert restarted.get(("b", 1)) == [3]
+    assert restarted.get(("c", 1)) is None
+    assert restarted.stats() == {"entries": 1, "hits": 0, "disk_hits": 1, "misses": 1, "hit_rate": 0.5}
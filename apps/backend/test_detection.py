@@ -0,0 +1,52 @@
+import cv2
+import numpy as np
+
+try:
+    from apps.backend.engine.detection import UIElementDetector
+except ImportError:
+    from engine.detection import UIElementDetector
+
+def screenshot(seed):
+    rng = np.random.default_rng(seed)
+    img = np.full((480, 640), 255, dtype=np.uint8)
+    for _ in range(60):
+        x, y = rng.integers(0, 600), rng.integers(0, 440)
+        w, h = rng.integers(3, 200), rng.integers(3, 120)
+        color = int(rng.integers(0, 200))
+        if rng.random() < 0.5:
+            cv2.rectangle(img, (int(x), int(y)), (int(x + w), int(y + h)), color, int(rng.integers(-1, 4)) or 1)
+        else:
+            cv2.circle(img, (int(x), int(y)), int(min(w, h)) // 2, color, -1)
+    cv2.putText(img, "Sign in", (40, 460), cv2.FONT_HERSHEY_SIMPLEX, 0.8, 0, 2)
+    return img
+
+def test_contour_boxes_match_per_contour_loop():
+    detector = UIElementDetector()
+    for seed in range(5):
+        thresh = cv2.adaptiveThreshold(
+            screenshot(seed), 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 11, 2
+        )
+        contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        boxes, areas = detector._contour_boxes(thresh)
+        assert boxes.tolist() == [list(cv2.boundingRect(c)) for c in contours]
+        assert np.allclose(areas, [cv2.contourArea(c) for c in contours])
+
+def test_default_detection_matches_legacy_loop():
+    # With glyph and overlap merging off (the default), only the area filter applies
+    img = screenshot(7)
+    thresh = cv2.adaptiveThreshold(img, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 11, 2)
+    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    expected = sorted(
+        (list(cv2.boundingRect(c)) for c in contours if cv2.contourArea(c) > 100), key=lambda b: (b[1], b[0])
+    )
+    assert [el["box"] for el in UIElementDetector().detect_elements(img)] == expected
+
+def test_glyph_merging():
+    img = np.full((200, 400), 255, dtype=np.uint8)
+    # Three letter-sized blocks in a row
+    for x in (20, 40, 60):
+        cv2.rectangle(img, (x, 20), (x + 14, 40), 0, -1)
+    detector = UIElementDetector(min_area=50, glyph_max_side=32)
+    elements, stats = detector.detect_elements_with_stats(img)
+    assert stats["glyphs_merged"] == 2
+    assert [20, 20, 55, 21] in [el["box"] for el in elements]
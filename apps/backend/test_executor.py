@@ -0,0 +1,45 @@
+import asyncio
+import threading
+import time
+
+try:
+    from apps.backend.engine.executor import StageExecutor
+except ImportError:
+    from engine.executor import StageExecutor
+
+async def _test_process_mode_accepts_memoryview():
+    executor = StageExecutor(mode="process", max_workers=1)
+    try:
+        # Uploads from binary frames arrive as memoryviews
+        assert await executor.run("decoding", bytes.upper, memoryview(b"abc")) == b"ABC"
+    finally:
+        executor.shutdown()
+
+def test_process_mode_accepts_memoryview():
+    asyncio.run(_test_process_mode_accepts_memoryview())
+
+async def _test_stage_limits():
+    executor = StageExecutor(mode="thread", max_workers=8, stage_limits={"detection": 2})
+    running = {"ocr": 0, "detection": 0, "layout": 0}
+    peak = dict(running)
+    lock = threading.Lock()
+
+    def work(stage):
+        with lock:
+            running[stage] += 1
+            peak[stage] = max(peak[stage], running[stage])
+        time.sleep(0.05)
+        with lock:
+            running[stage] -= 1
+
+    try:
+        await asyncio.gather(*(
+            executor.run(stage, work, stage) for stage in running for _ in range(4)
+        ))
+    finally:
+        executor.shutdown()
+    # OCR keeps its default limit of 1; stages without a limit only share the pool
+    assert peak == {"ocr": 1, "detection": 2, "layout": 4}
+
+def test_stage_limits():
+    asyncio.run(_test_stage_limits())
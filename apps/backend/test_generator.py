@@ -0,0 +1,196 @@
+import asyncio
+import re
+from collections import Counter
+
+try:
+    from apps.backend.engine.executor import StageExecutor
+    from apps.backend.engine.generator import CodeGenerator, _SectionFilter, split_sections
+    from apps.backend.fake_ollama import FakeOllamaServer
+except ImportError:
+    from engine.executor import StageExecutor
+    from engine.generator import CodeGenerator, _SectionFilter, split_sections
+    from fake_ollama import FakeOllamaServer
+
+LAYOUT = {"type": "root", "box": [0, 0, 100, 100], "children": []}
+
+async def collect(generator, framework="react"):
+    return "".join([chunk async for chunk in generator.generate_code_stream(LAYOUT, framework)])
+
+async def _test_streams_and_reuses_connection():
+    async with FakeOllamaServer(tokens=["a", "b", "c"], tokens_per_second=0) as server:
+        generator = CodeGenerator(api_url=server.url)
+        assert await collect(generator) == "abc"
+        assert await collect(generator, "html") == "abc"
+        await generator.aclose()
+        # Both generations went over the same pooled connection
+        assert server.requests == 2
+        assert server.connections == 1
+
+async def _test_reports_stats():
+    async with FakeOllamaServer(tokens=["a", "b", "c", "d"], tokens_per_second=100) as server:
+        generator = CodeGenerator(api_url=server.url)
+        stats = {}
+        chunks = [chunk async for chunk in generator.generate_code_stream(LAYOUT, "react", stats)]
+        await generator.aclose()
+        assert len(chunks) == 4
+        assert stats["tokens"] == 4
+        assert stats["ttft_ms"] > 0
+        assert 0 < stats["tokens_per_second"] <= 200
+
+class RecordingExecutor(StageExecutor):
+    def __init__(self):
+        super().__init__()
+        self.stages = []
+
+    async def run(self, stage, fn, *args, **kwargs):
+        self.stages.append(stage)
+        return await super().run(stage, fn, *args, **kwargs)
+
+async def _test_encodes_in_executor():
+    async with FakeOllamaServer(tokens=["a", "b"], tokens_per_second=0) as server:
+        executor = RecordingExecutor()
+        generator = CodeGenerator(api_url=server.url, executor=executor)
+        try:
+            assert await collect(generator) == "ab"
+        finally:
+            await generator.aclose()
+            executor.shutdown()
+        assert executor.stages == ["encoding"]
+
+async def _test_warm_up_and_keep_alive():
+    async with FakeOllamaServer(tokens=["a", "b"], tokens_per_second=0) as server:
+        generator = CodeGenerator(api_url=server.url, keep_alive="1h")
+        await generator.warm_up()
+        await collect(generator)
+        await generator.aclose()
+        warm_ups, generation = server.payloads[:-1], server.payloads[-1]
+        # One single-token priming request per system prompt
+        assert len(warm_ups) == 2
+        assert all(p["options"]["num_predict"] == 1 and p["stream"] is False for p in warm_ups)
+        assert all(p["keep_alive"] == "1h" for p in server.payloads)
+        assert generation["stream"] is True
+
+PAGE = {"type": "root", "box": [0, 0, 800, 1200], "children": [
+    {"type": "container", "box": [0, 800, 800, 400], "children": [
+        {"type": "text", "box": [10, 810, 200, 20], "text": "Footer"}
+    ]},
+    {"type": "container", "box": [0, 0, 800, 100], "children": []},
+    {"type": "container", "box": [0, 100, 800, 300], "children": []},
+    {"type": "container", "box": [0, 400, 800, 400], "children": []}
+]}
+
+async def _test_sectioned_generation():
+    tokens = [
+        "import {\n", "  Menu,\n", "} from 'lucide-react';\n", "```jsx\n", "const items = [];\n",
+        "export default function Part() {", " return null; }\n", "export default Part;\n", "```"
+    ]
+    async with FakeOllamaServer(tokens=tokens, tokens_per_second=100) as server:
+        generator = CodeGenerator(api_url=server.url, max_sections=3, max_concurrent_generations=2)
+        stats = {}
+        code = "".join([chunk async for chunk in generator.generate_code_stream(PAGE, "react", stats)])
+        await generator.aclose()
+        assert server.requests == 3 and server.max_active == 2
+        # Sections are requested top to bottom and stitched into one component
+        prompts = [p["messages"][1]["content"] for p in server.payloads]
+        assert [f"`Section{i}`" in prompt for i, prompt in enumerate(prompts, 1)] == [True] * 3
+        assert "Footer" in prompts[2]
+        # Whole import statements are dropped, only the stitched ones remain
+        assert code.count("import ") == 2 and "Menu" not in code and "```" not in code
+        # Each section is its own scope, evaluating to the component it declared
+        declared = re.findall(r"^(?:export default )?(?:function|const|let|var|class)\s+(\w+)", code, re.MULTILINE)
+        assert Counter(declared) == Counter(["Section1", "Section2", "Section3", "App"])
+        assert code.count("  function Part() { return null; }\n") == 3
+        assert code.count("  return Part;\n})();") == 3
+        # Only the stitched App is exported
+        assert code.count("export ") == 1
+        assert code.rstrip().endswith("<Section3 />\n    </div>\n  );\n}")
+        assert stats["sections"] == 3 and stats["tokens"] == 27
+
+def test_section_filter():
+    section_filter = _SectionFilter()
+    lines = [
+        "import React, {", "  useState,", "} from 'react';", "import './styles.css';",
+        "const Badge = () => null;", "export default () => (", "  <p>exported</p>", ");", "export { Badge };"
+    ]
+    kept = [line for line in map(section_filter, lines) if line is not None]
+    assert kept == ["const Badge = () => null;", "const Component = () => (", "  <p>exported</p>", ");"]
+    # The default export wins over the first declaration
+    assert section_filter.component == "Component"
+
+    section_filter = _SectionFilter()
+    assert section_filter("  export const Hero = () => (") == "  const Hero = () => ("
+    assert section_filter("export function Section1() {") == "function Section1() {"
+    assert section_filter.component == "Section1"
+    assert section_filter("export default Hero;") is None
+    assert section_filter.component == "Hero"
+
+def test_split_sections():
+    sections = split_sections(PAGE, 3)
+    assert [[child["box"][1] for child in section["children"]] for section in sections] == [[0, 100], [400], [800]]
+    assert [section["box"] for section in sections] == [[0, 0, 800, 400], [0, 400, 800, 400], [0, 800, 800, 400]]
+    assert split_sections(PAGE, 0) == [PAGE]
+
+async def _test_error_status():
+    async with FakeOllamaServer(status=500) as server:
+        generator = CodeGenerator(api_url=server.url)
+        code = await collect(generator)
+        await generator.aclose()
+        assert "status 500" in code
+
+async def _test_concurrency_cap():
+    async with FakeOllamaServer(tokens=["x"] * 5, tokens_per_second=100) as server:
+        generator = CodeGenerator(api_url=server.url, max_concurrent_generations=2)
+        results = await asyncio.gather(*(collect(generator) for _ in range(5)))
+        await generator.aclose()
+        assert results == ["xxxxx"] * 5
+        assert server.max_active == 2
+
+async def _test_cancellation_aborts_upstream():
+    async with FakeOllamaServer(tokens=["x"] * 1000, tokens_per_second=100) as server:
+        generator = CodeGenerator(api_url=server.url)
+        task = asyncio.create_task(collect(generator))
+        await asyncio.sleep(0.2)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        # Give the fake server a moment to notice the closed socket
+        for _ in range(50):
+            if server.cancelled:
+                break
+            await asyncio.sleep(0.02)
+        await generator.aclose()
+        assert server.cancelled == 1
+        assert server.completed == 0
+
+def test_streams_and_reuses_connection():
+    asyncio.run(_test_streams_and_reuses_connection())
+
+def test_reports_stats():
+    asyncio.run(_test_reports_stats())
+
+def test_encodes_in_executor():
+    asyncio.run(_test_encodes_in_executor())
+
+def test_warm_up_and_keep_alive():
+    asyncio.run(_test_warm_up_and_keep_alive())
+
+def test_sectioned_generation():
+    asyncio.run(_test_sectioned_generation())
+
+def test_error_status():
+    asyncio.run(_test_error_status())
+
+def test_concurrency_cap():
+    asyncio.run(_test_concurrency_cap())
+
+def test_cancellation_aborts_upstream():
+    asyncio.run(_test_cancellation_aborts_upstream())
+
+if __name__ == "__main__":
+    test_streams_and_reuses_connection()
+    test_error_status()
+    test_concurrency_cap()
+    test_cancellation_aborts_upstream()
+    print("Generator tests passed.")
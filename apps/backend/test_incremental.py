@@ -0,0 +1,33 @@
+import numpy as np
+
+try:
+    from apps.backend.engine.incremental import changed_boxes, plan_rescans, splice, tile_hashes
+except ImportError:
+    from engine.incremental import changed_boxes, plan_rescans, splice, tile_hashes
+
+def test_changed_boxes():
+    image = np.zeros((200, 300, 3), dtype=np.uint8)
+    changed = image.copy()
+    changed[70:80, 210:230] = 255
+    previous, current = tile_hashes(image, 64), tile_hashes(changed, 64)
+    assert previous.shape == (4, 5)
+    boxes, share = changed_boxes(previous, current, 64, changed.shape, margin=8)
+    # Tile (row 1, col 3), grown by the margin
+    assert boxes == [[184, 56, 80, 80]]
+    assert share == 1 / 20
+    assert changed_boxes(previous, previous, 64, image.shape)[0] == []
+
+def test_plan_and_splice():
+    boxes = [[0, 100, 300, 40]]
+    old = [
+        {"box": [10, 20, 50, 20]},    # clear of the change
+        {"box": [10, 90, 200, 100]},  # reaches past the changed rows
+        {"box": [10, 300, 50, 20]}
+    ]
+    # Stretched to hold the element the change touches
+    assert plan_rescans(boxes, old) == [(90, 190)]
+    assert plan_rescans(boxes + [[0, 150, 300, 100]], old) == [(90, 250)]
+
+    fresh = [{"box": [10, 90, 200, 120]}, {"box": [10, 150, 20, 20]}, {"box": [250, 170, 20, 20]}]
+    merged = splice(old, fresh, boxes)
+    assert [item["box"] for item in merged] == [[10, 20, 50, 20], [10, 300, 50, 20], [10, 90, 200, 120]]
@@ -0,0 +1,48 @@
+try:
+    from apps.backend.engine.layout_encoder import LayoutEncoder
+except ImportError:
+    from engine.layout_encoder import LayoutEncoder
+
+def node(kind, box, text=None, children=()):
+    return {"type": kind, "box": box, "children": list(children), "text": text}
+
+LAYOUT = {
+    "type": "root",
+    "box": [0, 0, 1000, 800],
+    "children": [
+        node("text", [600, 10, 60, 14], "World"),
+        node("container", [10, 10, 500, 300], children=[
+            node("container", [12, 12, 490, 290], children=[
+                node("container", [14, 14, 480, 280], children=[
+                    node("text", [20, 20, 50, 13], "Hello"),
+                    node("text", [80, 20, 50, 13], ""),
+                    node("container", [20, 60, 100, 40], children=[node("text", [25, 65, 40, 12], "Save")])
+                ])
+            ])
+        ])
+    ]
+}
+
+def test_compacts_layout():
+    text, stats = LayoutEncoder(grid=8, token_budget=0).encode_with_stats(LAYOUT)
+    assert text.splitlines() == [
+        "page 1000x800",
+        # Wrapper chain collapsed into the outer box, children in reading order
+        "C 8,8,496,304",
+        ' T 16,16,48,16 "Hello"',
+        " C 16,64,96,40",
+        '  T 24,64,40,16 "Save"',
+        'T 600,8,64,16 "World"'
+    ]
+    assert stats["nodes"] == stats["shown"] == 5
+
+def test_budget_summarizes_deep_subtrees():
+    encoder = LayoutEncoder(grid=8, token_budget=20)
+    text, stats = encoder.encode_with_stats(LAYOUT)
+    assert stats["tokens"] <= 20
+    assert text.splitlines()[1] == 'C 8,8,496,304 [+3 nodes: "Hello" "Save"]'
+    assert stats["shown"] < stats["nodes"]
+
+def test_tiny_budget_keeps_page_summary():
+    text = LayoutEncoder(token_budget=1).encode(LAYOUT)
+    assert text == 'page 1000x800 [+5 nodes: "Hello" "Save" "World"]'
@@ -0,0 +1,59 @@
+import random
+
+try:
+    from apps.backend.engine.layout_engine import LayoutEngine
+except ImportError:
+    from engine.layout_engine import LayoutEngine
+
+def reference_build_layout(elements, ocr_data, img_width, img_height):
+    # The original recursive insertion the engine must reproduce
+    nodes = [{"type": "container", "box": el["box"], "children": [], "text": None} for el in elements]
+    nodes += [{"type": "text", "box": o["box"], "children": [], "text": o["text"]} for o in ocr_data]
+    nodes.sort(key=lambda n: n["box"][2] * n["box"][3], reverse=True)
+    root = {"type": "root", "box": [0, 0, img_width, img_height], "children": []}
+
+    def insert_node(parent, node):
+        ix, iy, iw, ih = node["box"]
+        for child in parent["children"]:
+            ox, oy, ow, oh = child["box"]
+            if ix >= ox and iy >= oy and ix + iw <= ox + ow and iy + ih <= oy + oh:
+                insert_node(child, node)
+                return
+        parent["children"].append(node)
+
+    for node in nodes:
+        if node["box"][2] > img_width * 0.95 and node["box"][3] > img_height * 0.95:
+            continue
+        insert_node(root, node)
+    return root
+
+def random_boxes(rng, count, width, height):
+    elements, texts = [], []
+    for i in range(count):
+        if i and rng.random() < 0.6:
+            # Nest inside (or exactly on) an earlier box, so the tree gets deep
+            px, py, pw, ph = rng.choice(elements)["box"]
+            w, h = rng.randint(1, pw), rng.randint(1, ph)
+            box = [px + rng.randint(0, pw - w), py + rng.randint(0, ph - h), w, h]
+        else:
+            w, h = rng.randint(4, width), rng.randint(4, height)
+            box = [rng.randint(0, width - w), rng.randint(0, height - h), w, h]
+        if rng.random() < 0.3:
+            texts.append({"text": f"t{i}", "box": box})
+        else:
+            elements.append({"box": box})
+        if not elements:
+            elements.append({"box": box})
+    return elements, texts
+
+def test_matches_reference_on_random_boxes():
+    rng = random.Random(7)
+    descent = LayoutEngine(index_min_nodes=float("inf"))
+    indexed = LayoutEngine(index_min_nodes=0)
+    for count in (0, 1, 20, 150, 600):
+        for _ in range(5):
+            width, height = rng.randint(200, 1600), rng.randint(200, 3000)
+            args = (*random_boxes(rng, count, width, height), width, height)
+            expected = reference_build_layout(*args)
+            assert descent.build_layout(*args) == expected
+            assert indexed.build_layout(*args) == expected
@@ -0,0 +1,126 @@
+import asyncio
+import io
+import json
+
+import cv2
+import numpy as np
+import pytest
+from fastapi import UploadFile
+from fastapi.testclient import TestClient
+from starlette.datastructures import Headers
+
+try:
+    from apps.backend import main
+    from apps.backend.admission import AdmissionController
+except ImportError:
+    import main
+    from admission import AdmissionController
+
+try:
+    from apps.backend.pipeline import decode_image, image_width
+except ImportError:
+    from pipeline import decode_image, image_width
+
+class DisconnectedRequest:
+    async def is_disconnected(self):
+        return True
+
+class StalledPipeline:
+    def __init__(self):
+        self.closed = asyncio.Event()
+
+    async def process(self, image_data, framework="react", session=None):
+        try:
+            yield {"type": "status", "step": "decoding", "message": "Decoding image..."}
+            await asyncio.sleep(3600)
+        finally:
+            self.closed.set()
+
+async def _test_wait_or_disconnect_when_client_leaves():
+    task = asyncio.create_task(asyncio.sleep(3600))
+    # A watcher that returns normally once the client is gone
+    watcher = asyncio.create_task(asyncio.sleep(0))
+    with pytest.raises(main.ClientDisconnected):
+        await main.wait_or_disconnect(task, watcher)
+    assert task.cancelled()
+
+async def _test_http_disconnect_drops_conversion():
+    stalled = StalledPipeline()
+    main.pipeline, main.admission = stalled, AdmissionController()
+    try:
+        upload = UploadFile(io.BytesIO(b"png"), headers=Headers({"content-type": "image/png"}))
+        response = await main.convert_image(DisconnectedRequest(), upload, "react")
+    finally:
+        main.pipeline = main.admission = None
+    assert response.status_code == 499
+    assert stalled.closed.is_set()
+
+def test_wait_or_disconnect_when_client_leaves():
+    asyncio.run(_test_wait_or_disconnect_when_client_leaves())
+
+def test_http_disconnect_drops_conversion():
+    asyncio.run(_test_http_disconnect_drops_conversion())
+
+def binary_frame(header, image):
+    return len(header).to_bytes(2, "big") + header + image
+
+def test_parse_binary_frame():
+    _, jpeg = cv2.imencode(".jpg", np.zeros((30, 70, 3), dtype=np.uint8))
+    frame = binary_frame(json.dumps({"framework": "html"}).encode(), jpeg.tobytes())
+    header, image = main.parse_binary_frame(frame)
+    assert header == {"framework": "html"}
+    assert isinstance(image, memoryview) and image == jpeg.tobytes()
+    # Read from the view without copying the upload
+    assert image_width(image) == 70
+
+    header, image = main.parse_binary_frame(binary_frame(b"", b"png"))
+    assert header == {} and image == b"png"
+
+@pytest.mark.parametrize("target_width", [None, 1024])
+def test_decode_garbage(target_width):
+    # The reduced path reads the width first; both fail the same way
+    with pytest.raises(ValueError, match="Could not decode image"):
+        decode_image(b"not an image", target_width)
+
+@pytest.mark.parametrize("frame", [
+    b"\x00",
+    b"\x00\x10{}",
+    binary_frame(b"{framework", b"png"),
+    binary_frame(b'["html"]', b"png"),
+    binary_frame(b"null", b"png")
+])
+def test_parse_binary_frame_rejects_malformed(frame):
+    with pytest.raises(ValueError):
+        main.parse_binary_frame(frame)
+
+def test_websocket_rejects_bad_upload_and_keeps_connection():
+    client = TestClient(main.app)
+    with client.websocket_connect("/ws/generate") as websocket:
+        websocket.send_bytes(b"\x00")
+        assert websocket.receive_json()["type"] == "error"
+        websocket.send_text(json.dumps({"image": "", "framework": [["react"]]}))
+        assert websocket.receive_json() == {"type": "error", "message": "framework must be a name or a list of names"}
+        # Still connected: the next upload gets an answer too
+        websocket.send_text(json.dumps({"image": "", "framework": 5}))
+        assert websocket.receive_json()["type"] == "error"
+
+class LoadedPipeline:
+    initialized = True
+    init_progress = {"ocr": "ready"}
+
+async def _test_ready_requires_successful_warm_up():
+    main.pipeline, main.admission = LoadedPipeline(), AdmissionController()
+    try:
+        main.warmup_status = None
+        assert (await main.ready()).status_code == 503
+        main.warmup_status = {"ocr": "ok", "llm": "error: connection refused"}
+        response = await main.ready()
+        assert response.status_code == 503
+        assert json.loads(response.body)["warmup"]["llm"].startswith("error")
+        main.warmup_status = {"ocr": "ok", "llm": "ok"}
+        assert (await main.ready())["ready"]
+    finally:
+        main.pipeline = main.admission = main.warmup_status = None
+
+def test_ready_requires_successful_warm_up():
+    asyncio.run(_test_ready_requires_successful_warm_up())
@@ -0,0 +1,145 @@
+import sys
+import types
+
+import cv2
+import numpy as np
+import pytest
+
+try:
+    from apps.backend import main
+    from apps.backend.engine import ocrProcessing
+    from apps.backend.engine.ocr_backends import CPUEasyOCRBackend, EasyOCRBackend, create_backend
+except ImportError:
+    import main
+    from engine import ocrProcessing
+    from engine.ocr_backends import CPUEasyOCRBackend, EasyOCRBackend, create_backend
+
+class FakeReader:
+    """
+    Records the calls region OCR makes; detect() finds one line and one
+    rotated box near the top left of whatever crop it is given.
+    """
+    def __init__(self):
+        self.crops = []
+        self.recognized = None
+        self.full_image_calls = 0
+
+    def detect(self, crop):
+        self.crops.append(crop.shape)
+        return [[[2, 30, 3, 15]]], [[[[1, 1], [5, 1], [5, 5], [1, 5]]]]
+
+    def recognize(self, img, horizontal_list, free_list, batch_size=1):
+        self.recognized = (horizontal_list, free_list)
+        return [([[x0, y0], [x1, y0], [x1, y1], [x0, y1]], "text", 0.9) for x0, x1, y0, y1 in horizontal_list]
+
+    def readtext(self, img, batch_size=1):
+        self.full_image_calls += 1
+        return []
+
+def make_ocr(monkeypatch):
+    reader = FakeReader()
+    monkeypatch.setattr(ocrProcessing, "create_backend", lambda *args, **kwargs: reader)
+    return ocrProcessing.OCRProcessor(mode="regions"), reader
+
+def page():
+    img = np.full((300, 400, 3), 255, dtype=np.uint8)
+    # A one-line label and a taller block of text
+    cv2.putText(img, "Login", (22, 118), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 2)
+    for row in range(3):
+        cv2.putText(img, "Lorem ipsum", (204, 175 + row * 30), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 2)
+    return img
+
+def test_region_ocr(monkeypatch):
+    ocr, reader = make_ocr(monkeypatch)
+    elements = [
+        {"box": [20, 100, 80, 20]},
+        {"box": [200, 150, 150, 100]},
+        # Nothing but background: skipped
+        {"box": [20, 220, 60, 40]}
+    ]
+    regions = ocr.merge_regions((300, 400), elements)
+    pad = ocr.region_padding
+    label = [20 - pad, 100 - pad, 80 + 2 * pad + 1, 20 + 2 * pad + 1]
+    assert label in regions and len(regions) == 3
+
+    results = ocr.extract_text(page(), elements)
+    assert reader.full_image_calls == 0
+
+    # Only the region taller than line_height_max went through text detection
+    tall = [200 - pad, 150 - pad, 150 + 2 * pad + 1, 100 + 2 * pad + 1]
+    assert tall[3] > ocr.line_height_max >= label[3]
+    assert reader.crops == [(tall[3], tall[2])]
+
+    # The line went straight to recognition; detected boxes came back out of crop coordinates
+    x, y = tall[:2]
+    horizontal_list, free_list = reader.recognized
+    lx, ly, lw, lh = label
+    assert sorted(horizontal_list) == [[lx, lx + lw, ly, ly + lh], [x + 2, x + 30, y + 3, y + 15]]
+    assert free_list == [[[x + 1, y + 1], [x + 5, y + 1], [x + 5, y + 5], [x + 1, y + 5]]]
+    assert sorted(result["box"] for result in results) == [label, [x + 2, y + 3, 28, 12]]
+
+def test_region_ocr_falls_back_to_full_image(monkeypatch):
+    ocr, reader = make_ocr(monkeypatch)
+    assert ocr.extract_text(page(), [{"box": [20, 220, 60, 40]}]) == []
+    assert reader.full_image_calls == 1 and reader.recognized is None
+
+class FakeEasyOCRReader:
+    def __init__(self, lang_list, gpu=True, **kwargs):
+        if gpu:
+            raise RuntimeError("CUDA not available")
+        self.kwargs = kwargs
+        self.recognizer = "fp32 recognizer"
+        self.calls = []
+
+    def readtext(self, img, **kwargs):
+        self.calls.append(("readtext", kwargs))
+        return []
+
+    def detect(self, img, **kwargs):
+        self.calls.append(("detect", kwargs))
+        return [[]], [[]]
+
+@pytest.fixture
+def fake_easyocr(monkeypatch):
+    # No model download: backends import these inside __init__
+    torch = types.SimpleNamespace(
+        threads=4,
+        nn=types.SimpleNamespace(LSTM="LSTM", Linear="Linear"),
+        qint8="qint8",
+        quantization=types.SimpleNamespace(quantize_dynamic=lambda model, layers, dtype: f"{dtype} recognizer")
+    )
+    torch.get_num_threads = lambda: torch.threads
+    torch.set_num_threads = lambda threads: setattr(torch, "threads", threads)
+    monkeypatch.setitem(sys.modules, "easyocr", types.SimpleNamespace(Reader=FakeEasyOCRReader))
+    monkeypatch.setitem(sys.modules, "torch", torch)
+    return torch
+
+def test_create_backend(fake_easyocr, monkeypatch):
+    backend = create_backend("easyocr", ["en"])
+    # Falls back to the CPU when the GPU reader fails
+    assert type(backend) is EasyOCRBackend and backend.reader.kwargs == {}
+
+    assert main.ocr_backend_options("easyocr") == {}
+    monkeypatch.setenv("PIPELINE_OCR_THREADS", "2")
+    monkeypatch.setenv("PIPELINE_OCR_CANVAS_SIZE", "1280")
+    options = main.ocr_backend_options("easyocr-cpu")
+    assert options == {"threads": 2, "quantize": True, "canvas_size": 1280}
+
+    backend = create_backend("easyocr-cpu", ["en"], **options)
+    assert isinstance(backend, CPUEasyOCRBackend)
+    assert backend.reader.kwargs == {"quantize": False}
+    assert backend.reader.recognizer == "qint8 recognizer"
+    # Thread count is pinned again if something changed it since
+    fake_easyocr.threads = 8
+    backend.readtext(np.zeros((8, 8), dtype=np.uint8))
+    backend.detect(np.zeros((8, 8), dtype=np.uint8))
+    assert fake_easyocr.threads == 2
+    assert [kwargs["canvas_size"] for _, kwargs in backend.reader.calls] == [1280, 1280]
+
+    monkeypatch.setenv("PIPELINE_OCR_QUANTIZE", "0")
+    backend = create_backend("easyocr-cpu", ["en"], **main.ocr_backend_options("easyocr-cpu"))
+    assert backend.reader.recognizer == "fp32 recognizer"
+
+def test_create_backend_rejects_unknown_name(fake_easyocr):
+    with pytest.raises(ValueError, match="Unknown OCR backend: tesseract"):
+        create_backend("tesseract", ["en"])
@@ -0,0 +1,245 @@
+import asyncio
+
+import cv2
+import numpy as np
+import pytest
+
+try:
+    from apps.backend import metrics
+    from apps.backend.engine.executor import RemoteComponent
+    from apps.backend.engine.generator import ErrorChunk
+    from apps.backend.engine.incremental import SessionState
+    from apps.backend.fake_ollama import FakeOllamaServer
+    from apps.backend.pipeline import ScreenshotPipeline, parse_frameworks
+except ImportError:
+    import metrics
+    from engine.executor import RemoteComponent
+    from engine.generator import ErrorChunk
+    from engine.incremental import SessionState
+    from fake_ollama import FakeOllamaServer
+    from pipeline import ScreenshotPipeline, parse_frameworks
+
+class FakeOCR:
+    def __init__(self):
+        self.calls = 0
+
+    def extract_text(self, img, elements=None, mode=None):
+        self.calls += 1
+        return [{"text": "Login", "confidence": 0.9, "box": [60, 60, 80, 20]}]
+
+def make_pipeline(server, **kwargs):
+    # Real OpenCV stages, fake OCR: no model download in tests
+    pipeline = ScreenshotPipeline(ollama_url=server.url, defer_init=True, **kwargs)
+    for name in ("preprocessor", "detector", "layout_engine"):
+        pipeline._build_component(name)
+    pipeline.ocr = FakeOCR()
+    pipeline.init_progress["ocr"] = "ready"
+    return pipeline
+
+def screenshot(edited=False):
+    img = np.full((400, 600, 3), 255, dtype=np.uint8)
+    cv2.rectangle(img, (40, 40), (560, 120), (40, 40, 40), -1)
+    cv2.rectangle(img, (40, 200), (280, 360), (90, 90, 200), -1)
+    if edited:
+        cv2.rectangle(img, (360, 260), (520, 320), (200, 90, 90), -1)
+    return cv2.imencode(".png", img)[1].tobytes()
+
+async def run(pipeline, image, framework="react", session=None):
+    updates = [update async for update in pipeline.process(image, framework, session)]
+    errors = [update for update in updates if update["type"] == "error"]
+    assert not errors, errors
+    return updates
+
+def steps(updates):
+    return [update.get("step") for update in updates if update["type"] == "status"]
+
+def code(updates):
+    return "".join(update["chunk"] for update in updates if update["type"] == "code_chunk")
+
+async def close(pipeline):
+    await pipeline.generator.aclose()
+    pipeline.executor.shutdown()
+
+async def _test_cache_hit_replays_result(tmp_path):
+    image = screenshot()
+    async with FakeOllamaServer(tokens=["<div>", "Login", "</div>"], tokens_per_second=0) as server:
+        pipeline = make_pipeline(server, cache_dir=str(tmp_path))
+        try:
+            first = await run(pipeline, image)
+            second = await run(pipeline, image)
+        finally:
+            await close(pipeline)
+        assert "cache_hit" not in steps(first) and "cache_hit" in steps(second)
+        assert "ocr" not in steps(second)
+        assert pipeline.ocr.calls == 1
+        assert code(second) == code(first) == "<div>Login</div>"
+        generation = [u for u in second if u.get("stage") == "generation"]
+        assert generation[0]["cached"]
+
+        # Same disk cache, different analysis settings: analyzed again
+        other = make_pipeline(server, cache_dir=str(tmp_path), tile_overlap=64)
+        try:
+            third = await run(other, image)
+        finally:
+            await close(other)
+        assert "cache_hit" not in steps(third)
+        assert other.ocr.calls == 1
+
+def test_cache_hit_replays_result(tmp_path):
+    asyncio.run(_test_cache_hit_replays_result(tmp_path))
+
+async def _test_incremental_results_not_cached():
+    async with FakeOllamaServer(tokens=["<div/>"], tokens_per_second=0) as server:
+        pipeline = make_pipeline(server)
+        session = SessionState()
+        try:
+            await run(pipeline, screenshot(), session=session)
+            edited = await run(pipeline, screenshot(edited=True), session=session)
+            assert "incremental" in steps(edited)
+            # Only the full analysis of the first upload
+            assert pipeline.analysis_cache.stats()["entries"] == 1
+
+            # A fresh session analyzes the edited upload in full
+            fresh = await run(pipeline, screenshot(edited=True), session=SessionState())
+            assert "cache_hit" not in steps(fresh) and "incremental" not in steps(fresh)
+        finally:
+            await close(pipeline)
+
+async def _test_tiled_upload_not_announced_incremental():
+    async with FakeOllamaServer(tokens=["<div/>"], tokens_per_second=0) as server:
+        pipeline = make_pipeline(server, tile_height=256, tile_overlap=64)
+        session = SessionState()
+        try:
+            await run(pipeline, screenshot(), session=session)
+            edited = await run(pipeline, screenshot(edited=True), session=session)
+        finally:
+            await close(pipeline)
+        assert "tiling" in steps(edited) and "incremental" not in steps(edited)
+
+def test_incremental_results_not_cached():
+    asyncio.run(_test_incremental_results_not_cached())
+
+def test_tiled_upload_not_announced_incremental():
+    asyncio.run(_test_tiled_upload_not_announced_incremental())
+
+async def _test_fan_out():
+    async with FakeOllamaServer(tokens=["<p>", "hi", "</p>"], tokens_per_second=0) as server:
+        pipeline = make_pipeline(server)
+        generate = pipeline.generator.generate_code_stream
+
+        async def fail_vue(layout_tree, framework="react", stats=None):
+            if framework == "vue":
+                yield ErrorChunk("// Error: no vue\n")
+                return
+            async for chunk in generate(layout_tree, framework, stats):
+                yield chunk
+
+        pipeline.generator.generate_code_stream = fail_vue
+        failures = metrics.CONVERSIONS._values.get(("generation_error",), 0)
+        try:
+            updates = await run(pipeline, screenshot(), ["react", "html", "react"])
+            failed = await run(pipeline, screenshot(), ["react", "vue"])
+        finally:
+            await close(pipeline)
+
+    # One analysis for every framework
+    assert pipeline.ocr.calls == 1 and steps(updates).count("layout") == 1
+    assert steps(failed).count("cache_hit") == 1
+    chunks = {}
+    for update in updates:
+        if update["type"] == "code_chunk":
+            chunks.setdefault(update["framework"], []).append(update["chunk"])
+    assert {name: "".join(parts) for name, parts in chunks.items()} == {"react": "<p>hi</p>", "html": "<p>hi</p>"}
+    assert set(updates[-1]["timings"]["llm"]) == {"react", "html"}
+
+    # One failed framework marks the conversion, and only its code stays uncached
+    assert metrics.CONVERSIONS._values.get(("generation_error",), 0) == failures + 1
+    generation = {u["framework"]: u["cached"] for u in failed if u.get("stage") == "generation"}
+    assert generation == {"react": True, "vue": False}
+    assert failed[-1]["step"] == "complete"
+
+async def _test_rejects_bad_framework():
+    async with FakeOllamaServer(tokens=["x"], tokens_per_second=0) as server:
+        pipeline = make_pipeline(server)
+        try:
+            for framework in (None, 5, [["react"]], ["react", 1], []):
+                updates = [update async for update in pipeline.process(screenshot(), framework)]
+                assert [update["type"] for update in updates] == ["error"]
+        finally:
+            await close(pipeline)
+
+def test_fan_out():
+    asyncio.run(_test_fan_out())
+
+def test_rejects_bad_framework():
+    asyncio.run(_test_rejects_bad_framework())
+
+def test_parse_frameworks():
+    assert parse_frameworks("html") == ["html"]
+    assert parse_frameworks(["react", "html", "react"]) == ["react", "html"]
+    for framework in (None, 5, {"react": 1}, [["react"]], []):
+        with pytest.raises(ValueError):
+            parse_frameworks(framework)
+
+async def grows_upward(image, y0, y1, timings):
+    # A fresh element cut by the top of every span, as if it had grown upward
+    return [{"type": "block", "box": [0, y0, image.shape[1], y1 - y0 - 10]}], [], 0
+
+async def _test_incremental_limit_after_growth():
+    async with FakeOllamaServer(tokens=["<div/>"], tokens_per_second=0) as server:
+        pipeline = make_pipeline(server, incremental_max_changed=0.5)
+        pipeline._analyze_band = grows_upward
+        session = SessionState()
+        image = np.zeros((400, 600, 3), dtype=np.uint8)
+        boxes = [[0, 200, 600, 40]]
+        timings = {"preprocessing": 0, "detection": 0, "ocr": 0}
+        try:
+            result = {}
+            updates = [
+                u async for u in pipeline._analyze_changes(image, session, boxes, [(200, 240)], 0.1, timings, result)
+            ]
+            # Grown twice, to rows 80-240: the status reports what was actually reused
+            incremental = [u for u in updates if u.get("step") == "incremental"]
+            assert incremental[0]["reused"] == 0.6
+
+            # Past the limit once grown: nothing is spliced or announced
+            pipeline.incremental_max_changed = 0.15
+            result = {}
+            updates = [
+                u async for u in pipeline._analyze_changes(image, session, boxes, [(200, 240)], 0.1, timings, result)
+            ]
+            assert result == {} and updates == []
+
+            # ... and the conversion falls back to analyzing the whole page
+            # (the planned rows, 40% of it, are within the limit, grown they are not)
+            pipeline.incremental_max_changed = 0.45
+            await run(pipeline, screenshot(), session=session)
+            edited = await run(pipeline, screenshot(edited=True), session=session)
+            assert "incremental" not in steps(edited) and "preprocessing" in steps(edited)
+            assert pipeline.analysis_cache.stats()["entries"] == 2
+        finally:
+            await close(pipeline)
+
+def test_incremental_limit_after_growth():
+    asyncio.run(_test_incremental_limit_after_growth())
+
+async def _test_process_mode_builds_components_in_workers():
+    pipeline = ScreenshotPipeline(executor_mode="process", max_workers=1)
+    try:
+        # The OCR model (and the other worker-only stages) are not loaded here
+        assert all(isinstance(getattr(pipeline, name), RemoteComponent) for name in ("detector", "ocr", "layout_engine"))
+        assert pipeline.initialized
+        with pytest.raises(RuntimeError):
+            pipeline.detector.detect_elements_with_stats(None)
+
+        image = cv2.imdecode(np.frombuffer(screenshot(), np.uint8), cv2.IMREAD_COLOR)
+        processed, _ = pipeline.preprocessor.preprocess_for_detection(image)
+        elements, _ = await pipeline.executor.run(
+            "detection", pipeline.detector.detect_elements_with_stats, processed
+        )
+        assert elements
+    finally:
+        await close(pipeline)
+
+def test_process_mode_builds_components_in_workers():
+    asyncio.run(_test_process_mode_builds_components_in_workers())
@@ -0,0 +1,40 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+import pytest
+
+try:
+    from apps.backend.engine.screenshotProcessor import ScreenshotProcessor, map_boxes_to_original
+except ImportError:
+    from engine.screenshotProcessor import ScreenshotProcessor, map_boxes_to_original
+
+def test_concurrent_preprocessing_matches_sequential():
+    rng = np.random.default_rng(3)
+    images = [rng.integers(0, 256, (600 + 40 * i, 900, 3), dtype=np.uint8) for i in range(8)]
+    processor = ScreenshotProcessor(profile="detection")
+    expected = [processor.preprocess_gray(img)[0] for img in images]
+    expected_color = [processor.preprocess(img) for img in images]
+    # Pipeline stages share one processor across the worker threads
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        for _ in range(5):
+            results = list(pool.map(lambda img: processor.preprocess_gray(img)[0], images))
+            assert all(np.array_equal(a, b) for a, b in zip(results, expected))
+            results = list(pool.map(processor.preprocess, images))
+            assert all(np.array_equal(a, b) for a, b in zip(results, expected_color))
+
+@pytest.mark.parametrize("profile", ["color", "detection"])
+@pytest.mark.parametrize("crop_vertical", [True, False])
+def test_transform_maps_back_to_original(profile, crop_vertical):
+    img = np.full((1500, 2400, 3), 255, dtype=np.uint8)
+    box = [600, 400, 800, 500]
+    x, y, w, h = box
+    cv2.rectangle(img, (x, y), (x + w - 1, y + h - 1), (30, 30, 30), -1)
+
+    processed, transform = ScreenshotProcessor(profile=profile).preprocess_for_detection(img, crop_vertical)
+    if processed.ndim == 3:
+        processed = cv2.cvtColor(processed, cv2.COLOR_BGR2GRAY)
+    found = cv2.boundingRect(cv2.findNonZero((processed < 128).astype(np.uint8)))
+    mapped = map_boxes_to_original([{"box": list(found)}], transform)[0]["box"]
+    # Within one processed pixel
+    assert np.abs(np.array(mapped) - box).max() <= 1 / transform["scale"] + 1
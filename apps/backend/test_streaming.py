@@ -0,0 +1,70 @@
+import asyncio
+
+try:
+    from apps.backend.streaming import coalesce_chunks
+except ImportError:
+    from streaming import coalesce_chunks
+
+def chunk(text, framework="react"):
+    return {"type": "code_chunk", "chunk": text, "framework": framework}
+
+async def stream(updates, delay=0):
+    for update in updates:
+        if delay:
+            await asyncio.sleep(delay)
+        yield update
+
+async def collect(updates, **options):
+    return [update async for update in coalesce_chunks(updates, **options)]
+
+async def _test_batches_by_size_and_flushes_at_boundaries():
+    status = {"type": "status", "step": "complete"}
+    updates = [chunk("ab"), chunk("cd"), chunk("ef"), chunk("g"), status]
+    result = await collect(stream(updates), max_size=4, max_delay=10)
+    assert result == [chunk("abcd"), chunk("efg"), status]
+    # Disabled: passed through as is
+    assert await collect(stream(updates), max_size=0) == updates
+
+async def _test_flushes_after_delay():
+    updates = [chunk("a"), chunk("b"), chunk("c")]
+    # Tokens arrive every 50ms, batches may wait 10ms: no two tokens share a batch
+    result = await collect(stream(updates, delay=0.05), max_size=512, max_delay=0.01)
+    assert result == updates
+
+async def _test_keeps_frameworks_apart():
+    updates = [chunk("a"), chunk("<", "html"), chunk("b"), chunk(">", "html")]
+    result = await collect(stream(updates), max_size=512, max_delay=10)
+    assert result == [chunk("ab"), chunk("<>", "html")]
+
+async def _test_closing_stops_the_source():
+    closed = asyncio.Event()
+
+    async def endless():
+        try:
+            while True:
+                await asyncio.sleep(0.01)
+                yield chunk("x")
+        finally:
+            closed.set()
+
+    async def consume():
+        async for _ in coalesce_chunks(endless(), max_size=512, max_delay=0.02):
+            pass
+
+    task = asyncio.create_task(consume())
+    await asyncio.sleep(0.1)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    assert closed.is_set()
+
+def test_batches_by_size_and_flushes_at_boundaries():
+    asyncio.run(_test_batches_by_size_and_flushes_at_boundaries())
+
+def test_flushes_after_delay():
+    asyncio.run(_test_flushes_after_delay())
+
+def test_keeps_frameworks_apart():
+    asyncio.run(_test_keeps_frameworks_apart())
+
+def test_closing_stops_the_source():
+    asyncio.run(_test_closing_stops_the_source())
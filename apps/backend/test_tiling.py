@@ -0,0 +1,31 @@
+try:
+    from apps.backend.engine.tiling import TileMerger, plan_bands
+except ImportError:
+    from engine.tiling import TileMerger, plan_bands
+
+def test_plan_bands():
+    assert plan_bands(1000, 400, 100) == [(0, 400), (300, 700), (600, 1000)]
+    assert plan_bands(300, 400, 100) == [(0, 300)]
+
+def test_merges_across_band_boundary():
+    bands = [(0, 400), (300, 700)]
+    merger = TileMerger(bands)
+    # Seen whole by both bands (inside the overlap), and a tall element cut by the boundary
+    first = [{"type": "block", "box": [10, 320, 50, 30]}, {"type": "block", "box": [100, 200, 80, 200]}]
+    texts = [
+        {"text": "Overlap", "confidence": 0.6, "box": [10, 330, 40, 12]},
+        {"text": "Cu", "confidence": 0.9, "box": [200, 390, 40, 10]}
+    ]
+    elements, settled_texts = merger.add(0, first, texts)
+    # Everything reaching the next band waits for it
+    assert elements == [] and settled_texts == []
+
+    second = [{"type": "block", "box": [10, 321, 50, 29]}, {"type": "block", "box": [100, 300, 80, 250]}]
+    texts = [
+        {"text": "Overlap", "confidence": 0.8, "box": [10, 330, 40, 12]},
+        {"text": "Cut line", "confidence": 0.9, "box": [200, 390, 40, 16]}
+    ]
+    merger.add(1, second, texts)
+    assert sorted(el["box"] for el in merger.elements) == [[10, 320, 50, 30], [100, 200, 80, 350]]
+    # The truncated line from the first band is dropped, the duplicate keeps the better reading
+    assert sorted((t["text"], t["confidence"]) for t in merger.texts) == [("Cut line", 0.9), ("Overlap", 0.8)]
@@ -28,56 +28,86 @@ export default function Home() {
     setGeneratedCode("");
     setCurrentStep("preprocessing");
 
-    // Convert file to base64
-    const reader = new FileReader();
-    reader.onload = () => {
-      const base64 = reader.result as string;
-      connectAndSend(base64);
-    };
-    reader.readAsDataURL(file);
+    try {
+      const socket = await connect();
+      // Send the image as a binary frame (no base64 overhead)
+      socket.send(buildFrame(file));
+    } catch {
+      setStatus("error");
+      setLogs((prev) => [...prev, "Connection error. Ensure backend is running."]);
+    }
   };
 
-  const connectAndSend = (data: string) => {
-    if (ws.current) {
-      ws.current.close();
-    }
+  // Binary frame: 2-byte big-endian header length, JSON header, raw image bytes
+  const buildFrame = (file: File) => {
+    const header = new TextEncoder().encode(JSON.stringify({ framework }));
+    const length = new Uint8Array([header.length >> 8, header.length & 0xff]);
+    return new Blob([length, header, file]);
+  };
 
-    ws.current = new WebSocket("ws://localhost:8000/ws/generate");
-
-    ws.current.onopen = () => {
-      console.log("Connected to backend");
-      // Send JSON payload
-      ws.current?.send(JSON.stringify({
-        image: data,
-        framework: framework
-      }));
-    };
-
-    ws.current.onmessage = (event) => {
-      const message = JSON.parse(event.data);
-
-      if (message.type === "status") {
-        setCurrentStep(message.step);
-        setLogs((prev) => [...prev, message.message]);
-      } else if (message.type === "code_chunk") {
-        setGeneratedCode((prev) => prev + message.chunk);
-      } else if (message.type === "complete") {
-        setStatus("complete");
-        setCurrentStep("complete");
-        ws.current?.close();
-      } else if (message.type === "error") {
-        setStatus("error");
-        setLogs((prev) => [...prev, `Error: ${message.message}`]);
-        alert(message.message);
+  // One socket for every upload: the backend remembers the previous upload per
+  // connection and only re-analyzes the regions of a new one that changed
+  const connect = () =>
+    new Promise<WebSocket>((resolve, reject) => {
+      const current = ws.current;
+      if (current && current.readyState === WebSocket.OPEN) {
+        resolve(current);
+        return;
+      }
+      if (current && current.readyState === WebSocket.CONNECTING) {
+        current.addEventListener("open", () => resolve(current), { once: true });
+        current.addEventListener("error", reject, { once: true });
+        return;
       }
-    };
 
-    ws.current.onerror = (e) => {
-      console.error("WebSocket error", e);
-      setStatus("error");
-      setLogs((prev) => [...prev, "Connection error. Ensure backend is running."]);
-    };
-  };
+      const socket = new WebSocket("ws://localhost:8000/ws/generate");
+      ws.current = socket;
+      socket.addEventListener("open", () => {
+        console.log("Connected to backend");
+        resolve(socket);
+      }, { once: true });
+      socket.addEventListener("error", reject, { once: true });
+
+      socket.onmessage = (event) => {
+        const message = JSON.parse(event.data);
+
+        if (message.type === "status") {
+          // Progress updates (stage_complete, detection_complete, ...) carry data, not a new step
+          if (steps.some((s) => s.key === message.step)) {
+            setCurrentStep(message.step);
+          }
+          if (message.message) {
+            setLogs((prev) => [...prev, message.message]);
+          }
+          // The socket stays open for the next upload
+          if (message.step === "complete") {
+            setStatus("complete");
+            setCurrentStep("complete");
+          }
+        } else if (message.type === "code_chunk") {
+          setGeneratedCode((prev) => prev + message.chunk);
+        } else if (message.type === "error") {
+          setStatus("error");
+          setLogs((prev) => [...prev, `Error: ${message.message}`]);
+          alert(message.message);
+        }
+      };
+
+      socket.onerror = (e) => {
+        console.error("WebSocket error", e);
+        setStatus("error");
+        setLogs((prev) => [...prev, "Connection error. Ensure backend is running."]);
+      };
+
+      socket.onclose = () => {
+        if (ws.current === socket) {
+          ws.current = null;
+        }
+      };
+    });
+
+  // Close the connection when leaving the page
+  useEffect(() => () => ws.current?.close(), []);
 
   // Clean up code (remove markdown blocks)
   const cleanCode = (code: string) => {
@@ -99,14 +129,15 @@ export default function Home() {
   };
 
   const resetState = () => {
+    // Abandoning a running conversion: closing the socket stops it on the backend
+    if (status === "processing") {
+      ws.current?.close();
+      ws.current = null;
+    }
     setStatus("idle");
     setLogs([]);
     setGeneratedCode("");
     setCurrentStep("");
-    if (ws.current) {
-      ws.current.close();
-      ws.current = null;
-    }
   };
 
   return (